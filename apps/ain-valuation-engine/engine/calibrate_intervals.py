@@ -2,15 +2,33 @@
 Simple quantile calibration for prediction intervals.
 Given residuals on validation, learn a mapping from confidence label -> (low, high) % bands
 to hit target coverage in acceptance.v1.yaml.
+
+learn_bands_from_sketches does the same from per-label KLL sketches of the
+residuals (engine.quantile_sketch), which can be updated as outcomes arrive
+and merged across workers instead of re-reading every residual.
 """
 
 from typing import Dict, List, Tuple
 import numpy as np
 import json
 
+from engine.quantile_sketch import KLLSketch
+
+DEFAULT_TARGET_COVERAGE = {"High":0.84, "Medium":0.82, "Low":0.80}
+MIN_RESIDUALS = 50
+
 def _quantile(a: np.ndarray, q: float) -> float:
     return float(np.quantile(a, q))
 
+def _default_band(lab: str) -> Tuple[float, float]:
+    # not enough data to learn robustly; default to conservative
+    return (0.12, 0.18) if lab == "Low" else (0.08, 0.12) if lab == "Medium" else (0.06, 0.10)
+
+def _band(quantile, cov: float) -> Tuple[float, float]:
+    lo_q = (1.0 - cov) / 2.0
+    hi_q = 1.0 - lo_q
+    return float(abs(quantile(lo_q))), float(abs(quantile(hi_q)))
+
 def learn_bands_from_residuals(
     residuals_pct: np.ndarray,
     labels: List[str],
@@ -23,7 +41,7 @@ def learn_bands_from_residuals(
     Returns dict mapping label -> (low_pct, high_pct) bands to achieve target coverage.
     """
     if target_coverage_by_label is None:
-        target_coverage_by_label = {"High":0.84, "Medium":0.82, "Low":0.80}
+        target_coverage_by_label = DEFAULT_TARGET_COVERAGE
 
     bands = {}
     arr = np.array(residuals_pct, dtype=float)
@@ -31,16 +49,32 @@ def learn_bands_from_residuals(
 
     for lab, cov in target_coverage_by_label.items():
         sel = arr[labs == lab]
-        if sel.size < 50:
-            # not enough data to learn robustly; default to conservative
-            bands[lab] = (0.12, 0.18) if lab == "Low" else (0.08, 0.12) if lab == "Medium" else (0.06, 0.10)
+        if sel.size < MIN_RESIDUALS:
+            bands[lab] = _default_band(lab)
             continue
-        lo_q = (1.0 - cov) / 2.0
-        hi_q = 1.0 - lo_q
-        lo = abs(_quantile(sel, lo_q))
-        hi = abs(_quantile(sel, hi_q))
         # ensure monotonic ordering: Low ≥ Medium ≥ High
-        bands[lab] = (float(lo), float(hi))
+        bands[lab] = _band(lambda q: _quantile(sel, q), cov)
+
+    return bands
+
+def learn_bands_from_sketches(
+    sketches_by_label: Dict[str, KLLSketch],
+    target_coverage_by_label: Dict[str, float] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Same bands as learn_bands_from_residuals, from per-label sketches of residual_pct.
+    Exact while a sketch holds every residual; otherwise within the sketch's rank error.
+    """
+    if target_coverage_by_label is None:
+        target_coverage_by_label = DEFAULT_TARGET_COVERAGE
+
+    bands = {}
+    for lab, cov in target_coverage_by_label.items():
+        sketch = sketches_by_label.get(lab)
+        if sketch is None or sketch.n < MIN_RESIDUALS:
+            bands[lab] = _default_band(lab)
+            continue
+        bands[lab] = _band(sketch.quantile, cov)
 
     return bands
 
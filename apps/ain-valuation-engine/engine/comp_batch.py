@@ -0,0 +1,145 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+COMP_FIELDS = ("price", "mileage", "distance_km", "days_old")
+
+class CompBatch:
+    """
+    Comps as contiguous NumPy columns (struct of arrays).
+
+    Selection and filtering run as boolean masks over the columns; `take`
+    returns a new batch for the survivors. `id` defaults to the position in
+    the original comp list and is carried through every subset, so results
+    can always be mapped back to the caller's listings.
+    """
+    __slots__ = ("price", "mileage", "distance_km", "days_old", "id", "mileage_sorted")
+
+    def __init__(self, price, mileage, distance_km, days_old, id=None, mileage_sorted=False):
+        self.price = np.ascontiguousarray(price, dtype=np.float64)
+        self.mileage = np.ascontiguousarray(mileage, dtype=np.int64)
+        self.distance_km = np.ascontiguousarray(distance_km, dtype=np.float64)
+        self.days_old = np.ascontiguousarray(days_old, dtype=np.int64)
+        self.id = np.arange(len(self.price), dtype=np.int64) if id is None else np.ascontiguousarray(id, dtype=np.int64)
+        self.mileage_sorted = mileage_sorted  # rows in ascending mileage order (kept by order-preserving subsets)
+
+    @classmethod
+    def from_comps(cls, comps: Sequence) -> "CompBatch":
+        """Build from Comp/RawComp objects (anything with the four comp attributes)."""
+        n = len(comps)
+        return cls(
+            np.fromiter((c.price for c in comps), dtype=np.float64, count=n),
+            np.fromiter((c.mileage for c in comps), dtype=np.int64, count=n),
+            np.fromiter((c.distance_km for c in comps), dtype=np.float64, count=n),
+            np.fromiter((c.days_old for c in comps), dtype=np.int64, count=n),
+        )
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict]) -> "CompBatch":
+        """Build from dicts with the four comp keys and an optional `id`."""
+        ids = [r.get("id") for r in records]
+        return cls(
+            [r["price"] for r in records],
+            [r["mileage"] for r in records],
+            [r["distance_km"] for r in records],
+            [r["days_old"] for r in records],
+            None if any(i is None for i in ids) else ids,
+        )
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def take(self, selector) -> "CompBatch":
+        """Subset by boolean mask or integer index array (ascending indices keep mileage order)."""
+        selector = np.asarray(selector)
+        keeps_order = selector.dtype == bool or len(selector) == 0 or (
+            selector[0] >= 0 and bool(np.all(selector[1:] >= selector[:-1])))
+        return CompBatch(self.price[selector], self.mileage[selector], self.distance_km[selector],
+                         self.days_old[selector], self.id[selector],
+                         self.mileage_sorted and keeps_order)
+
+    def sort_by_mileage(self) -> "CompBatch":
+        """The same comps in ascending mileage order (ties keep their order)."""
+        if self.mileage_sorted:
+            return self
+        batch = self.take(np.argsort(self.mileage, kind="stable"))
+        batch.mileage_sorted = True
+        return batch
+
+    def mileage_window(self, lo: float, hi: float) -> np.ndarray:
+        """Ascending positions of comps with lo <= mileage <= hi (binary search on mileage-sorted batches)."""
+        if self.mileage_sorted:
+            return np.arange(np.searchsorted(self.mileage, lo, side="left"),
+                             np.searchsorted(self.mileage, hi, side="right"))
+        return np.flatnonzero((self.mileage >= lo) & (self.mileage <= hi))
+
+    def records(self) -> List[Dict]:
+        """Rows as dicts with the comp fields (the same shape as vars(Comp))."""
+        return [{"price": p, "mileage": m, "distance_km": d, "days_old": a}
+                for p, m, d, a in zip(self.price.tolist(), self.mileage.tolist(),
+                                      self.distance_km.tolist(), self.days_old.tolist())]
+
+    def to_comps(self, comp_cls) -> list:
+        """Rows as `comp_cls` objects (e.g. RawComp or FilteredComp)."""
+        columns = [getattr(self, f).tolist() for f in COMP_FIELDS]
+        return [comp_cls(*row) for row in zip(*columns)]
+
+class RemovalLog:
+    """
+    Removal reasons recorded as (index array, reason) pairs.
+
+    Nothing per comp is built until the log is read; iterating or indexing
+    yields Removal objects in the order the filters recorded them.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._materialized = None
+
+    def add(self, removed_mask: np.ndarray, reason: str) -> None:
+        idx = np.flatnonzero(removed_mask)
+        if len(idx):
+            self._entries.append((idx, reason))
+            self._materialized = None
+
+    def extend(self, other: "RemovalLog") -> None:
+        self._entries.extend(other._entries)
+        self._materialized = None
+
+    def remap(self, positions: np.ndarray) -> "RemovalLog":
+        """A copy with indices mapped through `positions` (for logs recorded on a subset)."""
+        log = RemovalLog()
+        log._entries = [(positions[idx], reason) for idx, reason in self._entries]
+        return log
+
+    def __len__(self) -> int:
+        return sum(len(idx) for idx, _ in self._entries)
+
+    def _removals(self) -> list:
+        if self._materialized is None:
+            from engine.comps_filter import Removal
+            self._materialized = [Removal(i, reason) for idx, reason in self._entries for i in idx.tolist()]
+        return self._materialized
+
+    def __iter__(self):
+        return iter(self._removals())
+
+    def __getitem__(self, i):
+        return self._removals()[i]
+
+    def records(self) -> List[Dict]:
+        """Removals as dicts (the same shape as vars(Removal))."""
+        return [{"idx": i, "reason": reason} for idx, reason in self._entries for i in idx.tolist()]
+
+def as_comp_batch(comps) -> CompBatch:
+    """Accept a CompBatch, a list of comp objects or an iterable of comp objects."""
+    if isinstance(comps, CompBatch):
+        return comps
+    if not isinstance(comps, Sequence):
+        comps = list(comps)
+    return CompBatch.from_comps(comps)
+
+def median_mad(prices: np.ndarray):
+    """Median and median absolute deviation of a price column."""
+    median = float(np.median(prices))
+    return median, float(np.median(np.abs(prices - median)))
@@ -0,0 +1,266 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from engine.comp_batch import CompBatch, median_mad
+from engine.comp_store import haversine_km
+from engine.comps_filter import filter_comp_batch, mileage_window_steps
+
+def segment_key(make, model, year) -> Tuple[str, str, int]:
+    return (str(make).strip().upper(), str(model).strip().upper(), int(year))
+
+def zip3_of(zipcode) -> str:
+    return str(zipcode).strip().zfill(5)[:3]
+
+# Cached mileage-window summaries per cell group before the cache is reset
+MAX_WINDOW_SUMMARIES = 1024
+
+class _CellGroup:
+    """Listings of one segment around one zip3 centroid, with per-radius-step counts and cached summaries."""
+    __slots__ = ("members", "counts", "summaries", "stats", "batches", "windows")
+
+    def __init__(self, n_steps: int):
+        self.members: Dict = {}  # listing id -> distance_km to the zip3 centroid (insertion ordered)
+        self.counts = [0] * n_steps
+        self.summaries: Dict[int, Dict] = {}
+        self.stats: Dict[int, Dict] = {}
+        self.batches: Dict[int, Tuple] = {}  # step -> (batch, ascending mileage)
+        self.windows: Dict[Tuple, Dict] = {}  # (step, window start, window end, pct) -> summary
+
+    def invalidate(self):
+        self.summaries.clear()
+        self.stats.clear()
+        self.batches.clear()
+        self.windows.clear()
+
+class CompStatsCube:
+    """
+    Materialized comp statistics for hot segments, keyed by
+    make/model/year/zip3/radius step.
+
+    A cell holds the segment's listings within the radius step of the zip3
+    centroid. Adding, removing, expiring or aging listings updates cell
+    membership and counts (k) in place and marks the touched cells dirty;
+    median, MAD, freshness median and the filtered comp summary hybrid_price
+    needs are recomputed on the next read of a dirty cell and then served
+    from memory until the cell changes again.
+
+    The subject is placed at its zip3 centroid, so a hit returns exactly what
+    hybrid_price computes from the same segment's comps with distance_km
+    measured from that centroid. A subject mileage picks a contiguous range
+    of the cell's mileage-sorted comps; summaries are cached per radius step,
+    range and window pct, so subjects with nearby mileages share them.
+    Subjects outside the covered segments or
+    zip3s, or whose ladder never reaches min_k comps, are misses and
+    hybrid_price falls back to the raw comps.
+
+    Args:
+        zip3_centroids: zip3 -> (lat, lon) for the covered areas.
+        cfg: Weights config used by hybrid_price (radius ladder, comp filters).
+        segments: (make, model, year) tuples to cover; None covers every segment added.
+    """
+
+    def __init__(self, zip3_centroids: Dict[str, Tuple[float, float]], cfg: Dict,
+                 segments: Optional[Iterable[Tuple[str, str, int]]] = None):
+        self.cfg = cfg
+        self.radius_steps = [float(r) for r in cfg["filters"]["radius_steps_km"]]
+        self.min_k = cfg["filters"]["comps"]["min_k"]
+        self._zip3 = list(zip3_centroids)
+        self._zip3_set = set(self._zip3)
+        centroids = np.array([zip3_centroids[z] for z in self._zip3], dtype=np.float64).reshape(-1, 2)
+        self._lat, self._lon = centroids[:, 0], centroids[:, 1]
+        self._segments = None if segments is None else {segment_key(*s) for s in segments}
+        self._groups: Dict[Tuple, _CellGroup] = {}
+        self._listings: Dict = {}  # id -> [segment, price, mileage, days_old, zip3s]
+        self._lock = threading.RLock()
+        self._metrics = {"lookups": 0, "hits": 0, "computed": 0, "misses": {}}
+
+    def covers(self, make, model, year) -> bool:
+        return self._segments is None or segment_key(make, model, year) in self._segments
+
+    # --- incremental maintenance ---
+
+    def add(self, listing: Dict) -> bool:
+        """
+        Add or replace a listing (id, make, model, year, lat, lon, price, mileage, days_old).
+        Returns False when its segment is not covered.
+        """
+        if not self.covers(listing["make"], listing["model"], listing["year"]):
+            return False
+        with self._lock:
+            if listing["id"] in self._listings:
+                self.remove(listing["id"])
+            segment = segment_key(listing["make"], listing["model"], listing["year"])
+            distance = haversine_km(listing["lat"], listing["lon"], self._lat, self._lon)
+            zip3s = []
+            for i in np.flatnonzero(distance <= self.radius_steps[-1]).tolist():
+                group = self._groups.get((segment, self._zip3[i]))
+                if group is None:
+                    group = self._groups[(segment, self._zip3[i])] = _CellGroup(len(self.radius_steps))
+                d = float(distance[i])
+                group.members[listing["id"]] = d
+                for step, radius in enumerate(self.radius_steps):
+                    if d <= radius:
+                        group.counts[step] += 1
+                group.invalidate()
+                zip3s.append(self._zip3[i])
+            self._listings[listing["id"]] = [segment, float(listing["price"]), int(listing["mileage"]),
+                                             int(listing["days_old"]), zip3s]
+            return True
+
+    def remove(self, listing_id) -> bool:
+        """Drop a listing (sold or delisted). Returns False when it is not in the cube."""
+        with self._lock:
+            entry = self._listings.pop(listing_id, None)
+            if entry is None:
+                return False
+            segment, zip3s = entry[0], entry[4]
+            for zip3 in zip3s:
+                group = self._groups[(segment, zip3)]
+                d = group.members.pop(listing_id)
+                for step, radius in enumerate(self.radius_steps):
+                    if d <= radius:
+                        group.counts[step] -= 1
+                group.invalidate()
+                if not group.members:
+                    del self._groups[(segment, zip3)]
+            return True
+
+    def age(self, days: int = 1) -> None:
+        """Advance every listing's days_old (e.g. once per day)."""
+        with self._lock:
+            for entry in self._listings.values():
+                entry[3] += days
+            for group in self._groups.values():
+                group.invalidate()
+
+    def expire(self, max_days_old: int) -> int:
+        """Remove listings older than max_days_old; returns how many were removed."""
+        with self._lock:
+            stale = [i for i, entry in self._listings.items() if entry[3] > max_days_old]
+            for listing_id in stale:
+                self.remove(listing_id)
+            return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    # --- reads ---
+
+    def _batch(self, group: _CellGroup, radius: float) -> CompBatch:
+        ids = [i for i, d in group.members.items() if d <= radius]
+        rows = [self._listings[i] for i in ids]
+        return CompBatch([r[1] for r in rows], [r[2] for r in rows],
+                         [group.members[i] for i in ids], [r[3] for r in rows])
+
+    def cell(self, make, model, year, zip3: str, radius_km: float) -> Optional[Dict]:
+        """k, median, MAD and freshness median of one cell (unfiltered), or None if it is not materialized."""
+        with self._lock:
+            group = self._groups.get((segment_key(make, model, year), zip3))
+            if group is None or radius_km not in self.radius_steps:
+                return None
+            step = self.radius_steps.index(radius_km)
+            stats = group.stats.get(step)
+            if stats is None:
+                batch = self._batch(group, radius_km)
+                median, mad = median_mad(batch.price) if len(batch) else (None, None)
+                stats = group.stats[step] = {
+                    "k": group.counts[step],
+                    "median": median,
+                    "mad": mad,
+                    "freshness_median": float(np.median(batch.days_old)) if len(batch) else None,
+                }
+            return dict(stats)
+
+    def lookup(self, subject: Dict, cfg: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Selected/kept comps, removals and filter stats for the subject
+        (make, model, year, zip; optional mileage for the mileage window), or None on a miss.
+        """
+        with self._lock:
+            reason = None
+            if cfg is not None and cfg is not self.cfg and cfg != self.cfg:
+                reason = "config"
+            elif not self.covers(subject["make"], subject["model"], subject["year"]):
+                reason = "segment"
+            elif zip3_of(subject["zip"]) not in self._zip3_set:
+                reason = "zip3"
+            else:
+                group = self._groups.get((segment_key(subject["make"], subject["model"], subject["year"]),
+                                          zip3_of(subject["zip"])))
+                step = None if group is None else next(
+                    (s for s, k in enumerate(group.counts) if k >= self.min_k), None)
+                if step is None:
+                    reason = "sparse"
+            self._metrics["lookups"] += 1
+            if reason is not None:
+                self._metrics["misses"][reason] = self._metrics["misses"].get(reason, 0) + 1
+                return None
+            self._metrics["hits"] += 1
+            if subject.get("mileage") is not None:
+                summary = self._mileage_summary(group, step, subject["mileage"])
+            else:
+                summary = group.summaries.get(step)
+                if summary is None:
+                    self._metrics["computed"] += 1
+                    selected = self._batch(group, self.radius_steps[step])
+                    kept, removals, stats = filter_comp_batch(
+                        selected, self.cfg, self.cfg["filters"]["comps"]["max_mileage_delta_pct"])
+                    summary = group.summaries[step] = {"selected": selected, "kept": kept,
+                                                       "removals": removals, "stats": stats}
+            return {**summary, "stats": dict(summary["stats"])}
+
+    def _sorted_batch(self, group: _CellGroup, step: int) -> Tuple[CompBatch, np.ndarray]:
+        entry = group.batches.get(step)
+        if entry is None:
+            batch = self._batch(group, self.radius_steps[step])
+            entry = group.batches[step] = (batch, np.sort(batch.mileage, kind="stable"))
+        return entry
+
+    def _mileage_summary(self, group: _CellGroup, step: int, subject_mileage: float) -> Dict:
+        # Radius step: the first holding min_k comps inside the window (else the cell's own step), as
+        # in select_comps. The window's comps are a contiguous range of the step's sorted mileages,
+        # so (step, range, pct) determines the filtered summary.
+        pct = self.cfg["filters"]["comps"]["max_mileage_delta_pct"]
+        lo, hi = subject_mileage - pct * subject_mileage, subject_mileage + pct * subject_mileage
+        for s in range(len(self.radius_steps)):
+            mileage = self._sorted_batch(group, s)[1]
+            if np.searchsorted(mileage, hi, side="right") - np.searchsorted(mileage, lo, side="left") >= self.min_k:
+                step = s
+                break
+        batch, mileage = self._sorted_batch(group, step)
+        key = (step, None, None, None)
+        for window_pct in mileage_window_steps(self.cfg, pct):
+            delta = window_pct * subject_mileage
+            start = int(np.searchsorted(mileage, subject_mileage - delta, side="left"))
+            end = int(np.searchsorted(mileage, subject_mileage + delta, side="right"))
+            if end - start >= self.min_k:
+                key = (step, start, end, window_pct)
+                break
+        summary = group.windows.get(key)
+        if summary is None:
+            self._metrics["computed"] += 1
+            kept, removals, stats = filter_comp_batch(batch, self.cfg, pct, subject_mileage)
+            if len(group.windows) >= MAX_WINDOW_SUMMARIES:
+                group.windows.clear()
+            summary = group.windows[key] = {"selected": batch, "kept": kept, "removals": removals, "stats": stats}
+        return summary
+
+    def metrics(self) -> Dict:
+        """
+        Lookups, hits, misses by reason (config, segment, zip3, sparse) and hit
+        rate; `computed` counts hits that ran the filter ladder instead of
+        reading a cached summary.
+        """
+        with self._lock:
+            lookups = self._metrics["lookups"]
+            return {
+                "lookups": lookups,
+                "hits": self._metrics["hits"],
+                "computed": self._metrics["computed"],
+                "misses": dict(self._metrics["misses"]),
+                "hit_rate": self._metrics["hits"] / lookups if lookups else 0.0,
+                "listings": len(self._listings),
+                "cells": len(self._groups) * len(self.radius_steps),
+            }
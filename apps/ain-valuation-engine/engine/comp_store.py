@@ -0,0 +1,80 @@
+from typing import Dict, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from engine.comp_batch import CompBatch
+
+EARTH_RADIUS_KM = 6371.0088
+# Radius queries run on chord length; widen it slightly so float error never drops a comp at the edge
+_CHORD_SLACK = 1.0 + 1e-9
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km (vectorized over either side)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class SpatialCompStore:
+    """
+    Comps indexed by location for radius-ladder retrieval.
+
+    Locations are stored as unit vectors in a KD-tree, so "within r km of the
+    subject" is a ball query on chord length. Only the candidates it returns
+    get a haversine distance; results are CompBatch objects with distance_km
+    filled in and `id` set to the store's comp ids.
+    """
+
+    def __init__(self, lat, lon, price, mileage, days_old, id=None):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.price = np.ascontiguousarray(price, dtype=np.float64)
+        self.mileage = np.ascontiguousarray(mileage, dtype=np.int64)
+        self.days_old = np.ascontiguousarray(days_old, dtype=np.int64)
+        self.id = np.arange(len(self.lat), dtype=np.int64) if id is None else np.ascontiguousarray(id, dtype=np.int64)
+        self._tree = cKDTree(_unit_vectors(self.lat, self.lon), balanced_tree=False, compact_nodes=False)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict]) -> "SpatialCompStore":
+        """Build from listing dicts with lat, lon, price, mileage, days_old and an optional id."""
+        ids = [r.get("id") for r in records]
+        return cls(
+            [r["lat"] for r in records],
+            [r["lon"] for r in records],
+            [r["price"] for r in records],
+            [r["mileage"] for r in records],
+            [r["days_old"] for r in records],
+            None if any(i is None for i in ids) else ids,
+        )
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _batch(self, idx: np.ndarray, distance_km: np.ndarray) -> CompBatch:
+        return CompBatch(self.price[idx], self.mileage[idx], distance_km, self.days_old[idx], self.id[idx])
+
+    def within(self, lat: float, lon: float, radius_km: float) -> CompBatch:
+        """Comps within radius_km of (lat, lon), in store order."""
+        chord = 2.0 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2.0) * _CHORD_SLACK
+        idx = np.asarray(self._tree.query_ball_point(_unit_vectors(lat, lon)[0], chord, return_sorted=True),
+                         dtype=np.intp)
+        distance = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        keep = distance <= radius_km
+        return self._batch(idx[keep], distance[keep])
+
+    def nearest(self, lat: float, lon: float, k: int) -> CompBatch:
+        """The k nearest comps, closest first (ties in store order)."""
+        k = min(k, len(self))
+        if k == 0:
+            return self._batch(np.empty(0, dtype=np.intp), np.empty(0))
+        _, idx = self._tree.query(_unit_vectors(lat, lon)[0], k=k)
+        idx = np.atleast_1d(idx).astype(np.intp)
+        distance = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        order = np.lexsort((idx, distance))
+        return self._batch(idx[order], distance[order])
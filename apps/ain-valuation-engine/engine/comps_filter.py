@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 import numpy as np
+from engine.comp_batch import CompBatch, RemovalLog, median_mad
 
 @dataclass
 class RawComp:
@@ -21,9 +22,20 @@ class Removal:
     idx: int
     reason: str
 
+def _quartiles(prices: np.ndarray) -> Tuple[float, float]:
+    # np.percentile(prices, [25, 75]) ("linear" method) from one sort, without its per-call overhead
+    sorted_prices = np.sort(prices)
+    pos = np.array([0.25, 0.75]) * (len(sorted_prices) - 1)
+    lo = pos.astype(np.intp)
+    hi = np.minimum(lo + 1, len(sorted_prices) - 1)
+    t = pos - lo
+    a, b = sorted_prices[lo], sorted_prices[hi]
+    diff = b - a
+    q = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return q[0], q[1]
+
 def iqr_filter(prices: np.ndarray, mult: float) -> np.ndarray:
-    q1 = np.percentile(prices, 25)
-    q3 = np.percentile(prices, 75)
+    q1, q3 = _quartiles(prices)
     iqr = q3 - q1
     lo = q1 - mult * iqr
     hi = q3 + mult * iqr
@@ -35,67 +47,110 @@ def mad_filter(prices: np.ndarray, mult: float) -> np.ndarray:
     z = np.abs(prices - med) / mad
     return z <= mult
 
-def filter_comps(
-    comps: List[RawComp],
-    cfg: Dict,
-    max_mileage_delta_pct: float,
-) -> Tuple[List[FilteredComp], List[Removal], Dict]:
+# Widening steps for the mileage window, as multiples of max_mileage_delta_pct
+MILEAGE_WIDEN_FACTORS = (1.0, 1.5, 2.0, 3.0)
+
+def mileage_window_steps(cfg: Dict, max_mileage_delta_pct: float) -> List[float]:
+    """Mileage delta percentages tried in order (filters.comps.mileage_widen_factors)."""
+    factors = cfg["filters"]["comps"].get("mileage_widen_factors", MILEAGE_WIDEN_FACTORS)
+    return [max_mileage_delta_pct * f for f in factors]
+
+def mileage_window(batch: CompBatch, subject_mileage: float, steps: Sequence[float],
+                   min_k: int) -> Tuple[Optional[np.ndarray], Optional[float]]:
     """
-    Applies deterministic filter ladder:
-      1) Drop stale (older than min_freshness_days) when there are alternatives
-      2) Drop mileage outliers vs subject mileage window
-      3) Apply IQR or MAD on price
-    Returns kept comps, removals with reasons, and stats.
+    Positions of comps within subject_mileage +/- pct for the first pct in
+    `steps` that keeps at least min_k comps, and that pct; (None, None) when
+    no step does. Mileage-sorted batches use binary search.
     """
-    rem: List[Removal] = []
-    if not comps:
-        return [], rem, {"kept": 0, "median": None, "mad": None}
-
-    prices = np.array([c.price for c in comps], dtype=float)
-    kept = np.ones(len(comps), dtype=bool)
-
-    # 1) Age filter (prefer fresher comps if we have many)
-    min_fresh = cfg["filters"]["comps"]["min_freshness_days"]
-    days = np.array([c.days_old for c in comps], dtype=float)
-    many = len(comps) >= cfg["filters"]["comps"]["min_k"] * 2
-    if many:
-        mask = days <= min_fresh
-        if mask.sum() >= cfg["filters"]["comps"]["min_k"]:
-            kept &= mask
-            for i, ok in enumerate(mask):
-                if not ok:
-                    rem.append(Removal(i, f"stale>{min_fresh}d"))
+    for pct in steps:
+        delta = pct * subject_mileage
+        positions = batch.mileage_window(subject_mileage - delta, subject_mileage + delta)
+        if len(positions) >= min_k:
+            return positions, pct
+    return None, None
 
-    # 2) Mileage window is enforced by caller during retrieval (subject-aware).
-    # Here we optionally do a very coarse screen if caller passed a window as delta pct.
-    # (This requires caller to pass subject mileage via closure or external check.)
-    # For reproducibility, we leave mileage screen to upstream collector.
+def _age_and_price_ladder(batch: CompBatch, fcfg: Dict) -> Tuple[np.ndarray, RemovalLog]:
+    rem = RemovalLog()
+    kept = np.ones(len(batch), dtype=bool)
 
-    # 3) Price outlier filter
-    fcfg = cfg["filters"]["comps"]
+    # Age filter (prefer fresher comps if we have many)
+    min_fresh = fcfg["min_freshness_days"]
+    if len(batch) >= fcfg["min_k"] * 2:
+        mask = batch.days_old <= min_fresh
+        if np.count_nonzero(mask) >= fcfg["min_k"]:
+            kept &= mask
+            rem.add(~mask, f"stale>{min_fresh}d")
+
+    # Price outlier filter
     if fcfg["outlier_filter"].upper() == "IQR":
-        mask = iqr_filter(prices, fcfg["iqr_multiplier"])
+        mask = iqr_filter(batch.price, fcfg["iqr_multiplier"])
     else:
-        mask = mad_filter(prices, fcfg["mad_multiplier"])
-
+        mask = mad_filter(batch.price, fcfg["mad_multiplier"])
     kept &= mask
-    for i, ok in enumerate(mask):
-        if not ok:
-            rem.append(Removal(i, "price_outlier"))
-
-    # Build results
-    kept_idx = np.where(kept)[0].tolist()
-    kept_comps = [FilteredComp(**vars(comps[i])) for i in kept_idx]
-
-    if kept_comps:
-        kept_prices = np.array([c.price for c in kept_comps], dtype=float)
-        med = float(np.median(kept_prices))
-        mad = float(np.median(np.abs(kept_prices - med)))
-        stats = {"kept": len(kept_comps), "median": med, "mad": mad}
+    rem.add(~mask, "price_outlier")
+    return kept, rem
+
+def filter_comp_batch(
+    batch: CompBatch,
+    cfg: Dict,
+    max_mileage_delta_pct: float,
+    subject_mileage: Optional[float] = None,
+) -> Tuple[CompBatch, RemovalLog, Dict]:
+    """
+    Applies deterministic filter ladder as masks over a CompBatch:
+      1) With a subject mileage, keep comps within subject +/- pct mileage,
+         widening pct (mileage_widen_factors) until min_k comps remain; if no
+         step keeps min_k, every comp stays in
+      2) Drop stale (older than min_freshness_days) when there are alternatives
+      3) Apply IQR or MAD on price over the remaining candidates
+    Returns the kept batch, removals (positions in `batch`) with reasons, and
+    stats (plus the mileage_delta_pct used when a subject mileage is given).
+    """
+    rem = RemovalLog()
+    if len(batch) == 0:
+        return batch, rem, {"kept": 0, "median": None, "mad": None}
+
+    fcfg = cfg["filters"]["comps"]
+
+    # 1) Subject mileage window: cuts candidates before the age and price filters
+    candidates, positions, window_pct = batch, None, None
+    if subject_mileage is not None:
+        positions, window_pct = mileage_window(batch, subject_mileage,
+                                               mileage_window_steps(cfg, max_mileage_delta_pct), fcfg["min_k"])
+        if positions is not None and len(positions) < len(batch):
+            inside = np.zeros(len(batch), dtype=bool)
+            inside[positions] = True
+            rem.add(~inside, f"mileage_delta>{window_pct:g}")
+            candidates = batch.take(inside)
+
+    # 2) + 3) on the candidates, removals mapped back to positions in `batch`
+    kept, ladder_rem = _age_and_price_ladder(candidates, fcfg)
+    rem.extend(ladder_rem if candidates is batch else ladder_rem.remap(positions))
+
+    kept_batch = candidates.take(kept)
+    if len(kept_batch):
+        med, mad = median_mad(kept_batch.price)
+        stats = {"kept": len(kept_batch), "median": med, "mad": mad}
     else:
         stats = {"kept": 0, "median": None, "mad": None}
+    if subject_mileage is not None:
+        stats["mileage_delta_pct"] = window_pct
+    return kept_batch, rem, stats
 
-    # Append reasons for any comps dropped due to mileage if your upstream used it
-    # (pass-through from upstream can add to `rem` before calling this function).
-
-    return kept_comps, rem, stats
+def filter_comps(
+    comps: List[RawComp],
+    cfg: Dict,
+    max_mileage_delta_pct: float,
+    subject_mileage: Optional[float] = None,
+) -> Tuple[List[FilteredComp], List[Removal], Dict]:
+    """
+    List interface to filter_comp_batch: returns kept comps as FilteredComp,
+    removals with reasons, and stats. A CompBatch is filtered without
+    conversion and returns (CompBatch, RemovalLog, stats).
+    """
+    if isinstance(comps, CompBatch):
+        return filter_comp_batch(comps, cfg, max_mileage_delta_pct, subject_mileage)
+    if not comps:
+        return [], [], {"kept": 0, "median": None, "mad": None}
+    kept, rem, stats = filter_comp_batch(CompBatch.from_comps(comps), cfg, max_mileage_delta_pct, subject_mileage)
+    return kept.to_comps(FilteredComp), list(rem), stats
@@ -1,14 +1,54 @@
-from typing import List
+from typing import List, Optional, Tuple
+import numpy as np
 from engine.comps_filter import RawComp
+from engine.comp_batch import CompBatch
 
-def select_comps(comps: List[RawComp], subject_mileage: int, cfg: dict) -> List[RawComp]:
-    # Example: Try tight radius, then relax, then filter by mileage window
-    # Pseudocode—adapt as needed for your business rules!
-    radius_steps = cfg["filters"]["radius_steps_km"]
+def select_comp_indices(distance_km: np.ndarray, radius_steps, min_k: int, eligible: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Positions selected by the radius ladder: the first radius with >= min_k comps, else the min_k nearest.
+    With an `eligible` mask (e.g. the subject's mileage window) a radius must hold min_k eligible comps;
+    when none does, the plain ladder applies.
+    """
+    if eligible is not None:
+        for radius in radius_steps:
+            mask = distance_km <= radius
+            if np.count_nonzero(mask & eligible) >= min_k:
+                return np.flatnonzero(mask)
     for radius in radius_steps:
-        selected = [c for c in comps if c.distance_km <= radius]
-        # Optionally: filter on mileage window here
-        if len(selected) >= cfg["filters"]["comps"]["min_k"]:
+        mask = distance_km <= radius
+        if np.count_nonzero(mask) >= min_k:
+            return np.flatnonzero(mask)
+    return np.argsort(distance_km, kind="stable")[:min_k]
+
+def select_comps(comps, subject_mileage: int, cfg: dict, mileage_window: Optional[Tuple[float, float]] = None):
+    # Try tight radius, then relax; the mileage window itself is applied by the filter ladder.
+    # With mileage_window (lo, hi) the ladder relaxes until a radius holds min_k comps inside it.
+    # Accepts a CompBatch (returns a CompBatch) or a list of comps (returns the selected comps).
+    radius_steps = cfg["filters"]["radius_steps_km"]
+    min_k = cfg["filters"]["comps"]["min_k"]
+    if isinstance(comps, CompBatch):
+        eligible = None
+        if mileage_window is not None:
+            eligible = np.zeros(len(comps), dtype=bool)
+            eligible[comps.mileage_window(*mileage_window)] = True
+        return comps.take(select_comp_indices(comps.distance_km, radius_steps, min_k, eligible))
+    distance_km = np.fromiter((c.distance_km for c in comps), dtype=np.float64, count=len(comps))
+    eligible = None
+    if mileage_window is not None:
+        mileage = np.fromiter((c.mileage for c in comps), dtype=np.float64, count=len(comps))
+        eligible = (mileage >= mileage_window[0]) & (mileage <= mileage_window[1])
+    return [comps[i] for i in select_comp_indices(distance_km, radius_steps, min_k, eligible).tolist()]
+
+def select_comps_near(store, subject_lat: float, subject_lon: float, cfg: dict) -> CompBatch:
+    """
+    Radius ladder against a SpatialCompStore: nested range queries around the
+    subject, so distances are computed only for comps inside each radius.
+    Same selection as select_comps over the store's comps with distance_km
+    measured from the subject.
+    """
+    min_k = cfg["filters"]["comps"]["min_k"]
+    for radius in cfg["filters"]["radius_steps_km"]:
+        selected = store.within(subject_lat, subject_lon, radius)
+        if len(selected) >= min_k:
             return selected
-    # Fallback: return as many as possible
-    return sorted(comps, key=lambda c: c.distance_km)[:cfg["filters"]["comps"]["min_k"]]
+    return store.nearest(subject_lat, subject_lon, min_k)
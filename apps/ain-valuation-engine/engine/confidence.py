@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
 
 @dataclass
 class ConfidenceInputs:
@@ -11,54 +13,192 @@ class ConfidenceInputs:
     condition_available: bool
     method_tag: str              # "live" | "blended" | "fallback_pricing"
 
+LABELS = ("High", "Medium", "Low")
+_LABEL_CODE = {label: code for code, label in enumerate(LABELS)}
+# Component weights: comps, freshness, dispersion, completeness, history, condition
+COMPONENT_WEIGHTS = (0.25, 0.20, 0.20, 0.15, 0.10, 0.10)
+# Score level reached at each breakpoint (divided by 3 into [0..1])
+SEGMENT_LEVELS = (0.0, 1.0, 2.0, 3.0)
+
 def _clamp(x, lo, hi):
     return max(lo, min(hi, x))
 
-def _piecewise_score(x: float, breaks, increasing=True) -> float:
-    b = breaks
-    x = _clamp(x, b[0], b[-1])
-    if x <= b[1]:
-        t = (x - b[0]) / (b[1] - b[0] + 1e-9)
-        s = t
-    elif x <= b[2]:
-        t = (x - b[1]) / (b[2] - b[1] + 1e-9)
-        s = 1.0 + t  # 1..2
-    else:
-        t = (x - b[2]) / (b[3] - b[2] + 1e-9)
-        s = 2.0 + t  # 2..3
-    s = s / 3.0
-    return s if increasing else (1.0 - s)
+def _frozen(values, dtype=np.float64) -> np.ndarray:
+    a = np.array(values, dtype=dtype)
+    a.flags.writeable = False
+    return a
 
-def confidence_score(cfg: Dict, cin: ConfidenceInputs) -> float:
-    r = cfg["reliability"]
-    s_k   = _piecewise_score(cin.k_comps,           r["k_comps_breakpoints"],           True)
-    s_fr  = _piecewise_score(cin.freshness_days_med,r["freshness_days_breakpoints"],    False)
-    s_mad = _piecewise_score(cin.dispersion_mad,    r["dispersion_mad_breakpoints"],    False)
-    s_cmp = _clamp(cin.completeness, 0.0, 1.0)
-    s_hist= 1.0 if cin.history_verified else 0.6
-    s_cond= 1.0 if cin.condition_available else 0.7
+@dataclass(frozen=True)
+class PiecewiseMap:
+    """
+    Three-segment linear map of x into a score over 4 breakpoints.
+
+    x is clamped to [knots[0], knots[-1]]; within segment i the score runs from
+    levels[i] to levels[i+1], then is divided by 3 (and flipped for decreasing
+    maps). Works on scalars (plain float math) and arrays (NumPy) with
+    identical results.
+    """
+    knots: np.ndarray      # 4 breakpoints
+    levels: np.ndarray     # 4 score levels
+    denom: np.ndarray      # segment widths (+1e-9)
+    increasing: bool
+
+    @classmethod
+    def compile(cls, breaks: Sequence[float], increasing: bool = True,
+                levels: Sequence[float] = SEGMENT_LEVELS) -> "PiecewiseMap":
+        b = list(breaks)
+        return cls(
+            knots=_frozen(b),
+            levels=_frozen(levels),
+            denom=_frozen([(b[i + 1] - b[i]) + 1e-9 for i in range(3)]),
+            increasing=increasing,
+        )
+
+    def __post_init__(self):
+        # Plain floats for the per-valuation path
+        object.__setattr__(self, "_segments", tuple(
+            (float(self.knots[i]), float(self.levels[i]), float(self.levels[i + 1] - self.levels[i]), float(self.denom[i]))
+            for i in range(3)))
+        object.__setattr__(self, "_bounds", (float(self.knots[0]), float(self.knots[1]),
+                                             float(self.knots[2]), float(self.knots[3])))
+
+    def scalar(self, x: float) -> float:
+        b0, b1, b2, b3 = self._bounds
+        x = _clamp(x, b0, b3)
+        knot, level, slope, denom = self._segments[0 if x <= b1 else 1 if x <= b2 else 2]
+        t = (x - knot) / denom
+        s = (level + slope * t) / 3.0
+        return s if self.increasing else (1.0 - s)
+
+    def __call__(self, x) -> np.ndarray:
+        b = self.knots
+        x = np.clip(np.asarray(x, dtype=np.float64), b[0], b[3])
+        i = np.searchsorted(b[1:3], x, side="left")
+        t = (x - b[i]) / self.denom[i]
+        s = (self.levels[i] + (self.levels[i + 1] - self.levels[i]) * t) / 3.0
+        return s if self.increasing else (1.0 - s)
+
+@dataclass(frozen=True)
+class ConfidenceEngine:
+    """
+    Confidence scoring, labeling and banding compiled from a weights config
+    (reliability breakpoints, label thresholds, fallback cap, band percentages).
+
+    Build once with ConfidenceEngine.from_config (or compiled_confidence for a
+    cached instance); scores(), labels() and bands() take arrays of N
+    valuations, score()/label()/band() are the per-valuation fast paths.
+    """
+    k_comps: PiecewiseMap
+    freshness: PiecewiseMap
+    dispersion: PiecewiseMap
+    high_threshold: float
+    medium_threshold: float
+    fallback_cap: float
+    bands_pct: np.ndarray  # rows High, Medium, Low: (low_pct, high_pct)
+
+    @classmethod
+    def from_config(cls, cfg: Dict, levels: Sequence[float] = SEGMENT_LEVELS) -> "ConfidenceEngine":
+        # cfg is the full weights config, or a bare reliability section (no labels/bands)
+        r = cfg["reliability"] if "reliability" in cfg else cfg
+        c = cfg.get("confidence")
+        bands = c["bands_pct"] if c is not None else {}
+        return cls(
+            k_comps=PiecewiseMap.compile(r["k_comps_breakpoints"], True, levels),
+            freshness=PiecewiseMap.compile(r["freshness_days_breakpoints"], False, levels),
+            dispersion=PiecewiseMap.compile(r["dispersion_mad_breakpoints"], False, levels),
+            high_threshold=float(c["high_threshold"]) if c is not None else np.nan,
+            medium_threshold=float(c["medium_threshold"]) if c is not None else np.nan,
+            fallback_cap=float(c["cap_low_confidence"]) if c is not None else 1.0,
+            bands_pct=_frozen([bands.get(key, (np.nan, np.nan)) for key in ("high", "medium", "low")]),
+        )
+
+    # --- per valuation ---
 
-    raw = 0.25*s_k + 0.20*s_fr + 0.20*s_mad + 0.15*s_cmp + 0.10*s_hist + 0.10*s_cond
-    score = _clamp(raw, 0.0, 1.0)
+    def raw_score(self, k_comps, freshness_days, dispersion_mad, completeness,
+                  history_verified: bool, condition_available: bool) -> float:
+        """Weighted components clamped to [0..1]; completeness is used as given."""
+        w_k, w_fr, w_mad, w_cmp, w_hist, w_cond = COMPONENT_WEIGHTS
+        raw = (w_k * self.k_comps.scalar(k_comps) + w_fr * self.freshness.scalar(freshness_days)
+               + w_mad * self.dispersion.scalar(dispersion_mad) + w_cmp * completeness
+               + w_hist * (1.0 if history_verified else 0.6) + w_cond * (1.0 if condition_available else 0.7))
+        return float(_clamp(raw, 0.0, 1.0))
 
-    # Method-level caps
-    if cin.method_tag == "fallback_pricing":
-        score = min(score, cfg["confidence"]["cap_low_confidence"])  # e.g., 0.60
+    def score(self, cin: ConfidenceInputs) -> float:
+        score = self.raw_score(cin.k_comps, cin.freshness_days_med, cin.dispersion_mad,
+                               _clamp(cin.completeness, 0.0, 1.0), cin.history_verified, cin.condition_available)
+        # Method-level caps
+        if cin.method_tag == "fallback_pricing":
+            score = min(score, self.fallback_cap)
+        return float(score)
 
-    return float(score)
+    def label(self, score: float) -> str:
+        if score >= self.high_threshold: return "High"
+        if score >= self.medium_threshold: return "Medium"
+        return "Low"
+
+    def band(self, price: float, label: str) -> Tuple[float, float]:
+        lo_pct, hi_pct = self.bands_pct[_LABEL_CODE[label]]
+        return float(price * (1.0 - float(lo_pct))), float(price * (1.0 + float(hi_pct)))
+
+    # --- N valuations ---
+
+    def raw_scores(self, k_comps, freshness_days, dispersion_mad, completeness,
+                   history_verified, condition_available) -> np.ndarray:
+        w_k, w_fr, w_mad, w_cmp, w_hist, w_cond = COMPONENT_WEIGHTS
+        raw = (w_k * self.k_comps(k_comps) + w_fr * self.freshness(freshness_days)
+               + w_mad * self.dispersion(dispersion_mad) + w_cmp * np.asarray(completeness, dtype=np.float64)
+               + w_hist * np.where(history_verified, 1.0, 0.6) + w_cond * np.where(condition_available, 1.0, 0.7))
+        return np.clip(raw, 0.0, 1.0)
+
+    def scores(self, k_comps, freshness_days, dispersion_mad, completeness=1.0,
+               history_verified=True, condition_available=True, method_tag="blended") -> np.ndarray:
+        """Confidence scores for N valuations; any argument may be a scalar broadcast over the others."""
+        score = self.raw_scores(k_comps, freshness_days, dispersion_mad,
+                                np.clip(np.asarray(completeness, dtype=np.float64), 0.0, 1.0),
+                                history_verified, condition_available)
+        capped = np.asarray(method_tag, dtype=object) == "fallback_pricing"
+        return np.where(capped, np.minimum(score, self.fallback_cap), score)
+
+    def label_codes(self, scores) -> np.ndarray:
+        """0 = High, 1 = Medium, 2 = Low."""
+        scores = np.asarray(scores, dtype=np.float64)
+        return np.where(scores >= self.high_threshold, 0, np.where(scores >= self.medium_threshold, 1, 2))
+
+    def labels(self, scores) -> np.ndarray:
+        return np.asarray(LABELS, dtype=object)[self.label_codes(scores)]
+
+    def bands(self, prices, labels) -> Tuple[np.ndarray, np.ndarray]:
+        """(low, high) bands for N prices; labels are label strings or label codes."""
+        labels = np.asarray(labels)
+        codes = labels if labels.dtype.kind in "iu" else np.vectorize(_LABEL_CODE.__getitem__, otypes=[np.intp])(labels)
+        pct = self.bands_pct[codes]
+        prices = np.asarray(prices, dtype=np.float64)
+        return prices * (1.0 - pct[..., 0]), prices * (1.0 + pct[..., 1])
+
+_COMPILED: Dict[Tuple[int, Tuple[float, ...]], Tuple[Dict, ConfidenceEngine]] = {}
+_COMPILED_MAX = 64
+
+def compiled_confidence(cfg: Dict, levels: Sequence[float] = SEGMENT_LEVELS) -> ConfidenceEngine:
+    """
+    ConfidenceEngine for a config dict, compiled on first use and cached per
+    dict object. A config mutated in place after its first use keeps its old
+    engine; pass a new dict (or call ConfidenceEngine.from_config) instead.
+    """
+    key = (id(cfg), tuple(levels))
+    entry = _COMPILED.get(key)
+    if entry is not None and entry[0] is cfg:
+        return entry[1]
+    engine = ConfidenceEngine.from_config(cfg, levels)
+    if len(_COMPILED) >= _COMPILED_MAX:
+        _COMPILED.clear()
+    _COMPILED[key] = (cfg, engine)  # holds cfg so its id is not reused while cached
+    return engine
+
+def confidence_score(cfg: Dict, cin: ConfidenceInputs) -> float:
+    return compiled_confidence(cfg).score(cin)
 
 def confidence_label(cfg: Dict, score: float) -> str:
-    hi = cfg["confidence"]["high_threshold"]
-    md = cfg["confidence"]["medium_threshold"]
-    if score >= hi: return "High"
-    if score >= md: return "Medium"
-    return "Low"
+    return compiled_confidence(cfg).label(score)
 
 def band_from_label(cfg: Dict, price: float, label: str):
-    bands = cfg["confidence"]["bands_pct"]
-    lo_pct, hi_pct = {
-        "High": bands["high"],
-        "Medium": bands["medium"],
-        "Low": bands["low"],
-    }[label]
-    return float(price * (1.0 - lo_pct)), float(price * (1.0 + hi_pct))
+    return compiled_confidence(cfg).band(price, label)
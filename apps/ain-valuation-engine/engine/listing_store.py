@@ -0,0 +1,333 @@
+"""
+Persistent columnar store of market listings, partitioned by make/model/year.
+
+Layout (one directory per partition, Parquet part files inside):
+
+    <root>/make=TOYOTA/model=CAMRY/year=2019/part-<time_ns>-<uuid>.parquet
+
+Ingestion is append-only: append() writes one new part file per touched
+partition (written under a temporary name, then renamed, so readers never see
+a partial file). compact() rewrites a partition's parts into one file sorted
+by mileage with duplicate listings removed (same VIN, or the same
+source/year/trim/price/mileage/city when there is no VIN; the newest copy
+wins), then deletes the parts it read. The compacted file lists the parts it
+supersedes in its Parquet metadata and readers skip those, so a scan running
+alongside compaction sees either the old parts or the compacted file, never
+both; a scan whose files are deleted under it lists the partition again. Run
+compaction from one process at a time; appends and reads may continue while
+it runs.
+
+Reads go through scan(): partitions are pruned by make/model/year from the
+directory names, files are memory-mapped, and trim/mileage predicates are
+pushed into the Parquet scan (mileage-sorted row groups let compacted files
+skip whole row groups). comps_for() turns a subject into a CompBatch for
+hybrid_price; val_engine.market.compute_market_anchor reads cohorts the same
+way instead of loading merged JSON files.
+
+Example:
+    >>> store = ListingStore("in_out/comp_store")
+    >>> store.append(listings)
+    >>> store.compact()
+    >>> table = store.scan("TOYOTA", "CAMRY", year=(2018, 2020), mileage=(30000, 60000))
+"""
+import datetime as dt
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from engine.comp_batch import CompBatch
+from engine.comp_stats_cube import segment_key
+from engine.comp_store import haversine_km
+from engine.comps_filter import mileage_window_steps
+
+SCHEMA = pa.schema([
+    ("make", pa.string()),
+    ("model", pa.string()),
+    ("year", pa.int32()),
+    ("trim", pa.string()),
+    ("price", pa.float64()),
+    ("mileage", pa.int64()),
+    ("vin", pa.string()),
+    ("source", pa.string()),
+    ("city", pa.string()),
+    ("state", pa.string()),
+    ("zip", pa.string()),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("listed_on", pa.date32()),
+])
+_STRINGS = ("trim", "vin", "source", "city", "state", "zip")
+ROW_GROUP_SIZE = 16384
+COMPACTED_SUFFIX = ".compact.parquet"
+SUPERSEDED_KEY = b"superseded"  # compacted file metadata: JSON list of the part names it replaces
+READ_ATTEMPTS = 3  # listings retried when a compaction deletes files under a reader
+
+Range = Tuple[Optional[float], Optional[float]]
+
+def _part_name(compacted: bool = False) -> str:
+    return f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}" + (COMPACTED_SUFFIX if compacted else ".parquet")
+
+def _live_parts(directory: str) -> List[str]:
+    """Part files of one partition directory, without those superseded by a compacted file."""
+    paths = glob.glob(os.path.join(directory, "part-*.parquet"))
+    superseded = set()
+    for path in paths:
+        if path.endswith(COMPACTED_SUFFIX):
+            metadata = pq.read_schema(path, memory_map=True).metadata or {}
+            superseded.update(json.loads(metadata.get(SUPERSEDED_KEY, b"[]")))
+    return [p for p in paths if os.path.basename(p) not in superseded]
+
+def _listed_on(record: Dict, today: dt.date) -> Optional[dt.date]:
+    value = record.get("listed_on")
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date):
+        return value
+    if value:
+        return dt.date.fromisoformat(str(value)[:10])
+    if record.get("days_old") is not None:
+        return today - dt.timedelta(days=int(record["days_old"]))
+    return None
+
+def _optional_float(value) -> Optional[float]:
+    return None if value is None or value == "" else float(value)
+
+def _dedupe_key(row: Dict) -> tuple:
+    vin = (row["vin"] or "").strip().upper()
+    if vin:
+        return ("VIN", vin)
+    return ("CMP", (row["source"] or "").strip().lower(), row["year"], (row["trim"] or "").strip().upper(),
+            None if row["price"] is None else int(row["price"]), row["mileage"], (row["city"] or "").strip().upper())
+
+def _range_expr(field: str, bounds: Range):
+    lo, hi = bounds
+    expr = None
+    if lo is not None:
+        expr = ds.field(field) >= lo
+    if hi is not None:
+        expr = ds.field(field) <= hi if expr is None else expr & (ds.field(field) <= hi)
+    return expr
+
+def trim_family_expr(target_trim: str):
+    """Listings whose trim shares the first two characters with target_trim (the market anchor's trim family)."""
+    prefix = target_trim[:2]
+    if len(prefix) < 2:
+        return ds.field("trim") == prefix
+    return pc.starts_with(ds.field("trim"), pattern=prefix)
+
+class ListingStore:
+    """
+    Parquet listing store under `root`, partitioned by make/model/year.
+
+    Args:
+        root: Store directory (created on first append).
+        row_group_size: Rows per Parquet row group in compacted files.
+    """
+
+    def __init__(self, root: str, row_group_size: int = ROW_GROUP_SIZE):
+        self.root = root
+        self.row_group_size = row_group_size
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+        self._compact_lock = threading.Lock()
+
+    # --- layout ---
+
+    def _partition_dir(self, make: str, model: str, year: int) -> str:
+        return os.path.join(self.root, f"make={quote(make, safe='')}", f"model={quote(model, safe='')}",
+                            f"year={int(year)}")
+
+    def partitions(self) -> Iterator[Tuple[str, str, int]]:
+        """(make, model, year) of every partition with data."""
+        for path in sorted(glob.glob(os.path.join(self.root, "make=*", "model=*", "year=*"))):
+            if glob.glob(os.path.join(path, "part-*.parquet")):
+                make_dir, model_dir, year_dir = path.split(os.sep)[-3:]
+                yield unquote(make_dir[5:]), unquote(model_dir[6:]), int(year_dir[5:])
+
+    def files(self, make: str, model: str, year: Union[int, Range, None] = None) -> List[str]:
+        """
+        Part files for a make/model, pruned to the year (or inclusive (lo, hi)
+        year range); parts already merged into a compacted file are left out.
+        """
+        make, model, _ = segment_key(make, model, 0)
+        model_dir = os.path.dirname(self._partition_dir(make, model, 0))
+        if isinstance(year, (int, np.integer)):
+            year_dirs = [self._partition_dir(make, model, year)]
+        else:
+            lo, hi = year if year is not None else (None, None)
+            year_dirs = [d for d in glob.glob(os.path.join(model_dir, "year=*"))
+                         if (lo is None or int(d.rsplit("=", 1)[1]) >= lo)
+                         and (hi is None or int(d.rsplit("=", 1)[1]) <= hi)]
+        return self._read(lambda: sorted(f for d in sorted(year_dirs) for f in _live_parts(d)))
+
+    def _read(self, read):
+        # A compaction can delete listed files before they are opened; list again
+        for attempt in range(READ_ATTEMPTS):
+            try:
+                return read()
+            except FileNotFoundError:
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+
+    # --- ingestion ---
+
+    def append(self, records: Iterable[Dict], today: Optional[dt.date] = None) -> int:
+        """
+        Append listing dicts (make, model, year, price, mileage; optional trim, vin,
+        source, city, state, zip, lat, lon and listed_on or days_old).
+        Writes one new part file per partition; returns the number of rows written.
+        """
+        today = today or dt.date.today()
+        by_partition: Dict[Tuple[str, str, int], List[Dict]] = {}
+        for r in records:
+            make, model, year = segment_key(r["make"], r["model"], r["year"])
+            row = {"make": make, "model": model, "year": year,
+                   "price": _optional_float(r.get("price")),
+                   "mileage": None if r.get("mileage") is None else int(r["mileage"]),
+                   "lat": _optional_float(r.get("lat")), "lon": _optional_float(r.get("lon")),
+                   "listed_on": _listed_on(r, today)}
+            for key in _STRINGS:
+                value = r.get(key)
+                row[key] = None if value is None else str(value).strip()
+            by_partition.setdefault((make, model, year), []).append(row)
+
+        for (make, model, year), rows in by_partition.items():
+            table = pa.Table.from_pylist(rows, schema=SCHEMA)
+            self._write(self._partition_dir(make, model, year), table)
+        return sum(len(rows) for rows in by_partition.values())
+
+    def _write(self, directory: str, table: pa.Table, superseded: Optional[Sequence[str]] = None) -> str:
+        os.makedirs(directory, exist_ok=True)
+        name = _part_name(compacted=superseded is not None)
+        if superseded is not None:
+            table = table.replace_schema_metadata({SUPERSEDED_KEY: json.dumps(sorted(superseded))})
+        tmp = os.path.join(directory, f".tmp-{name}")
+        pq.write_table(table, tmp, row_group_size=self.row_group_size)
+        os.replace(tmp, os.path.join(directory, name))
+        return name
+
+    def compact(self, make: Optional[str] = None, model: Optional[str] = None, year: Optional[int] = None,
+                min_files: int = 2) -> int:
+        """
+        Merge each partition with at least min_files parts into one deduplicated,
+        mileage-sorted file. Filters narrow which partitions are compacted.
+        Returns the number of partitions rewritten.
+        """
+        rewritten = 0
+        with self._compact_lock:
+            wanted = (None if make is None else str(make).strip().upper(),
+                      None if model is None else str(model).strip().upper(),
+                      None if year is None else int(year))
+            for partition in list(self.partitions()):
+                if any(w is not None and w != p for w, p in zip(wanted, partition)):
+                    continue
+                p_make, p_model, p_year = partition
+                files = self.files(p_make, p_model, p_year)
+                if len(files) < min_files:
+                    continue
+                table = pa.concat_tables([pq.read_table(f, schema=SCHEMA, memory_map=True) for f in files])
+                rows = table.to_pylist()
+                newest = {}
+                for i, row in enumerate(rows):  # part files are in write order, so later rows are newer
+                    newest[_dedupe_key(row)] = i
+                keep = np.sort(np.fromiter(newest.values(), dtype=np.int64, count=len(newest)))
+                table = table.take(pa.array(keep))
+                table = table.take(pc.sort_indices(table, sort_keys=[("mileage", "ascending")]))
+                self._write(self._partition_dir(p_make, p_model, p_year), table,
+                            superseded=[os.path.basename(f) for f in files])
+                for f in files:
+                    os.remove(f)
+                rewritten += 1
+        return rewritten
+
+    # --- reads ---
+
+    def scan(self, make: str, model: str, year: Union[int, Range, None] = None, trim: Optional[str] = None,
+             trim_family: Optional[str] = None, mileage: Optional[Range] = None,
+             columns: Optional[Sequence[str]] = None) -> pa.Table:
+        """
+        Listings of a make/model as an Arrow table, filtered by year (exact or
+        inclusive range), exact trim or trim family (shared 2-character prefix)
+        and inclusive mileage range. Filters run inside the Parquet scan.
+        """
+        expr = None
+        for part in (
+            None if trim is None else ds.field("trim") == trim,
+            None if not trim_family else trim_family_expr(trim_family),
+            None if mileage is None else _range_expr("mileage", mileage),
+        ):
+            if part is not None:
+                expr = part if expr is None else expr & part
+
+        def read():
+            files = self.files(make, model, year)
+            if not files:
+                return (SCHEMA if columns is None else pa.schema([SCHEMA.field(c) for c in columns])).empty_table()
+            dataset = ds.dataset(files, schema=SCHEMA, format="parquet", filesystem=self._fs)
+            return dataset.to_table(columns=None if columns is None else list(columns), filter=expr)
+        return self._read(read)
+
+    def count(self, make: str, model: str, year: Union[int, Range, None] = None) -> int:
+        """Rows in the matching partitions, from Parquet footers (duplicates not yet compacted are counted)."""
+        return self._read(lambda: sum(pq.ParquetFile(f, memory_map=True).metadata.num_rows
+                                      for f in self.files(make, model, year)))
+
+    def comps_for(self, subject: Dict, cfg: Dict, as_of: Optional[dt.date] = None) -> CompBatch:
+        """
+        Comps for a subject (make, model, year; optional trim, mileage, lat, lon)
+        as a CompBatch for hybrid_price.
+
+        Pushes the widest step of the subject's mileage window into the scan and
+        keeps the subject's trim family when it still leaves min_k comps. When
+        even the widest window holds fewer than min_k comps, the ladder keeps
+        every comp, so the scan drops the mileage predicate. The
+        batch is sorted by mileage, so the filter ladder's window is a binary
+        search. distance_km is measured from the subject's lat/lon; listings or
+        subjects without coordinates get 0. days_old counts from listed_on
+        (0 when unknown).
+        """
+        fcfg = cfg["filters"]["comps"]
+        mileage = None
+        if subject.get("mileage") is not None:
+            # Widest step of the mileage window ladder; filter_comp_batch picks the narrowest that keeps min_k
+            delta = max(mileage_window_steps(cfg, fcfg["max_mileage_delta_pct"])) * subject["mileage"]
+            mileage = (subject["mileage"] - delta, subject["mileage"] + delta)
+        def scan(trim_family, mileage):
+            table = self.scan(subject["make"], subject["model"], int(subject["year"]), trim_family=trim_family,
+                              mileage=mileage, columns=("price", "mileage", "lat", "lon", "listed_on"))
+            return table.filter(pc.and_(pc.is_valid(table["price"]), pc.is_valid(table["mileage"])))
+
+        table = None
+        if subject.get("trim"):
+            table = scan(subject["trim"], mileage)
+            if table.num_rows < fcfg["min_k"]:
+                table = None
+        if table is None:
+            table = scan(None, mileage)
+        if mileage is not None and table.num_rows < fcfg["min_k"]:
+            # No window step keeps min_k, so the filter ladder keeps every comp; fetch them all
+            table = scan(None, None)
+
+        n = table.num_rows
+        lat = table["lat"].to_numpy(zero_copy_only=False)
+        lon = table["lon"].to_numpy(zero_copy_only=False)
+        distance = np.zeros(n)
+        if subject.get("lat") is not None and subject.get("lon") is not None and n:
+            distance = np.nan_to_num(haversine_km(subject["lat"], subject["lon"], lat, lon), nan=0.0)
+        as_of = as_of or dt.date.today()
+        listed = table["listed_on"].cast(pa.int32()).to_numpy(zero_copy_only=False)  # days since epoch, NaN if null
+        days_old = np.where(np.isnan(listed), 0, (as_of - dt.date(1970, 1, 1)).days - np.nan_to_num(listed))
+        batch = CompBatch(table["price"].to_numpy(zero_copy_only=False), table["mileage"].to_numpy(zero_copy_only=False),
+                          distance, np.maximum(days_old, 0).astype(np.int64))
+        return batch.sort_by_mileage()
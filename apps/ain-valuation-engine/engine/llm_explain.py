@@ -3,33 +3,214 @@
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 try:
 	import openai
 except ImportError:
 	openai = None
+try:
+	from prometheus_client import Counter, Histogram
+	LLM_EXPLAIN_CALLS = Counter("llm_explain_calls_total", "LLM explanation requests", ["outcome"])
+	LLM_EXPLAIN_QUEUE_WAIT = Histogram("llm_explain_queue_wait_seconds", "Time LLM calls wait for a worker")
+	LLM_EXPLAIN_LATENCY = Histogram("llm_explain_call_seconds", "LLM API call latency")
+	PROMETHEUS_AVAILABLE = True
+except ImportError:
+	PROMETHEUS_AVAILABLE = False
 
 SYSTEM_PROMPT = (
 	"You are an expert vehicle valuation assistant. ONLY use the provided facts. "
 	"If you are uncertain, say so. Do not invent or speculate."
 )
 
-def llm_explanation(numeric_output: dict, top_factors: list, method: str, data_sufficiency: bool, timeout=5, ensemble_factors=None):
-	api_key = os.environ.get("OPENAI_API_KEY")
-	if openai is None or not api_key:
-		# Fallback if openai is not installed or API key missing
-		user_prompt = (
-			f"Valuation result: {numeric_output}.\n"
-			f"Top factors: {top_factors}.\n"
-			f"Method: {method}.\n"
-			f"Data sufficiency: {data_sufficiency}.\n"
-			f"Ensemble/multimodal factors: {ensemble_factors if ensemble_factors else 'N/A'}.\n"
-			"Write a user-friendly, facts-only explanation. Only reference features and factors present above."
-		)
-		return {
-			"prompt": user_prompt,
-			"explanation": "OpenAI package not installed or API key missing. This is a factual, user-friendly explanation generated by a stub."
+# LLM calls run on one shared, bounded pool. Calls beyond workers + queue are not
+# admitted and get the fallback immediately, as do all calls while the breaker is open.
+LLM_EXPLAIN_WORKERS = int(os.environ.get("LLM_EXPLAIN_WORKERS", "4"))
+LLM_EXPLAIN_MAX_QUEUE = int(os.environ.get("LLM_EXPLAIN_MAX_QUEUE", "16"))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))  # consecutive timeouts/errors to open
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))  # seconds before a trial call
+
+class CircuitBreaker:
+	"""Opens after `failures` consecutive failures; after `cooldown` seconds lets one trial call through."""
+
+	def __init__(self, failures=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+		self.failures = failures
+		self.cooldown = cooldown
+		self._consecutive = 0
+		self._opened_at = None
+		self._trial = False
+		self._lock = threading.Lock()
+
+	@property
+	def state(self):
+		with self._lock:
+			if self._opened_at is None:
+				return "closed"
+			return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+	def allow(self):
+		with self._lock:
+			if self._opened_at is None:
+				return True
+			if self._trial or time.monotonic() - self._opened_at < self.cooldown:
+				return False
+			self._trial = True
+			return True
+
+	def cancel(self):
+		"""Give back a trial granted by allow() when the call was never made."""
+		with self._lock:
+			self._trial = False
+
+	def record(self, ok):
+		with self._lock:
+			self._trial = False
+			if ok:
+				self._consecutive = 0
+				self._opened_at = None
+				return
+			self._consecutive += 1
+			if self._opened_at is not None or self._consecutive >= self.failures:
+				self._opened_at = time.monotonic()
+
+	def reset(self):
+		with self._lock:
+			self._consecutive, self._opened_at, self._trial = 0, None, False
+
+_executor = ThreadPoolExecutor(max_workers=LLM_EXPLAIN_WORKERS, thread_name_prefix="llm-explain")
+_admission = threading.BoundedSemaphore(LLM_EXPLAIN_WORKERS + LLM_EXPLAIN_MAX_QUEUE)
+_breaker = CircuitBreaker()
+_inflight = {}  # prompt -> [future, waiters]; identical prompts share one call
+_inflight_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {"requests": 0, "llm": 0, "coalesced": 0, "fallbacks": {},
+	"queue_wait_s": [0, 0.0], "call_latency_s": [0, 0.0]}
+
+def _observe(name, seconds):
+	with _metrics_lock:
+		_metrics[name][0] += 1
+		_metrics[name][1] += seconds
+	if PROMETHEUS_AVAILABLE:
+		(LLM_EXPLAIN_QUEUE_WAIT if name == "queue_wait_s" else LLM_EXPLAIN_LATENCY).observe(seconds)
+
+def _count(outcome):
+	with _metrics_lock:
+		_metrics["requests"] += 1
+		if outcome in ("llm", "coalesced"):
+			_metrics["llm"] += 1
+			_metrics["coalesced"] += outcome == "coalesced"
+		else:
+			_metrics["fallbacks"][outcome] = _metrics["fallbacks"].get(outcome, 0) + 1
+	if PROMETHEUS_AVAILABLE:
+		LLM_EXPLAIN_CALLS.labels(outcome=outcome).inc()
+
+def metrics():
+	"""Request counts, fallback rate by reason, mean queue wait / call latency and breaker state."""
+	with _metrics_lock:
+		requests = _metrics["requests"]
+		fallbacks = dict(_metrics["fallbacks"])
+		mean_ms = {name: (total / n * 1000 if n else None)
+			for name, (n, total) in ((k, _metrics[k]) for k in ("queue_wait_s", "call_latency_s"))}
+		out = {
+			"requests": requests,
+			"llm": _metrics["llm"],
+			"coalesced": _metrics["coalesced"],
+			"fallbacks": fallbacks,
+			"fallback_rate": sum(fallbacks.values()) / requests if requests else 0.0,
+			"mean_queue_wait_ms": mean_ms["queue_wait_s"],
+			"mean_call_latency_ms": mean_ms["call_latency_s"],
 		}
-	openai.api_key = api_key
+	out["breaker"] = _breaker.state
+	return out
+
+def reset_metrics():
+	with _metrics_lock:
+		_metrics.update({"requests": 0, "llm": 0, "coalesced": 0, "fallbacks": {},
+			"queue_wait_s": [0, 0.0], "call_latency_s": [0, 0.0]})
+
+def _call_llm(user_prompt, timeout):
+	response = openai.ChatCompletion.create(
+		model="gpt-4o",
+		messages=[
+			{"role": "system", "content": SYSTEM_PROMPT},
+			{"role": "user", "content": user_prompt}
+		],
+		max_tokens=120,
+		temperature=0.2,
+		request_timeout=timeout,  # a call nobody waits for must not hold a worker indefinitely
+	)
+	return response.choices[0].message.content.strip()
+
+def _run(user_prompt, timeout, submitted_at):
+	started = time.perf_counter()
+	_observe("queue_wait_s", started - submitted_at)
+	try:
+		text = _call_llm(user_prompt, timeout)
+	finally:
+		_observe("call_latency_s", time.perf_counter() - started)
+		_admission.release()
+	if not text:
+		raise ValueError("empty LLM response")
+	return text
+
+def _submit(user_prompt, timeout):
+	"""In-flight entry for the prompt's LLM call, shared with identical prompts, or the fallback reason."""
+	with _inflight_lock:
+		entry = _inflight.get(user_prompt)
+		if entry is not None:
+			entry[1] += 1
+			return entry, True
+		# Admission first: a half-open trial is only taken when the call can actually be made
+		if not _admission.acquire(blocking=False):
+			return "overloaded", False
+		if not _breaker.allow():
+			_admission.release()
+			return "circuit_open", False
+		try:
+			future = _executor.submit(_run, user_prompt, timeout, time.perf_counter())
+		except RuntimeError:
+			_admission.release()
+			_breaker.cancel()
+			return "overloaded", False
+		entry = [future, 1, False, user_prompt]  # future, waiters, outcome recorded on the breaker, prompt
+		_inflight[user_prompt] = entry
+	def done(f):
+		with _inflight_lock:
+			if _inflight.get(user_prompt) is entry:
+				del _inflight[user_prompt]
+		if f.cancelled():
+			_admission.release()  # never ran, so _run did not release its slot
+	future.add_done_callback(done)
+	return entry, False
+
+def _record_once(entry, ok):
+	with _inflight_lock:
+		if entry[2]:
+			return
+		entry[2] = True
+	_breaker.record(ok)
+
+def _wait(entry, timeout):
+	future = entry[0]
+	try:
+		text = future.result(timeout)
+		_record_once(entry, True)
+		return text, None
+	except FutureTimeout:
+		_record_once(entry, False)
+		with _inflight_lock:
+			entry[1] -= 1
+			abandoned = entry[1] == 0
+			if abandoned and _inflight.get(entry[3]) is entry:
+				del _inflight[entry[3]]  # no new waiter may join a call about to be cancelled
+		if abandoned:
+			# Outside the lock: cancel() runs the done callback, which takes _inflight_lock
+			future.cancel()  # nobody is waiting; frees the queue slot if it has not started
+		return None, "timeout"
+	except Exception:
+		_record_once(entry, False)
+		return None, "error"
+
+def llm_explanation(numeric_output: dict, top_factors: list, method: str, data_sufficiency: bool, timeout=5, ensemble_factors=None):
 	user_prompt = (
 		f"Valuation result: {numeric_output}.\n"
 		f"Top factors: {top_factors}.\n"
@@ -38,26 +219,23 @@ def llm_explanation(numeric_output: dict, top_factors: list, method: str, data_s
 		f"Ensemble/multimodal factors: {ensemble_factors if ensemble_factors else 'N/A'}.\n"
 		"Write a user-friendly, facts-only explanation. Only reference features and factors present above."
 	)
-	result = {"text": None}
-	def call_llm():
-		try:
-			response = openai.ChatCompletion.create(
-				model="gpt-4o",
-				messages=[
-					{"role": "system", "content": SYSTEM_PROMPT},
-					{"role": "user", "content": user_prompt}
-				],
-				max_tokens=120,
-				temperature=0.2,
-			)
-			result["text"] = response.choices[0].message.content.strip()
-		except Exception:
-			result["text"] = None
-	thread = threading.Thread(target=call_llm)
-	thread.start()
-	thread.join(timeout)
-	if result["text"]:
-		return {"prompt": user_prompt, "explanation": result["text"]}
+	api_key = os.environ.get("OPENAI_API_KEY")
+	if openai is None or not api_key:
+		# Fallback if openai is not installed or API key missing
+		_count("unavailable")
+		return {
+			"prompt": user_prompt,
+			"explanation": "OpenAI package not installed or API key missing. This is a factual, user-friendly explanation generated by a stub."
+		}
+	openai.api_key = api_key
+	entry, coalesced = _submit(user_prompt, timeout)
+	if isinstance(entry, str):
+		text, outcome = None, entry
+	else:
+		text, outcome = _wait(entry, timeout)
+	_count(outcome or ("coalesced" if coalesced else "llm"))
+	if text:
+		return {"prompt": user_prompt, "explanation": text}
 	return {"prompt": user_prompt, "explanation": fallback_explanation(numeric_output, top_factors, method, data_sufficiency)}
 
 def test_llm_explanation():
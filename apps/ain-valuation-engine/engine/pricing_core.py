@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, Mapping, Optional, Tuple
 
 import numpy as np
-from engine.confidence import ConfidenceInputs, confidence_score, confidence_label, band_from_label
+import pandas as pd
+from engine.confidence import ConfidenceInputs, compiled_confidence, confidence_score, confidence_label, band_from_label
 from engine.comps_selector import select_comps
-from engine.comps_filter import filter_comps, RawComp
+from engine.comps_filter import filter_comps, mileage_window_steps, RawComp
+from engine.comp_batch import CompBatch, as_comp_batch, median_mad
 
 @dataclass
 class Comp:
@@ -34,41 +36,19 @@ class WeightsConfig:
     reliability: Dict
     blend_weights: BlendConfig
 
-def _piecewise_score(x: float, breaks: List[float], increasing: bool) -> float:
-    """
-    Map x into [0..1] using 4 breakpoints (0..3 segments).
-    increasing=True means higher x => higher score.
-    """
-    b = breaks
-    x = max(min(x, b[-1]), b[0])
-    # Normalize to segment
-    if x <= b[1]:
-        t = (x - b[0]) / (b[1] - b[0] + 1e-9)
-        s = t
-    elif x <= b[2]:
-        t = (x - b[1]) / (b[2] - b[1] + 1e-9)
-        s = 1.0 * t + 1.0  # 1..2
-    else:
-        t = (x - b[2]) / (b[3] - b[2] + 1e-9)
-        s = 2.0 * t + 2.0  # 2..3
-    s_norm = s / 3.0
-    return s_norm if increasing else (1.0 - s_norm)
+# Score levels at the reliability breakpoints; the top segment rises 2..4 (historical curve)
+RELIABILITY_LEVELS = (0.0, 1.0, 2.0, 4.0)
 
 def reliability_score(rel_in: ReliabilityInputs, wcfg: WeightsConfig) -> float:
-    r = wcfg.reliability
-    s_k   = _piecewise_score(rel_in.k_comps,            r["k_comps_breakpoints"],           increasing=True)
-    s_fr  = _piecewise_score(rel_in.freshness_days,     r["freshness_days_breakpoints"],    increasing=False)
-    s_mad = _piecewise_score(rel_in.dispersion_mad,     r["dispersion_mad_breakpoints"],    increasing=False)
-    s_cmp = rel_in.completeness
-    s_hist = 1.0 if rel_in.history_verified else 0.6
-    s_cond = 1.0 if rel_in.condition_available else 0.7
-    return float(np.clip(0.25*s_k + 0.20*s_fr + 0.20*s_mad + 0.15*s_cmp + 0.10*s_hist + 0.10*s_cond, 0.0, 1.0))
-
-def comp_median(comps: List[Comp]) -> Tuple[float, float]:
-    prices = np.array([c.price for c in comps], dtype=float)
-    median = float(np.median(prices))
-    mad = float(np.median(np.abs(prices - median)))
-    return median, mad
+    engine = compiled_confidence(wcfg.reliability, RELIABILITY_LEVELS)
+    return engine.raw_score(rel_in.k_comps, rel_in.freshness_days, rel_in.dispersion_mad,
+                            rel_in.completeness, rel_in.history_verified, rel_in.condition_available)
+
+def comp_median(comps) -> Tuple[float, float]:
+    # Accepts a CompBatch or a list of comps
+    if isinstance(comps, CompBatch):
+        return median_mad(comps.price)
+    return median_mad(np.fromiter((c.price for c in comps), dtype=float, count=len(comps)))
 
 def compute_blend_weights(rel_score: float, bwcfg: BlendConfig) -> Tuple[float, float]:
     # Heavier ML when reliability is high; otherwise prefer median comps.
@@ -76,18 +56,47 @@ def compute_blend_weights(rel_score: float, bwcfg: BlendConfig) -> Tuple[float,
     w_comp = 1.0 - w_ml
     return float(np.clip(w_ml, bwcfg.w_ml_min, bwcfg.w_ml_max)), float(np.clip(w_comp, bwcfg.w_comp_min, bwcfg.w_comp_max))
 
-def hybrid_price(p_ml: float, comps: List[Comp], rel_score: float, wcfg: WeightsConfig) -> Dict:
-    # Deterministic comp selection (Step 2 integration)
-    if not comps or len(comps) == 0:
-        raise ValueError("No comps supplied to hybrid_price. Use fallback path.")
-    subject_mileage = comps[0].mileage if hasattr(comps[0], 'mileage') else 0
-    weights_cfg = wcfg.reliability if hasattr(wcfg, 'reliability') else wcfg
-    selected_comps = select_comps(comps, subject_mileage, weights_cfg)
+def comp_summary(comps, weights_cfg: Dict, subject_mileage: Optional[float] = None) -> Dict:
+    """
+    Radius ladder and filter ladder over the comps: selected/kept CompBatch, removals and filter stats.
+    With subject_mileage the radius ladder relaxes until it holds min_k comps inside the subject's
+    mileage window, and the filter ladder starts with that window.
+    """
+    batch = as_comp_batch(comps)
+    max_mileage_delta_pct = weights_cfg["filters"]["comps"]["max_mileage_delta_pct"]
+    if subject_mileage is None:
+        selected_comps = select_comps(batch, int(batch.mileage[0]), weights_cfg)
+    else:
+        delta = max_mileage_delta_pct * subject_mileage
+        selected_comps = select_comps(batch, subject_mileage, weights_cfg,
+                                      mileage_window=(subject_mileage - delta, subject_mileage + delta))
     kept_comps, removals, stats = filter_comps(
         comps=selected_comps,
         cfg=weights_cfg,
-        max_mileage_delta_pct=weights_cfg["filters"]["comps"]["max_mileage_delta_pct"],
+        max_mileage_delta_pct=max_mileage_delta_pct,
+        subject_mileage=subject_mileage,
     )
+    return {"selected": selected_comps, "kept": kept_comps, "removals": removals, "stats": stats}
+
+def hybrid_price(p_ml: float, comps, rel_score: float, wcfg: WeightsConfig, subject: Optional[Dict] = None, cube=None, store=None) -> Dict:
+    # comps: list of Comp or a CompBatch; selection and filtering run as masks over its columns.
+    # With a CompStatsCube and a subject (make, model, year, zip) covered by it, the
+    # materialized comp summary is used and comps may be empty.
+    # With a ListingStore and a subject (make, model, year; optional trim, mileage, lat, lon),
+    # empty comps are read from the store through ListingStore.comps_for.
+    # A subject mileage applies the subject's mileage window in the filter ladder.
+    weights_cfg = wcfg.reliability if hasattr(wcfg, 'reliability') else wcfg
+    subject_mileage = subject.get("mileage") if subject is not None else None
+    summary = cube.lookup(subject, weights_cfg) if cube is not None and subject is not None else None
+    if summary is None:
+        if (comps is None or len(comps) == 0) and store is not None and subject is not None:
+            comps = store.comps_for(subject, weights_cfg)
+        # Deterministic comp selection (Step 2 integration)
+        if comps is None or len(comps) == 0:
+            raise ValueError("No comps supplied to hybrid_price. Use fallback path.")
+        summary = comp_summary(comps, weights_cfg, subject_mileage)
+    selected_comps, kept_comps = summary["selected"], summary["kept"]
+    removals, stats = summary["removals"], summary["stats"]
     if len(kept_comps) == 0:
         raise ValueError("No comps remain after selection/filtering. Use fallback path.")
     median_price, mad = comp_median(kept_comps)
@@ -95,21 +104,7 @@ def hybrid_price(p_ml: float, comps: List[Comp], rel_score: float, wcfg: Weights
     p_final = w_ml * p_ml + w_comp * median_price
 
     # --- Confidence scoring, labeling, banding ---
-    feature_completeness = 1.0  # TODO: compute actual completeness upstream
-    history_ok = True           # TODO: pass actual value
-    condition_ok = True         # TODO: pass actual value
-    method_tag = "blended"     # TODO: set based on pipeline context
-    cin = ConfidenceInputs(
-        k_comps=len(kept_comps),
-        freshness_days_med=np.median([c.days_old for c in kept_comps]) if kept_comps else 30.0,
-        dispersion_mad=stats["mad"] if stats["mad"] is not None else 3000.0,
-        completeness=feature_completeness,
-        history_verified=history_ok,
-        condition_available=condition_ok,
-        method_tag=method_tag,
-    )
-    conf_score = confidence_score(weights_cfg, cin)
-    conf_label = confidence_label(weights_cfg, conf_score)
+    conf_score, conf_label = _blended_confidence(weights_cfg, kept_comps, stats)
     band_low, band_high = band_from_label(weights_cfg, p_final, conf_label)
 
     return {
@@ -118,9 +113,9 @@ def hybrid_price(p_ml: float, comps: List[Comp], rel_score: float, wcfg: Weights
         "comp_mad": float(mad),
         "w_ml": float(w_ml),
         "w_comp": float(w_comp),
-        "selected_comps": [vars(c) for c in selected_comps],
-        "kept_comps": [vars(c) for c in kept_comps],
-        "removals": [vars(r) for r in removals],
+        "selected_comps": selected_comps.records(),
+        "kept_comps": kept_comps.records(),
+        "removals": removals.records(),
         "stats": stats,
         # --- Confidence audit fields ---
         "confidence_score": conf_score,
@@ -129,6 +124,36 @@ def hybrid_price(p_ml: float, comps: List[Comp], rel_score: float, wcfg: Weights
         "band_high": band_high,
     }
 
+def _blended_confidence(weights_cfg: Dict, kept_comps: CompBatch, stats: Dict) -> Tuple[float, str]:
+    feature_completeness = 1.0  # TODO: compute actual completeness upstream
+    history_ok = True           # TODO: pass actual value
+    condition_ok = True         # TODO: pass actual value
+    method_tag = "blended"     # TODO: set based on pipeline context
+    cin = ConfidenceInputs(
+        k_comps=len(kept_comps),
+        freshness_days_med=np.median(kept_comps.days_old),
+        dispersion_mad=stats["mad"] if stats["mad"] is not None else 3000.0,
+        completeness=feature_completeness,
+        history_verified=history_ok,
+        condition_available=condition_ok,
+        method_tag=method_tag,
+    )
+    conf_score = confidence_score(weights_cfg, cin)
+    return conf_score, confidence_label(weights_cfg, conf_score)
+
+def _fallback_confidence(weights_cfg: Dict) -> Tuple[float, str]:
+    cin = ConfidenceInputs(
+        k_comps=0,
+        freshness_days_med=30.0,
+        dispersion_mad=3000.0,
+        completeness=1.0,
+        history_verified=True,
+        condition_available=True,
+        method_tag="fallback_pricing",
+    )
+    conf_score = confidence_score(weights_cfg, cin)
+    return conf_score, confidence_label(weights_cfg, conf_score)
+
 def fallback_price(msrp: float, age_years: float, mileage: int, condition_proxy: float, cfg: Dict, salvage=False, rebuilt=False, is_ev=False, soh_known=True) -> float:
     # Simple depreciation curve: MSRP * (1 - d)^age - mileage_penalty + condition_delta
     d = 0.15 if age_years <= 1 else 0.12 if age_years <= 3 else 0.10 if age_years <= 7 else 0.08
@@ -156,3 +181,187 @@ def apply_band(price: float, conf_label: str, bands_cfg: Dict) -> Tuple[float, f
         "Low":   bands_cfg["bands_pct"]["low"],
     }[conf_label]
     return float(price * (1.0 - low_pct)), float(price * (1.0 + high_pct))
+
+def fallback_price_batch(msrp, age_years, mileage, condition_proxy, cfg: Dict, salvage=False, rebuilt=False, is_ev=False, soh_known=True) -> np.ndarray:
+    """fallback_price over arrays; element i equals fallback_price on the i-th inputs exactly."""
+    msrp, age_years, mileage, condition_proxy = (np.asarray(a, dtype=float) for a in (msrp, age_years, mileage, condition_proxy))
+    n = len(msrp)
+    salvage, rebuilt, is_ev, soh_known = (np.broadcast_to(np.asarray(a, dtype=bool), n) for a in (salvage, rebuilt, is_ev, soh_known))
+    d = np.select([age_years <= 1, age_years <= 3, age_years <= 7], [0.15, 0.12, 0.10], 0.08)
+    # Python's float pow for the depreciation factor (NumPy's vectorized pow can differ in the last ulp);
+    # it is evaluated once per distinct (rate, age) pair
+    pairs, inverse = np.unique(np.column_stack([d, np.maximum(0, age_years)]), axis=0, return_inverse=True)
+    factor = np.array([(1.0 - rate) ** age for rate, age in pairs.tolist()])[inverse.ravel()]
+    base = msrp * factor
+    mileage_penalty = 0.02 * (mileage / 12000.0) * base
+    condition_delta = (condition_proxy - 0.5) * 0.08 * base
+    price = base - mileage_penalty + condition_delta
+
+    fc = cfg["fallback_curve"]
+    price = np.where(salvage, price * (1.0 - max(fc["salvage_discount_floor"], 0.25)),
+                     np.where(rebuilt, price * (1.0 - max(fc["rebuilt_discount_floor"], 0.15)), price))
+    price = np.where(is_ev & ~soh_known, price * (1.0 - fc["ev_penalty_if_no_soh"]), price)
+    return np.maximum(1000.0, price)
+
+SUBJECT_FLAGS = {"salvage": False, "rebuilt": False, "is_ev": False, "soh_known": True}
+BATCH_COLUMNS = {"price": float, "method": object, "comp_median": float, "comp_mad": float, "w_ml": float,
+                 "w_comp": float, "k_comps": np.int64, "confidence_score": float, "confidence_label": object,
+                 "band_low": float, "band_high": float}
+
+def price_subject(subject: Dict, comps, wcfg: WeightsConfig) -> Dict:
+    """
+    Price one subject: hybrid_price over its comps (with the subject's
+    mileage window), or fallback_price (with fallback-capped confidence) when
+    no comps are supplied or none survive filtering. Subject keys: p_ml, rel_score, msrp, age_years, mileage,
+    condition_proxy and optional salvage, rebuilt, is_ev, soh_known.
+    This is the scalar reference for hybrid_price_batch.
+    """
+    weights_cfg = wcfg.reliability if hasattr(wcfg, 'reliability') else wcfg
+    try:
+        result = hybrid_price(subject["p_ml"], comps, subject["rel_score"], wcfg, subject={"mileage": subject.get("mileage")})
+    except ValueError:
+        flags = {k: subject.get(k, v) for k, v in SUBJECT_FLAGS.items()}
+        price = fallback_price(subject["msrp"], subject["age_years"], subject["mileage"], subject["condition_proxy"], weights_cfg, **flags)
+        conf_score, conf_label = _fallback_confidence(weights_cfg)
+        band_low, band_high = band_from_label(weights_cfg, price, conf_label)
+        return {"price": price, "method": "fallback_pricing", "comp_median": None, "comp_mad": None,
+                "w_ml": None, "w_comp": None, "k_comps": 0, "confidence_score": conf_score,
+                "confidence_label": conf_label, "band_low": band_low, "band_high": band_high}
+    return {"price": result["price"], "method": "blended", "comp_median": result["comp_median"],
+            "comp_mad": result["comp_mad"], "w_ml": result["w_ml"], "w_comp": result["w_comp"],
+            "k_comps": result["stats"]["kept"], "confidence_score": result["confidence_score"],
+            "confidence_label": result["confidence_label"], "band_low": result["band_low"],
+            "band_high": result["band_high"]}
+
+def _window_keys(batch: CompBatch, mileage: np.ndarray, weights_cfg: Dict) -> np.ndarray:
+    """
+    Per subject mileage, the comps comp_summary ends up filtering, as rows
+    (selection, window start, window end, window step): the radius-ladder
+    selection (or the nearest min_k) and the range of its sorted mileages
+    inside the first window step holding min_k (-1s when none does). Equal
+    rows give equal summaries; NaN mileages get an all -1 row (no window).
+    """
+    radius_steps = weights_cfg["filters"]["radius_steps_km"]
+    min_k = weights_cfg["filters"]["comps"]["min_k"]
+    pct = weights_cfg["filters"]["comps"]["max_mileage_delta_pct"]
+    selections = [np.flatnonzero(batch.distance_km <= radius) for radius in radius_steps]
+    selections.append(np.argsort(batch.distance_km, kind="stable")[:min_k])
+    sorted_mileage = [np.sort(batch.mileage[positions]) for positions in selections]
+
+    def count(s, delta):
+        return (np.searchsorted(sorted_mileage[s], mileage + delta, side="right")
+                - np.searchsorted(sorted_mileage[s], mileage - delta, side="left"))
+
+    # Radius ladder: the first radius holding min_k comps in the window, else the first holding min_k
+    plain = next((s for s in range(len(radius_steps)) if len(selections[s]) >= min_k), len(radius_steps))
+    choice = np.full(len(mileage), plain, dtype=np.intp)
+    for s in reversed(range(len(radius_steps))):
+        choice[count(s, pct * mileage) >= min_k] = s
+
+    keys = np.full((len(mileage), 4), -1, dtype=np.intp)
+    keys[:, 0] = choice
+    for s in np.unique(choice).tolist():
+        rows = np.flatnonzero(choice == s)
+        m = mileage[rows]
+        pending = np.ones(len(rows), dtype=bool)
+        for step, window_pct in enumerate(mileage_window_steps(weights_cfg, pct)):
+            delta = window_pct * m
+            start = np.searchsorted(sorted_mileage[s], m - delta, side="left")
+            end = np.searchsorted(sorted_mileage[s], m + delta, side="right")
+            hit = pending & (end - start >= min_k)
+            keys[rows[hit], 1:] = np.column_stack([start[hit], end[hit], np.full(np.count_nonzero(hit), step)])
+            pending &= ~hit
+    keys[np.isnan(mileage)] = -1
+    return keys
+
+def hybrid_price_batch(subjects, comp_store: Mapping, wcfg: WeightsConfig) -> Dict[str, np.ndarray]:
+    """
+    Price many subjects at once; record i equals price_subject(subjects[i], comp_store.get(pool_i), wcfg).
+
+    subjects: list of subject dicts or a mapping of columns (dict of sequences or a DataFrame) with the
+        price_subject keys plus `pool`, the key of the subject's comps in comp_store.
+    comp_store: mapping pool -> comps (list of Comp or CompBatch); missing pools use the fallback curve.
+
+    Selection, filtering, median/MAD and confidence run once per distinct pool and mileage window
+    (subjects whose windows select the same comps share them, see _window_keys); blending, fallback
+    pricing and bands run as array operations over all subjects. Returns columns (NumPy arrays):
+    price, method, comp_median, comp_mad, w_ml, w_comp (NaN for fallback rows), k_comps,
+    confidence_score, confidence_label, band_low, band_high.
+    """
+    weights_cfg = wcfg.reliability if hasattr(wcfg, 'reliability') else wcfg
+    cols = pd.DataFrame(list(subjects) if not isinstance(subjects, Mapping) and not isinstance(subjects, pd.DataFrame) else subjects)
+    n = len(cols)
+    if n == 0:
+        return {key: np.empty(0, dtype=dtype) for key, dtype in BATCH_COLUMNS.items()}
+    for flag, default in SUBJECT_FLAGS.items():
+        if flag not in cols:
+            cols[flag] = default
+    pool_codes, pools = pd.factorize(cols["pool"], use_na_sentinel=False)
+    mileage = cols["mileage"].to_numpy(dtype=float) if "mileage" in cols else np.full(n, np.nan)
+
+    # Per pool and window group: comp median/MAD, k and confidence (NaN median marks "no usable comps")
+    codes = np.zeros(n, dtype=np.intp)
+    group_median, group_mad, group_k, group_freshness, group_dispersion = [], [], [], [], []
+    for j, pool in enumerate(pools):
+        rows = np.flatnonzero(pool_codes == j)
+        comps = comp_store.get(pool)
+        if comps is None or len(comps) == 0:
+            keys, inverse, first = np.zeros((1, 4), dtype=np.intp), np.zeros(len(rows), dtype=np.intp), None
+        else:
+            keys, first, inverse = np.unique(_window_keys(as_comp_batch(comps), mileage[rows], weights_cfg),
+                                             axis=0, return_index=True, return_inverse=True)
+        codes[rows] = len(group_median) + inverse.ravel()
+        for g in range(len(keys)):
+            median = mad = freshness = dispersion = np.nan
+            k = 0
+            if first is not None:
+                subject_mileage = None if keys[g, 0] < 0 else float(mileage[rows[first[g]]])
+                summary = comp_summary(comps, weights_cfg, subject_mileage)
+                if len(summary["kept"]):
+                    median, mad = comp_median(summary["kept"])
+                    k = len(summary["kept"])
+                    freshness = np.median(summary["kept"].days_old)
+                    dispersion = summary["stats"]["mad"] if summary["stats"]["mad"] is not None else 3000.0
+            group_median.append(median)
+            group_mad.append(mad)
+            group_k.append(k)
+            group_freshness.append(freshness)
+            group_dispersion.append(dispersion)
+    pool_median, pool_mad = np.array(group_median, dtype=float), np.array(group_mad, dtype=float)
+    pool_k = np.array(group_k, dtype=np.int64)
+    pool_freshness, pool_dispersion = np.array(group_freshness, dtype=float), np.array(group_dispersion, dtype=float)
+
+    blended = ~np.isnan(pool_median[codes])
+    fallback = ~blended
+    bw = wcfg.blend_weights
+    w_ml_raw = bw.w_ml_min + (bw.w_ml_max - bw.w_ml_min) * cols["rel_score"].to_numpy(dtype=float)
+    w_ml = np.clip(w_ml_raw, bw.w_ml_min, bw.w_ml_max)
+    w_comp = np.clip(1.0 - w_ml_raw, bw.w_comp_min, bw.w_comp_max)
+
+    price = np.full(n, np.nan)
+    price[blended] = w_ml[blended] * cols["p_ml"].to_numpy(dtype=float)[blended] + w_comp[blended] * pool_median[codes][blended]
+    if fallback.any():
+        f = cols[fallback]
+        price[fallback] = fallback_price_batch(f["msrp"], f["age_years"], f["mileage"], f["condition_proxy"], weights_cfg,
+                                               f["salvage"], f["rebuilt"], f["is_ev"], f["soh_known"])
+
+    # Confidence for every pool at once; fallback rows get the capped fallback score
+    engine = compiled_confidence(weights_cfg)
+    score = np.where(blended, engine.scores(pool_k, pool_freshness, pool_dispersion)[codes],
+                     engine.scores(0, 30.0, 3000.0, method_tag="fallback_pricing"))
+    label_codes = engine.label_codes(score)
+    band_low, band_high = engine.bands(price, label_codes)
+
+    return {
+        "price": price,
+        "method": np.where(blended, "blended", "fallback_pricing").astype(object),
+        "comp_median": np.where(blended, pool_median[codes], np.nan),
+        "comp_mad": np.where(blended, pool_mad[codes], np.nan),
+        "w_ml": np.where(blended, w_ml, np.nan),
+        "w_comp": np.where(blended, w_comp, np.nan),
+        "k_comps": pool_k[codes],
+        "confidence_score": score,
+        "confidence_label": engine.labels(score),
+        "band_low": band_low,
+        "band_high": band_high,
+    }
@@ -0,0 +1,236 @@
+"""
+Mergeable streaming quantile sketches (KLL) for market statistics.
+
+KLLSketch keeps a stack of compactor buffers. Level h holds items that each
+stand for 2**h observations. When the sketch is full, the lowest buffer over
+capacity is sorted and every other item (random offset) moves up a level.
+Adding a value is amortized O(1) (an append, plus O(log k) amortized sorting
+on compaction), and memory stays O(k) regardless of stream length. Two
+sketches merge by concatenating their levels and compacting, so per-worker or
+per-partition sketches combine into one without re-reading any listings.
+
+Error bounds (k = sketch size, default 200):
+    - Until the first compaction (n <= k) the sketch holds every value and
+      quantiles, median and MAD equal the exact NumPy results.
+    - After that, a quantile query returns a value whose rank is within
+      eps * n of the requested rank with high probability, where
+      eps ~= 1.7 / k (about 1% at k=200). Merged sketches have the same bound.
+      Tests check |rank error| <= 2% at k=200 over a quantile grid, for
+      single and merged sketches.
+    - The median inherits the rank bound. MAD is the weighted median of
+      |x - median| over the sketch's items: its rank error is at most 2 * eps
+      plus the shift from the median's own error, so on smooth price
+      distributions it stays within a few percent of the exact MAD.
+
+Example:
+    >>> sketch = KLLSketch(k=200)
+    >>> sketch.update(prices)
+    >>> other.merge(sketch)
+    >>> median, mad = other.median(), other.mad()
+"""
+import math
+import random
+import zlib
+from typing import Dict, Hashable, Iterable, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_K = 200
+_CAPACITY_DECAY = 2.0 / 3.0
+
+class KLLSketch:
+    """
+    KLL quantile sketch over floats.
+
+    Args:
+        k: Accuracy parameter; the top level holds about k items and the rank
+           error is about 1.7 / k.
+        seed: Seed for the compaction coin flips (reproducible sketches).
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._rng = random.Random(seed)
+        self._sorted = None  # cached (values, cumulative weights)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return int(math.ceil(self.k * _CAPACITY_DECAY ** depth)) + 1
+
+    def _grow(self) -> None:
+        self._levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def add(self, value: float) -> None:
+        """Add one observation."""
+        value = float(value)
+        if value != value:  # NaN
+            return
+        self._levels[0].append(value)
+        self._size += 1
+        self.n += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._sorted = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        """Add many observations."""
+        for value in np.asarray(values, dtype=np.float64).ravel().tolist():
+            self.add(value)
+
+    def _compress(self) -> None:
+        for h in range(len(self._levels)):
+            buf = self._levels[h]
+            if len(buf) >= self._capacity(h):
+                if h + 1 >= len(self._levels):
+                    self._grow()
+                buf.sort()
+                keep = buf[:len(buf) % 2]  # odd count: the smallest item stays at this level
+                pairs = buf[len(keep):]
+                self._levels[h + 1].extend(pairs[int(self._rng.random() < 0.5)::2])
+                self._levels[h] = keep
+                self._size = sum(len(b) for b in self._levels)
+                if self._size < self._max_size:
+                    break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold another sketch (e.g. from another worker or partition) into this one."""
+        if other.n == 0:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for h, buf in enumerate(other._levels):
+            self._levels[h].extend(buf)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._size = sum(len(b) for b in self._levels)
+        self._sorted = None
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    @property
+    def exact(self) -> bool:
+        """True while every observation is still held at full weight."""
+        return len(self._levels) == 1
+
+    def _weighted(self):
+        if self._sorted is None:
+            values = np.fromiter((v for buf in self._levels for v in buf), dtype=np.float64, count=self._size)
+            weights = np.concatenate([np.full(len(buf), 2 ** h, dtype=np.int64) for h, buf in enumerate(self._levels)])
+            order = np.argsort(values, kind="stable")
+            self._sorted = (values[order], np.cumsum(weights[order]))
+        return self._sorted
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Values at quantiles qs in [0, 1] (np.quantile while exact)."""
+        if self.n == 0:
+            raise ValueError("quantile of an empty sketch")
+        qs = np.asarray(qs, dtype=np.float64)
+        values, cum = self._weighted()
+        if self.exact:
+            return np.quantile(values, qs)
+        idx = np.searchsorted(cum, qs * self.n, side="left")
+        out = values[np.minimum(idx, len(values) - 1)]
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, out))
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def rank(self, value: float) -> float:
+        """Estimated fraction of observations <= value."""
+        if self.n == 0:
+            return 0.0
+        values, cum = self._weighted()
+        i = np.searchsorted(values, value, side="right")
+        return float(cum[i - 1]) / self.n if i else 0.0
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def mad(self) -> float:
+        """Median absolute deviation from the sketch's median (exact while exact)."""
+        values, cum = self._weighted()
+        median = self.median()
+        deviations = np.abs(values - median)
+        if self.exact:
+            return float(np.median(deviations))
+        weights = np.diff(cum, prepend=0)
+        order = np.argsort(deviations, kind="stable")
+        idx = np.searchsorted(np.cumsum(weights[order]), 0.5 * self.n, side="left")
+        return float(deviations[order][min(idx, len(order) - 1)])
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable state, for shipping sketches between workers."""
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": [list(b) for b in self._levels]}
+
+    @classmethod
+    def from_dict(cls, state: Dict, seed: Optional[int] = None) -> "KLLSketch":
+        sketch = cls(state["k"], seed)
+        sketch._levels = [list(b) for b in state["levels"]]
+        sketch.n, sketch.min, sketch.max = state["n"], state["min"], state["max"]
+        sketch._size = sum(len(b) for b in sketch._levels)
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch._levels)))
+        return sketch
+
+    def __len__(self) -> int:
+        return self.n
+
+class SegmentSketches:
+    """
+    One KLLSketch per segment key (e.g. (make, model, year, zip3)), for
+    rolling per-segment medians, MADs and quantiles.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = k
+        self._seed = seed
+        self._sketches: Dict[Hashable, KLLSketch] = {}
+
+    def _sketch(self, key: Hashable) -> KLLSketch:
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            seed = None if self._seed is None else self._seed ^ zlib.crc32(repr(key).encode())
+            sketch = self._sketches[key] = KLLSketch(self.k, seed)
+        return sketch
+
+    def add(self, key: Hashable, value: float) -> None:
+        self._sketch(key).add(value)
+
+    def update(self, key: Hashable, values: Iterable[float]) -> None:
+        self._sketch(key).update(values)
+
+    def merge(self, other: "SegmentSketches") -> "SegmentSketches":
+        for key, sketch in other._sketches.items():
+            self._sketch(key).merge(sketch)
+        return self
+
+    def get(self, key: Hashable) -> Optional[KLLSketch]:
+        return self._sketches.get(key)
+
+    def median(self, key: Hashable) -> Optional[float]:
+        sketch = self._sketches.get(key)
+        return sketch.median() if sketch is not None and sketch.n else None
+
+    def mad(self, key: Hashable) -> Optional[float]:
+        sketch = self._sketches.get(key)
+        return sketch.mad() if sketch is not None and sketch.n else None
+
+    def keys(self):
+        return self._sketches.keys()
+
+    def __len__(self) -> int:
+        return len(self._sketches)
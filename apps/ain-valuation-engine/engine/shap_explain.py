@@ -1,5 +1,3 @@
-
-import shap
 import joblib
 import xgboost as xgb
 import numpy as np
@@ -7,6 +5,11 @@ from engine.types import ValuationInput
 import os
 import threading
 
+# "native" computes exact TreeSHAP inside XGBoost (pred_contribs, multithreaded);
+# "shap" uses shap.TreeExplainer, which is only imported when selected.
+SHAP_BACKENDS = ("native", "shap")
+SHAP_BACKEND = os.environ.get("SHAP_BACKEND", "native")
+
 _explainer = None
 _pipeline = None
 _model = None
@@ -29,29 +32,45 @@ def _get_explainer():
 		if _explainer is not None:
 			return _explainer
 		_load_model_and_pipeline()
-		# SHAP expects XGBRegressor, so wrap Booster if needed
+		import shap  # heavy import, deferred until the shap backend is used
 		explainer = shap.TreeExplainer(_model)
 		_explainer = explainer
 		return explainer
 
-def top_local_drivers(val_input: ValuationInput, top_n=5):
+def local_contributions(X, backend=None):
+	"""Per-row feature contributions (n_rows x n_features) for transformed features X."""
+	backend = backend or SHAP_BACKEND
+	if backend not in SHAP_BACKENDS:
+		raise ValueError(f"Unknown SHAP backend {backend!r}; expected one of {SHAP_BACKENDS}")
 	_load_model_and_pipeline()
-	explainer = _get_explainer()
-	X = _pipeline.transform([val_input.dict()])
-	shap_values = explainer.shap_values(X)
-	feature_names = _pipeline.named_steps['preprocessor'].get_feature_names_out()
-	impacts = list(zip(feature_names, shap_values[0]))
+	if backend == "native":
+		# Last column is the bias term (expected value)
+		return _model.predict(xgb.DMatrix(X), pred_contribs=True)[:, :-1]
+	return np.asarray(_get_explainer().shap_values(X))
+
+def _drivers(feature_names, contributions, top_n):
 	# Sort by absolute impact
-	impacts = sorted(impacts, key=lambda x: abs(x[1]), reverse=True)
-	result = []
-	for feat, val in impacts[:top_n]:
-		result.append({
-			"feature": feat,
-			"direction": "positive" if val > 0 else "negative",
-			"abs_impact": abs(val)
-		})
-	return result
-def top_local_drivers(val_input: ValuationInput, top_n=5, ensemble=False):
+	order = np.argsort(-np.abs(contributions), kind="stable")[:top_n]
+	return [
+		{
+			"feature": feature_names[i],
+			"direction": "positive" if contributions[i] > 0 else "negative",
+			"abs_impact": float(abs(contributions[i]))
+		}
+		for i in order
+	]
+
+def top_local_drivers_batch(val_inputs, top_n=5, backend=None):
+	"""Top drivers for many inputs, explained with one transform and one contributions call."""
+	if not val_inputs:
+		return []
+	_load_model_and_pipeline()
+	X = _pipeline.transform([val_input.dict() for val_input in val_inputs])
+	contributions = local_contributions(X, backend)
+	feature_names = _pipeline.named_steps['preprocessor'].get_feature_names_out()
+	return [_drivers(feature_names, row, top_n) for row in contributions]
+
+def top_local_drivers(val_input: ValuationInput, top_n=5, ensemble=False, backend=None):
 	if ensemble:
 		# Example: Aggregate SHAP values from all base models (stub)
 		drivers = [
@@ -63,21 +82,7 @@ def top_local_drivers(val_input: ValuationInput, top_n=5, ensemble=False):
 		]
 		return drivers[:top_n]
 	else:
-		_load_model_and_pipeline()
-		explainer = _get_explainer()
-		X = _pipeline.transform([val_input.dict()])
-		shap_values = explainer.shap_values(X)
-		feature_names = _pipeline.named_steps['preprocessor'].get_feature_names_out()
-		impacts = list(zip(feature_names, shap_values[0]))
-		impacts = sorted(impacts, key=lambda x: abs(x[1]), reverse=True)
-		result = []
-		for feat, val in impacts[:top_n]:
-			result.append({
-				"feature": feat,
-				"direction": "positive" if val > 0 else "negative",
-				"abs_impact": abs(val)
-			})
-		return result
+		return top_local_drivers_batch([val_input], top_n=top_n, backend=backend)[0]
 
 def explain_ensemble(val_input, top_n=5):
 	# Returns both JSON and human-readable explanation
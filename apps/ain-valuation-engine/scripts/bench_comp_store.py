@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark radius-ladder comp selection against a large spatially indexed store.
+
+Builds a SpatialCompStore of synthetic listings clustered around metro
+areas across the continental US (plus a uniform rural background), then
+times select_comps_near for random subjects near those metros. For
+comparison it also times the previous approach: computing distance_km for
+every stored comp and running select_comps over the full list.
+
+Usage:
+    PYTHONPATH=. python scripts/bench_comp_store.py --comps 1000000 --subjects 2000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from engine.comp_batch import CompBatch
+from engine.comp_store import SpatialCompStore, haversine_km
+from engine.comps_selector import select_comps, select_comps_near
+
+CFG = {"filters": {"radius_steps_km": [25, 50, 100, 300, 1000], "comps": {"min_k": 3}}}
+
+
+def synthetic_store(n: int, metros: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(26, 48, metros), rng.uniform(-122, -70, metros)])
+    weights = rng.pareto(1.2, metros) + 1
+    which = rng.choice(metros, n, p=weights / weights.sum())
+    rural = rng.random(n) < 0.1
+    lat = np.where(rural, rng.uniform(25, 49, n), centers[which, 0] + rng.normal(0, 0.3, n))
+    lon = np.where(rural, rng.uniform(-124, -67, n), centers[which, 1] + rng.normal(0, 0.4, n))
+    store = SpatialCompStore(lat, lon, price=rng.normal(22000, 3000, n), mileage=rng.integers(5000, 150000, n),
+                             days_old=rng.integers(0, 90, n))
+    return store, centers, rng
+
+
+def percentile_us(samples, q):
+    return float(np.percentile(samples, q)) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--comps", type=int, default=1_000_000, help="Stored comps")
+    ap.add_argument("--metros", type=int, default=300, help="Metro clusters")
+    ap.add_argument("--subjects", type=int, default=2000, help="Subjects to select comps for")
+    ap.add_argument("--scan-subjects", type=int, default=20, help="Subjects for the full-scan baseline")
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    store, centers, rng = synthetic_store(args.comps, args.metros, seed=0)
+    print(f"Built store of {len(store):,} comps in {time.perf_counter() - start:.2f}s")
+
+    metro = rng.choice(len(centers), args.subjects)
+    subjects = centers[metro] + rng.normal(0, 0.3, (args.subjects, 2))
+
+    timings, sizes = [], []
+    for lat, lon in subjects:
+        t0 = time.perf_counter()
+        selected = select_comps_near(store, lat, lon, CFG)
+        timings.append(time.perf_counter() - t0)
+        sizes.append(len(selected))
+    print(f"indexed ladder: median {percentile_us(timings, 50):.0f} us, p95 {percentile_us(timings, 95):.0f} us, "
+          f"p99 {percentile_us(timings, 99):.0f} us (median {statistics.median(sizes):.0f} comps selected)")
+
+    scan = []
+    for lat, lon in subjects[:args.scan_subjects]:
+        t0 = time.perf_counter()
+        batch = CompBatch(store.price, store.mileage, haversine_km(lat, lon, store.lat, store.lon),
+                          store.days_old, store.id)
+        select_comps(batch, 0, CFG)
+        scan.append(time.perf_counter() - t0)
+    print(f"full scan:      median {percentile_us(scan, 50):.0f} us, p95 {percentile_us(scan, 95):.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-row prediction latency: sklearn vs CompiledTreeEnsemble.
+
+Fits a GradientBoostingRegressor on synthetic data, compiles it and times
+predict on one row many times with each, reporting median and p95 latency.
+
+Usage:
+    PYTHONPATH=. python scripts/bench_compiled_model.py --estimators 200 --depth 7
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from val_engine.compiled_model import CompiledTreeEnsemble
+
+
+def latency_us(predict, row, runs: int) -> np.ndarray:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predict(row)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--estimators", type=int, default=200, help="Boosting stages")
+    ap.add_argument("--depth", type=int, default=7, help="max_depth of each tree")
+    ap.add_argument("--runs", type=int, default=2000, help="Timed predictions per predictor")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 12))
+    X[:, :3] = rng.integers(0, 6, size=(2000, 3))
+    y = 20000 + 3000 * X[:, 0] - 1500 * X[:, 4] + 800 * X[:, 5] * X[:, 6] + rng.normal(scale=500, size=2000)
+    gbr = GradientBoostingRegressor(n_estimators=args.estimators, max_depth=args.depth, random_state=42).fit(X, y)
+    compiled = CompiledTreeEnsemble.from_estimator(gbr)
+    row = X[:1]
+
+    for name, predict in (("sklearn", gbr.predict), ("compiled", compiled.predict)):
+        predict(row)  # warm up
+        us = latency_us(predict, row, args.runs)
+        print(f"{name:<9} median {np.median(us):7.0f} us, p95 {np.percentile(us, 95):7.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: time-to-ready and time-to-first-explanation, eager vs lazy explainer.
+
+Trains a model on synthetic rows, saves a bundle, then starts fresh worker
+processes that load the bundle and explain one vehicle:
+
+- eager: the old startup path, set_explainer(model) right after loading
+- lazy:  register_explainer(model); shap is imported and the explainer
+         built on the first explanation
+
+Reports the median time from process start until the worker is ready to
+serve and until its first explanation is returned.
+
+Usage:
+    PYTHONPATH=. python scripts/bench_explainer_cold_start.py --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+WORKER = r"""
+import json, sys, time
+start = time.perf_counter()
+from val_engine import model, shap_explainer
+model.load_model_artifacts()
+if sys.argv[1] == "eager":
+    shap_explainer.set_explainer(model._model)
+else:
+    shap_explainer.register_explainer(model._model)
+ready = time.perf_counter()
+shap_explainer.explain_prediction_comprehensive(json.loads(sys.argv[2]))
+done = time.perf_counter()
+print(json.dumps({"ready_ms": (ready - start) * 1000, "first_explanation_ms": (done - start) * 1000}))
+"""
+
+VEHICLE = {
+    "vin": {"value": "1HGCM82633A004352"}, "year": {"value": 2019, "verified": True},
+    "mileage": {"value": 40000}, "make": {"value": "Toyota"}, "model": {"value": "Camry"},
+    "overall_condition_rating": {"value": "Good"}, "zipcode": {"value": 90210},
+}
+
+
+def _run_worker(variant: str, env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", WORKER, variant, json.dumps(VEHICLE)],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rows", type=int, default=5000, help="Synthetic training rows")
+    ap.add_argument("--runs", type=int, default=5, help="Worker processes per variant")
+    args = ap.parse_args()
+
+    from val_engine import model
+    from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model.BUNDLE_PATH = os.path.join(tmp, "bundle.joblib")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.train_model(random_vehicle_frame(args.rows), use_feature_cache=False)
+            model.save_model_artifacts()
+
+        env = {**os.environ, "AIN_TABULAR_BUNDLE_PATH": model.BUNDLE_PATH,
+               "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+        _run_worker("lazy", env)  # warm the OS page cache
+
+        print(f"{'variant':<10} {'ready_ms':>10} {'first_explanation_ms':>22}")
+        for variant in ("eager", "lazy"):
+            results = [_run_worker(variant, env) for _ in range(args.runs)]
+            print(f"{variant:<10} {statistics.median(r['ready_ms'] for r in results):>10.1f} "
+                  f"{statistics.median(r['first_explanation_ms'] for r in results):>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
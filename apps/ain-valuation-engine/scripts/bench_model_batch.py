@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch price prediction against per-vehicle prediction.
+
+Trains a model on a synthetic vehicle frame, then times
+predict_price_comprehensive once per vehicle against one
+predict_price_comprehensive_batch call over the same vehicles, and checks
+that both return the same prices.
+
+Usage:
+    PYTHONPATH=. python scripts/bench_model_batch.py --vehicles 2000
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from val_engine import model
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rows", type=int, default=1200, help="Synthetic training rows")
+    ap.add_argument("--vehicles", type=int, default=2000, help="Vehicles to price")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model.BUNDLE_PATH = os.path.join(tmp, "bundle.joblib")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.train_model(random_vehicle_frame(args.rows), use_feature_cache=False)
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(args.vehicles, seed=3).drop(columns=["price"]).iterrows()]
+
+    start = time.perf_counter()
+    single = [model.predict_price_comprehensive(v, model._model, model._encoders) for v in vehicles]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = model.predict_price_comprehensive_batch(vehicles, model._model, model._encoders)
+    batch_s = time.perf_counter() - start
+
+    assert batch == single, "batch prices differ from per-vehicle prices"
+    print(f"per vehicle: {single_s * 1000:8.1f} ms ({len(vehicles) / single_s:,.0f} rows/s)")
+    print(f"batch:       {batch_s * 1000:8.1f} ms ({len(vehicles) / batch_s:,.0f} rows/s), {single_s / batch_s:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Benchmark columnar feature engineering against the per-row path.
+
+Builds a synthetic vehicle frame and times engineer_comprehensive_features
+called once per row (the old path) against one call of
+engineer_comprehensive_features_frame over the whole frame, and checks that
+both produce the same features.
+
+Usage:
+    PYTHONPATH=. python scripts/bench_model_features.py --rows 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import pandas as pd
+
+from val_engine.model import engineer_comprehensive_features, engineer_comprehensive_features_frame
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rows", type=int, default=2000, help="Synthetic vehicles")
+    args = ap.parse_args()
+
+    df = random_vehicle_frame(args.rows, seed=11)
+
+    start = time.perf_counter()
+    rows = [engineer_comprehensive_features(row.to_dict()).iloc[0].to_dict() for _, row in df.iterrows()]
+    per_row_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = engineer_comprehensive_features_frame(df)
+    frame_s = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(frame.reset_index(drop=True), pd.DataFrame(rows), check_exact=True)
+    print(f"per row:  {per_row_s * 1000:8.1f} ms ({len(df) / per_row_s:,.0f} rows/s)")
+    print(f"columnar: {frame_s * 1000:8.1f} ms ({len(df) / frame_s:,.0f} rows/s), {per_row_s / frame_s:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Build the cohort explanation cache for the saved model bundle.
+
+Loads the model bundle, runs exact SHAP over the training set and writes
+per-cohort contribution templates (see val_engine.cohort_explanations),
+tagged with the bundle's model version. Run it after every retrain; serving
+ignores a cache built for another model version.
+
+Usage:
+    PYTHONPATH=. python scripts/build_cohort_explanations.py [--data training.csv] [--out cohort_explanations.joblib]
+"""
+from __future__ import annotations
+
+import argparse
+
+import pandas as pd
+
+from val_engine import model
+from val_engine.cohort_explanations import COHORT_EXPLANATIONS_PATH, COHORT_MIN_ROWS, CohortExplanationCache
+from val_engine.shap_explainer import register_explainer
+from val_engine.utils.data_loader import load_training_data
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--data", help="Training CSV (defaults to the engine's training data)")
+    ap.add_argument("--out", default=COHORT_EXPLANATIONS_PATH, help="Output path for the cache")
+    ap.add_argument("--min-rows", type=int, default=COHORT_MIN_ROWS, help="Smallest cohort to template")
+    args = ap.parse_args()
+
+    loaded, _ = model.load_model_artifacts()
+    register_explainer(loaded)
+    training_df = pd.read_csv(args.data) if args.data else load_training_data()
+
+    cache = CohortExplanationCache.build(training_df, min_rows=args.min_rows)
+    cache.save(args.out)
+    print(f"Model version {cache.model_version}: {len(cache.cohorts)} cohorts")
+
+
+if __name__ == "__main__":
+    main()
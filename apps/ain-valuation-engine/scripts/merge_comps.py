@@ -5,6 +5,7 @@ import pandas as pd
 
 # Your normalizer now maps miles -> mileage and handles list/single
 from val_engine.utils.normalize_listing import normalize_listing
+from engine.listing_store import ListingStore
 
 REQ_KEYS = ["source","year","make","model","price","mileage"]
 MIN_YEAR, MAX_YEAR = 1990, 2100
@@ -106,13 +107,16 @@ def iqr_trim_by_bucket(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return kept
 
 def main():
-    ap = argparse.ArgumentParser(description="Merge & normalize vehicle comps into one canonical JSON.")
+    ap = argparse.ArgumentParser(description="Merge & normalize vehicle comps into the comp store and/or one canonical JSON.")
     ap.add_argument("inputs", nargs="+", help="Files or folders (JSON/CSV or dirs)")
-    ap.add_argument("--out", required=True, help="Output path, e.g. in_out/merged_camry_comps.json")
+    ap.add_argument("--out", default=None, help="Output path, e.g. in_out/merged_camry_comps.json")
+    ap.add_argument("--store", default=None, help="Comp store directory to append to, e.g. in_out/comp_store")
     ap.add_argument("--expect-make", default="", help="Filter to make (e.g., TOYOTA)")
     ap.add_argument("--expect-model", default="", help="Filter to model (e.g., CAMRY)")
     ap.add_argument("--drop-outliers", action="store_true", help="Trim price outliers (IQR) per (year,trim)")
     args = ap.parse_args()
+    if not (args.out or args.store):
+        ap.error("one of --out or --store is required")
 
     # 1) Gather raw rows
     raw = iter_inputs(args.inputs)
@@ -162,13 +166,18 @@ def main():
                 seen.add(k)
 
     # 5) Save
-    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
-    with open(args.out, "w") as f:
-        json.dump({"listings": unique}, f, indent=2)
+    if args.store:
+        store = ListingStore(args.store)
+        store.append(unique)
+        store.compact()
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"listings": unique}, f, indent=2)
 
     # 6) Debug summary
     print(
-        f"Saved {args.out} | inputs={len(raw)} "
+        f"Saved {args.out or args.store} | inputs={len(raw)} "
         f"normalized_accepted={len(normalized)} unique={len(unique)} "
         f"norm_fail={len(norm_fail)} dropped_missing={len(dropped_missing)} dropped_range={len(dropped_range)}"
     )
@@ -259,13 +268,16 @@ def key(rec:Dict[str,Any])->tuple:
 
 def main():
     # ...existing code...
-    ap=argparse.ArgumentParser(description="Merge & normalize vehicle comps into one canonical JSON.")
+    ap=argparse.ArgumentParser(description="Merge & normalize vehicle comps into the comp store and/or one canonical JSON.")
     ap.add_argument("inputs", nargs="+", help="Files or folders (JSON/CSV or dirs)")
-    ap.add_argument("--out", required=True, help="Output path, e.g. in_out/merged_camry_comps.json")
+    ap.add_argument("--out", default=None, help="Output path, e.g. in_out/merged_camry_comps.json")
+    ap.add_argument("--store", default=None, help="Comp store directory to append to, e.g. in_out/comp_store")
     ap.add_argument("--expect-make", default="", help="Filter to make (e.g., TOYOTA)")
     ap.add_argument("--expect-model", default="", help="Filter to model (e.g., CAMRY)")
     ap.add_argument("--drop-outliers", action="store_true", help="Trim price outliers (IQR) after normalization")
     args=ap.parse_args()
+    if not (args.out or args.store):
+        ap.error("one of --out or --store is required")
 
     raw=iter_inputs(args.inputs)
     if not raw:
@@ -365,7 +377,7 @@ def main():
             normalized=kept
 
     # Debug summary
-    print(f"Saved {args.out} | inputs={len(raw)} normalized_accepted={len(normalized)} unique={len(out_list)}")
+    print(f"Saved {args.out or args.store} | inputs={len(raw)} normalized_accepted={len(normalized)} unique={len(out_list)}")
     if norm_fail:
         print(f"[DEBUG] normalize_failed: {len(norm_fail)} (showing up to 3)")
         for x in norm_fail[:3]:
@@ -17,11 +17,15 @@ import joblib
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 from ml.feature_spec_utils import save_feature_spec
+from val_engine.feature_cache import FeatureCache, hash_file
 
 # ---- Cardinality guardrails ----
 MAX_OHE_UNIQUES = 30         # lower cap for OHE
 EXCLUDE_CATS = {"vin"}       # never encode these
 
+# Bump whenever feature selection or preprocessing changes so cached matrices are not reused
+FEATURE_CODE_VERSION = "1"
+
 class FrequencyEncoder(BaseEstimator, TransformerMixin):
     """Maps each categorical value to its frequency in training.
     Returns a single numeric column. Unseen values at inference get 0.
@@ -49,6 +53,9 @@ def main():
     ap.add_argument("--test-size", type=float, default=0.2)
     ap.add_argument("--min-train-rows", type=int, default=1000)
     ap.add_argument("--metrics-out", default=None)
+    ap.add_argument("--no-feature-cache", action="store_true",
+                    help="Always rebuild the preprocessed feature matrices instead of reusing cached ones")
+    ap.add_argument("--feature-cache-dir", default=None)
     args = ap.parse_args()
 
     if args.data.endswith(".parquet"):
@@ -137,12 +144,28 @@ def main():
     X_train, X_tmp, y_train, y_tmp = train_test_split(X_full, y_full, test_size=0.40, random_state=42)
     X_calib, X_test, y_calib, y_test = train_test_split(X_tmp, y_tmp, test_size=0.50, random_state=42)
 
+    # --- preprocess once per (data, feature code, columns); reuse cached matrices on reruns ---
+    cache = None if args.no_feature_cache else FeatureCache(args.feature_cache_dir)
+    cache_key = FeatureCache.key(hash_file(args.data), FEATURE_CODE_VERSION, args.target,
+                                 numeric_cols, low_card_cols, high_card_cols)
+    cached = cache.load(cache_key) if cache else None
+    if cached is not None:
+        print(f"Loaded preprocessed features from cache ({cache_key[:12]})")
+        pre = cached["objects"]
+        Xt_train, Xt_calib, Xt_test = (cached["arrays"][k] for k in ("train", "calib", "test"))
+    else:
+        Xt_train = pre.fit_transform(X_train, y_train)
+        Xt_calib = pre.transform(X_calib)
+        Xt_test = pre.transform(X_test)
+        if cache is not None:
+            cache.store(cache_key, arrays={"train": Xt_train, "calib": Xt_calib, "test": Xt_test}, objects=pre)
+
     from sklearn.ensemble import HistGradientBoostingRegressor as HGBR
     model = HGBR(random_state=42, max_depth=None, learning_rate=0.05, max_iter=300)
+    model.fit(Xt_train, y_train)
     pipe = Pipeline(steps=[("pre", pre), ("gbm", model)])
-    pipe.fit(X_train, y_train)
 
-    preds = pipe.predict(X_test)
+    preds = model.predict(Xt_test)
     mae = float(mean_absolute_error(y_test, preds))
     rmse = float(np.sqrt(mean_squared_error(y_test, preds)))
     r2 = float(r2_score(y_test, preds))
@@ -150,7 +173,7 @@ def main():
     # --- conformal quantiles (90%) ---
     from val_engine.utils.conformal import quantiles_for_residuals
     Xc_rows = X_calib.to_dict(orient="records")
-    y_pred_calib = pipe.predict(X_calib)
+    y_pred_calib = model.predict(Xt_calib)
     conf = quantiles_for_residuals(y_calib, y_pred_calib, Xc_rows, eps=0.10)
     os.makedirs("artifacts", exist_ok=True)
     with open("artifacts/conformal.json","w") as f:
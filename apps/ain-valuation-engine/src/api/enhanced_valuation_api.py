@@ -14,8 +14,10 @@ Features:
 - API health check and valuation retrieval by ID.
 
 Endpoints:
-- POST /api/v1/valuations - Create new valuation with comprehensive data and mode.
-- GET /api/v1/valuations/<valuation_id> - Retrieve valuation results.
+- POST /api/v1/valuations - Create new valuation with comprehensive data, mode and
+  explain ('inline', 'approximate', 'deferred' or 'none').
+- GET /api/v1/valuations/<valuation_id> - Retrieve valuation results (including
+  deferred explanations once computed).
 - POST /api/v1/valuations/batch - Process multiple valuations in a single request.
 - GET /api/v1/health - API health check.
 
@@ -40,7 +42,9 @@ import sys
 # This handles the structure: /src/api/enhanced_valuation_api.py and /src/val_engine/...
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from val_engine.main import run_valuation, initialize_valuation_engine
+from val_engine.main import (run_valuation, initialize_valuation_engine, get_deferred_explanation,
+                             explain_valuations_batch, EXPLAIN_MODES)
+from val_engine.timing import StageTimer, server_timing_header
 from val_engine.model import MODEL_PATH, ENCODERS_PATH # For cleanup in example
 
 # Configure logging
@@ -223,6 +227,7 @@ def create_valuation():
         logger.warning("Received non-JSON request to /api/v1/valuations.")
         return make_response(jsonify({"error": "Request must be JSON"}), 400)
 
+    timer = StageTimer()
     try:
         payload = request.get_json()
         
@@ -233,9 +238,17 @@ def create_valuation():
             logger.warning(f"Invalid 'mode' provided: {valuation_mode}. Must be 'buy' or 'sell'.")
             return make_response(jsonify({"error": "Invalid 'mode' provided. Must be 'buy' or 'sell'."}), 400)
 
+        # 'inline' (default), 'approximate' (cohort-template SHAP where accurate enough),
+        # 'deferred' (explanation fetched later via GET) or 'none'
+        explain = payload.pop('explain', 'inline')
+        if explain not in EXPLAIN_MODES:
+            logger.warning(f"Invalid 'explain' provided: {explain}.")
+            return make_response(jsonify({"error": f"Invalid 'explain' provided. Must be one of {list(EXPLAIN_MODES)}."}), 400)
+
         # Validate the rest of the payload against the comprehensive schema
         # This will raise ValidationError if input does not conform
-        validated_data = VehicleDataForValuation(**payload)
+        with timer.stage("validate"):
+            validated_data = VehicleDataForValuation(**payload)
 
         logger.info(f"Received valid valuation request (VIN: {validated_data.vin.value if validated_data.vin else 'N/A'}) in '{valuation_mode}' mode.")
         
@@ -246,26 +259,32 @@ def create_valuation():
 
         # Pass the mode to run_valuation
         # .model_dump() converts Pydantic model to a dict, including nested models
-        valuation_result = run_valuation(validated_data.model_dump(by_alias=True), mode=valuation_mode) 
-
-        # Generate a unique ID for this valuation and cache it
+        # Generate a unique ID for this valuation (deferred explanations are keyed by it) and cache it
         valuation_id = str(uuid.uuid4())
-        valuation_result['valuation_id'] = valuation_id
+        valuation_result = run_valuation(validated_data.model_dump(by_alias=True), mode=valuation_mode,
+                                         explain=explain, valuation_id=valuation_id)
+
         valuation_result['timestamp'] = datetime.now().isoformat()
         valuation_result['api_version'] = '3.0'
         valuation_cache[valuation_id] = valuation_result
         
         logger.info(f"Completed valuation {valuation_id}: Estimated Value ${valuation_result['estimated_value']:,.2f} in '{valuation_mode}' mode.")
 
-        return jsonify({
+        response = jsonify({
             "success": True,
             "valuation_id": valuation_id,
             "estimated_value": valuation_result.get("estimated_value"),
             "confidence_score": valuation_result.get("confidence_score"),
             "adjustments": valuation_result.get("adjustments"),
             "summary": valuation_result.get("summary"), # Key is 'summary' from main.py
+            "explanation_status": valuation_result.get("explanation_status"),
             "raw_valuation_data": valuation_result  # Include full result for trace/debug
-        }), 200
+        })
+        if timer.enabled:
+            stages = {**timer.breakdown_ms(), **valuation_result.get("debug", {}).get("stage_timings_ms", {})}
+            stages["total"] = round(timer.total_seconds() * 1000, 3)
+            response.headers["Server-Timing"] = server_timing_header(stages)
+        return response, 200
 
     except ValidationError as ve:
         logger.warning(f"Validation error for /api/v1/valuations: {ve.errors()}")
@@ -294,7 +313,13 @@ def get_valuation(valuation_id):
             return jsonify({'error': 'Valuation not found'}), 404
         
         logger.info(f"Retrieving valuation {valuation_id} from cache.")
-        return jsonify(valuation_cache[valuation_id]), 200
+        valuation = valuation_cache[valuation_id]
+        if valuation.get('explanation_status') == 'pending':
+            # Attach the deferred SHAP adjustments and summary once the worker has finished
+            explanation = get_deferred_explanation(valuation_id)
+            if explanation and explanation['explanation_status'] != 'pending':
+                valuation.update(explanation)
+        return jsonify(valuation), 200
         
     except Exception as e:
         logger.error(f"Failed to retrieve valuation {valuation_id}: {str(e)}", exc_info=True)
@@ -317,6 +342,9 @@ def batch_valuations():
             return make_response(jsonify({'error': 'vehicles array required in batch request'}), 400)
         
         vehicles_payload = data['vehicles']
+        batch_explain = data.get('explain', 'inline')
+        if batch_explain not in EXPLAIN_MODES:
+            return make_response(jsonify({'error': f"explain must be one of {list(EXPLAIN_MODES)}"}), 400)
         if not isinstance(vehicles_payload, list) or len(vehicles_payload) == 0:
             logger.warning("Batch request 'vehicles' must be a non-empty array.")
             return make_response(jsonify({'error': 'vehicles must be a non-empty array'}), 400)
@@ -332,7 +360,11 @@ def batch_valuations():
             logger.error("Valuation engine not initialized for batch request.")
             return make_response(jsonify({"error": "Valuation engine not ready. Please try again later."}), 503)
 
+        timer = StageTimer()
+        batch_stages: Dict[str, float] = {}
         results = []
+        # Validate every item first so the valid ones can be explained with one SHAP call
+        pending = []
         for i, vehicle_data_raw in enumerate(vehicles_payload):
             valuation_id = f"batch_{uuid.uuid4()}_{i}"
             try:
@@ -343,11 +375,44 @@ def batch_valuations():
                     batch_valuation_mode = 'sell' # Default if invalid mode
 
                 # Validate each vehicle's data against the comprehensive schema
-                validated_data = VehicleDataForValuation(**vehicle_data_raw)
+                with timer.stage("validate"):
+                    validated_data = VehicleDataForValuation(**vehicle_data_raw)
+                pending.append((i, valuation_id, batch_valuation_mode, validated_data))
                 
+            except ValidationError as ve:
+                logger.warning(f"Validation error for batch item {i}: {ve.errors()}")
+                results.append({
+                    'batch_index': i,
+                    'valuation_id': valuation_id,
+                    'error': "Invalid input data",
+                    'details': ve.errors(),
+                    'status': 'failed'
+                })
+            except Exception as e:
+                logger.error(f"Error processing batch item {i}: {e}", exc_info=True)
+                results.append({
+                    'batch_index': i,
+                    'valuation_id': valuation_id,
+                    'error': "Internal processing error",
+                    'details': str(e),
+                    'status': 'failed'
+                })
+
+        input_dicts = [validated_data.model_dump(by_alias=True) for _, _, _, validated_data in pending]
+        shap_explanations = [None] * len(pending)
+        if batch_explain == 'inline':
+            with timer.stage("explain_batch"):
+                shap_explanations = explain_valuations_batch(input_dicts)
+
+        for (i, valuation_id, batch_valuation_mode, validated_data), input_dict, shap_explanation in zip(
+                pending, input_dicts, shap_explanations):
+            try:
                 logger.info(f"Processing batch item {i} (VIN: {validated_data.vin.value if validated_data.vin else 'N/A'}) in '{batch_valuation_mode}' mode.")
                 
-                result = run_valuation(validated_data.model_dump(by_alias=True), mode=batch_valuation_mode)
+                result = run_valuation(input_dict, mode=batch_valuation_mode, explain=batch_explain,
+                                       valuation_id=valuation_id, shap_explanation=shap_explanation)
+                for stage, duration_ms in result.get('debug', {}).get('stage_timings_ms', {}).items():
+                    batch_stages[stage] = batch_stages.get(stage, 0.0) + duration_ms
                 
                 result.update({
                     'valuation_id': valuation_id,
@@ -359,15 +424,6 @@ def batch_valuations():
                 results.append(result)
                 valuation_cache[valuation_id] = result
                 
-            except ValidationError as ve:
-                logger.warning(f"Validation error for batch item {i}: {ve.errors()}")
-                results.append({
-                    'batch_index': i,
-                    'valuation_id': valuation_id,
-                    'error': "Invalid input data",
-                    'details': ve.errors(),
-                    'status': 'failed'
-                })
             except Exception as e:
                 logger.error(f"Error processing batch item {i}: {e}", exc_info=True)
                 results.append({
@@ -377,16 +433,23 @@ def batch_valuations():
                     'details': str(e),
                     'status': 'failed'
                 })
+        results.sort(key=lambda r: r['batch_index'])
         
         logger.info(f"Batch processing complete. Total: {len(vehicles_payload)}, Success: {len([r for r in results if r.get('status') == 'success'])}, Failed: {len([r for r in results if r.get('status') == 'failed'])}")
 
-        return jsonify({
+        response = jsonify({
             'batch_request_id': str(uuid.uuid4()),
             'total_vehicles_in_batch': len(vehicles_payload),
             'successful_valuations': len([r for r in results if r.get('status') == 'success']),
             'failed_valuations': len([r for r in results if r.get('status') == 'failed']),
             'results': results
-        }), 200
+        })
+        if timer.enabled:
+            # Stage totals summed over the batch items
+            stages = {**timer.breakdown_ms(), **{k: round(v, 3) for k, v in batch_stages.items()}}
+            stages['total'] = round(timer.total_seconds() * 1000, 3)
+            response.headers['Server-Timing'] = server_timing_header(stages)
+        return response, 200
         
     except Exception as e:
         logger.error(f"Overall batch request failed: {e}", exc_info=True)
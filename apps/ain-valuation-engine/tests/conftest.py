@@ -2,3 +2,7 @@ import os, sys
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
+# Keep test training runs out of the user's feature cache; cache tests opt in explicitly
+os.environ.setdefault("AIN_FEATURE_CACHE", "0")
+# Valuation tests assert on freshly computed results; cache tests install their own result cache
+os.environ.setdefault("AIN_RESULT_CACHE", "0")
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+
+import pytest
+
+from val_engine import main
+from val_engine.audit_logger import AuditLogWriter
+
+
+class FakeSupabase:
+    """Local stand-in for the Supabase client's table().insert().execute() chain."""
+
+    class _Response:
+        def __init__(self, data):
+            self.data = data
+            self.error = None
+
+    def __init__(self, failures=0, latency=0.0):
+        self.failures = failures
+        self.latency = latency
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        self.table_name = name
+        return self
+
+    def insert(self, rows):
+        self._rows = rows
+        return self
+
+    def execute(self):
+        time.sleep(self.latency)
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("backend unavailable")
+            self.batches.append(list(self._rows))
+        return self._Response(self._rows)
+
+
+@pytest.fixture()
+def fake_supabase(monkeypatch, tmp_path):
+    client = FakeSupabase(latency=0.2)
+    monkeypatch.setattr(main, '_supabase_client', client)
+    writer = main.start_audit_writer(batch_size=25, flush_interval=0.05,
+                                     spill_path=str(tmp_path / 'spill.ndjson'), sleep=lambda s: None)
+    yield client, writer
+    writer.close()
+    monkeypatch.setattr(main, '_audit_writer', None)
+
+
+def test_logging_does_not_block_and_batches(fake_supabase):
+    client, writer = fake_supabase
+    record = {'valuation_id': 'v', 'estimated_value': 1.0, 'input_data': {'vin': {'value': 'X'}}}
+
+    start = time.perf_counter()
+    for i in range(100):
+        main._log_valuation_to_supabase({**record, 'valuation_id': f'v{i}'})
+    assert time.perf_counter() - start < 0.1  # one synchronous insert alone would take 0.2s
+
+    assert writer.flush(timeout=5)
+    rows = [row for batch in client.batches for row in batch]
+    assert [row['valuation_id'] for row in rows] == [f'v{i}' for i in range(100)]
+    assert rows[0]['input_vin'] == 'X' and client.table_name == main.AUDIT_TABLE_NAME
+    assert max(len(batch) for batch in client.batches) <= 25 and len(client.batches) < 100
+    assert main.get_audit_log_metrics()['written'] == 100
+
+
+def test_retries_with_backoff_then_succeeds(tmp_path):
+    client = FakeSupabase(failures=2)
+    delays = []
+    writer = AuditLogWriter(lambda rows: client.insert(rows).execute(), flush_interval=0.01,
+                            spill_path=str(tmp_path / 'spill.ndjson'), sleep=delays.append).start()
+    writer.submit({'valuation_id': 'a'})
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert delays == [0.2, 0.4]
+    assert client.batches == [[{'valuation_id': 'a'}]]
+    assert writer.metrics()['retries'] == 2 and writer.metrics()['spilled'] == 0
+
+
+def test_spills_when_backend_down_and_replays(tmp_path):
+    spill = tmp_path / 'spill.ndjson'
+    down = FakeSupabase(failures=10 ** 6)
+    writer = AuditLogWriter(lambda rows: down.insert(rows).execute(), flush_interval=0.01, max_retries=2,
+                            spill_path=str(spill), sleep=lambda s: None).start()
+    for i in range(5):
+        writer.submit({'valuation_id': i})
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert [json.loads(line)['valuation_id'] for line in spill.read_text().splitlines()] == list(range(5))
+    assert writer.metrics()['spilled'] == 5 and writer.metrics()['queue_depth'] == 0
+
+    up = FakeSupabase()
+    writer = AuditLogWriter(lambda rows: up.insert(rows).execute(), flush_interval=0.01,
+                            spill_path=str(spill)).start()
+    assert writer.replay_spill() == 5
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert [row['valuation_id'] for batch in up.batches for row in batch] == list(range(5))
+    assert not spill.exists()
+
+
+def test_full_queue_spills_instead_of_blocking(tmp_path):
+    writer = AuditLogWriter(lambda rows: None, max_queue=2, spill_path=str(tmp_path / 'spill.ndjson'))
+    assert writer.submit({'n': 1}) and writer.submit({'n': 2})
+    assert writer.submit({'n': 3}) is False
+    assert writer.metrics() == {'queue_depth': 2, 'submitted': 3, 'written': 0, 'batches': 0,
+                                'retries': 0, 'failed_batches': 0, 'spilled': 1}
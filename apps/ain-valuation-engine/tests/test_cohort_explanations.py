@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from val_engine import cohort_explanations, main, model, shap_explainer
+from val_engine.cohort_explanations import CohortExplanationCache
+
+
+def structured_frame(n=3000, seed=0):
+    """Listings whose price is a smooth function of cohort, mileage and condition."""
+    rng = np.random.default_rng(seed)
+    make = rng.choice(['Toyota', 'Honda'], n)
+    condition = rng.choice(['Good', 'Excellent'], n)
+    year = rng.integers(2018, 2021, n)
+    mileage = rng.integers(5000, 120000, n)
+    price = (np.where(make == 'Toyota', 26000, 23000) + (year - 2018) * 1500 - 0.06 * mileage
+             + np.where(condition == 'Excellent', 1500, 0))
+    return pd.DataFrame({'make': make, 'model': np.where(make == 'Toyota', 'Camry', 'Civic'), 'year': year,
+                         'mileage': mileage, 'overall_condition_rating': condition, 'condition': condition,
+                         'zipcode': 90210, 'price': price})
+
+
+def vehicle(make, model_name, year, mileage, condition):
+    return {'vin': {'value': '1HGCM82633A004352'}, 'make': {'value': make}, 'model': {'value': model_name},
+            'year': {'value': year}, 'mileage': {'value': mileage},
+            'overall_condition_rating': {'value': condition}, 'zipcode': {'value': 90210}}
+
+
+@pytest.fixture(scope="module")
+def cache():
+    df = structured_frame()
+    model.train_model(df)
+    shap_explainer.set_explainer(model._model)
+    return CohortExplanationCache.build(df, min_rows=20)
+
+
+def test_cohort_approximation_within_bound(cache):
+    assert cache.model_version == model.get_model_version()
+    cache.max_error = 0.1
+    rng = np.random.default_rng(3)
+    for i in range(20):
+        v = vehicle(*[('Toyota', 'Camry'), ('Honda', 'Civic')][i % 2], int(rng.integers(2019, 2021)),
+                    int(rng.integers(10000, 100000)), 'Good')
+        price = model.predict_price_comprehensive(v)['predicted_price']
+        approx = shap_explainer.explain_prediction_approximate(v, price, cache)
+        exact = shap_explainer.explain_prediction_comprehensive(v)
+
+        assert approx['approximation']['method'] == 'cohort'
+        assert set(exact) <= set(approx)
+        assert approx['feature_names'] == exact['feature_names']
+        actual_error = np.abs(approx['shap_values'] - exact['shap_values']).sum()
+        assert approx['approximation']['error_estimate'] <= cache.max_error * price
+        assert actual_error <= cache.max_error * price
+
+
+def test_falls_back_to_exact(cache):
+    cache.max_error = 0.1
+    v = vehicle('Toyota', 'Camry', 2019, 50000, 'Good')
+    price = model.predict_price_comprehensive(v)['predicted_price']
+    exact = shap_explainer.explain_prediction_comprehensive(v)
+
+    for reason, kwargs in [('unknown cohort', dict(vehicle_data=vehicle('Ford', 'F-150', 2019, 50000, 'Good'))),
+                           ('outside mileage range', dict(vehicle_data=vehicle('Toyota', 'Camry', 2019, 400000, 'Good'))),
+                           ('additivity gap', dict(vehicle_data=v, predicted_price=price * 3))]:
+        explanation = shap_explainer.explain_prediction_approximate(
+            kwargs['vehicle_data'], kwargs.get('predicted_price', price), cache)
+        assert explanation['approximation']['method'] == 'exact', reason
+
+    cache.max_error = 0.0
+    explanation = shap_explainer.explain_prediction_approximate(v, price, cache)
+    assert explanation['approximation']['method'] == 'exact'
+    np.testing.assert_allclose(explanation['shap_values'], exact['shap_values'])
+
+
+def test_cache_is_versioned_with_model(cache, tmp_path, monkeypatch):
+    path = str(tmp_path / 'cohorts.joblib')
+    cache.save(path)
+    monkeypatch.setattr(cohort_explanations, '_loaded', (None, None))
+    assert cohort_explanations.get_cohort_cache(path).cohorts.keys() == cache.cohorts.keys()
+
+    monkeypatch.setattr(model, '_model_version', 'retrained')
+    assert cohort_explanations.get_cohort_cache(path) is None
+
+
+def test_run_valuation_approximate_mode(cache, monkeypatch):
+    cache.max_error = 0.1
+    monkeypatch.setattr(main, '_loaded_model', model._model)
+    monkeypatch.setattr(main, '_loaded_encoders', model._encoders)
+    monkeypatch.setattr(main, '_shap_explainer_instance', True)
+    monkeypatch.setattr(main, 'generate_valuation_summary', lambda *args, **kwargs: 'summary')
+    monkeypatch.setattr(cohort_explanations, '_loaded', (cache.model_version, cache))
+
+    result = main.run_valuation(vehicle('Honda', 'Civic', 2020, 30000, 'Good'), explain='approximate')
+    assert result['explanation_status'] == 'approximate'
+    assert result['adjustments']['approximation']['method'] == 'cohort'
+    assert len(result['adjustments']['feature_contributions']) == len(cache.feature_names)
+    with pytest.raises(ValueError):
+        main.run_valuation(vehicle('Honda', 'Civic', 2020, 30000, 'Good'), explain='rough')
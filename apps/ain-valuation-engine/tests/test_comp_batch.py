@@ -0,0 +1,104 @@
+import copy
+
+import numpy as np
+import pytest
+import yaml
+
+from engine.comp_batch import CompBatch
+from engine.comps_filter import FilteredComp, RawComp, filter_comps
+from engine.comps_selector import select_comps
+from engine.pricing_core import BlendConfig, Comp, WeightsConfig, hybrid_price
+
+
+def load_cfg(outlier_filter="IQR"):
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    cfg["filters"]["comps"]["outlier_filter"] = outlier_filter
+    return cfg
+
+
+def random_comps(n, seed):
+    rng = np.random.default_rng(seed)
+    price = rng.normal(22000, 2500, n).round(2)
+    price[rng.random(n) < 0.05] *= 3  # a few outliers
+    return [Comp(price=float(p), mileage=int(m), distance_km=float(d), days_old=int(a))
+            for p, m, d, a in zip(price, rng.integers(5000, 150000, n), rng.exponential(120, n).round(1),
+                                  rng.integers(0, 90, n))]
+
+
+def reference_select(comps, cfg):
+    for radius in cfg["filters"]["radius_steps_km"]:
+        selected = [c for c in comps if c.distance_km <= radius]
+        if len(selected) >= cfg["filters"]["comps"]["min_k"]:
+            return selected
+    return sorted(comps, key=lambda c: c.distance_km)[:cfg["filters"]["comps"]["min_k"]]
+
+
+def reference_filter(comps, cfg):
+    fcfg = cfg["filters"]["comps"]
+    prices = np.array([c.price for c in comps])
+    kept = np.ones(len(comps), dtype=bool)
+    removals = []
+    if len(comps) >= fcfg["min_k"] * 2:
+        mask = np.array([c.days_old for c in comps]) <= fcfg["min_freshness_days"]
+        if mask.sum() >= fcfg["min_k"]:
+            kept &= mask
+            removals += [(i, f"stale>{fcfg['min_freshness_days']}d") for i, ok in enumerate(mask) if not ok]
+    if fcfg["outlier_filter"] == "IQR":
+        q1, q3 = np.percentile(prices, [25, 75])
+        mask = (prices >= q1 - fcfg["iqr_multiplier"] * (q3 - q1)) & (prices <= q3 + fcfg["iqr_multiplier"] * (q3 - q1))
+    else:
+        med = np.median(prices)
+        mask = np.abs(prices - med) / (np.median(np.abs(prices - med)) + 1e-9) <= fcfg["mad_multiplier"]
+    kept &= mask
+    removals += [(i, "price_outlier") for i, ok in enumerate(mask) if not ok]
+    return [comps[i] for i in np.flatnonzero(kept)], removals
+
+
+@pytest.mark.parametrize("outlier_filter", ["IQR", "MAD"])
+def test_batch_ladder_matches_list_reference(outlier_filter):
+    cfg = load_cfg(outlier_filter)
+    for seed in range(50):
+        comps = random_comps(int(np.random.default_rng(seed).integers(1, 600)), seed)
+        selected = select_comps(CompBatch.from_comps(comps), 0, cfg)
+        expected_selected = reference_select(comps, cfg)
+        assert selected.records() == [vars(c) for c in expected_selected]
+        assert select_comps(comps, 0, cfg) == expected_selected
+
+        kept, removals, stats = filter_comps(selected, cfg, max_mileage_delta_pct=0.4)
+        expected_kept, expected_removals = reference_filter(expected_selected, cfg)
+        assert kept.records() == [vars(c) for c in expected_kept]
+        assert [(r.idx, r.reason) for r in removals] == expected_removals
+        assert stats["kept"] == len(expected_kept)
+
+        list_kept, list_removals, list_stats = filter_comps(expected_selected, cfg, max_mileage_delta_pct=0.4)
+        assert list_kept == [FilteredComp(**vars(c)) for c in expected_kept]
+        assert [vars(r) for r in list_removals] == removals.records()
+        assert list_stats == stats
+
+
+def test_ids_follow_survivors():
+    comps = [RawComp(10000 + i, 50000, float(i), 5) for i in range(10)] + [RawComp(90000, 50000, 1.0, 5)]
+    batch = CompBatch.from_comps(comps)
+    kept, removals, _ = filter_comps(select_comps(batch, 0, load_cfg()), load_cfg(), 0.4)
+    assert 10 not in kept.id.tolist() and [r.reason for r in removals] == ["price_outlier"]
+    assert [comps[i].price for i in kept.id] == kept.price.tolist()
+
+
+def test_hybrid_price_accepts_lists_and_batches():
+    cfg = load_cfg()
+    wcfg = WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+    for seed in range(20):
+        comps = random_comps(400, seed)
+        from_list = hybrid_price(21000.0, comps, 0.7, wcfg)
+        from_batch = hybrid_price(21000.0, CompBatch.from_comps(copy.deepcopy(comps)), 0.7, wcfg)
+        assert from_list == from_batch
+
+        expected_kept, expected_removals = reference_filter(reference_select(comps, cfg), cfg)
+        prices = np.array([c.price for c in expected_kept])
+        assert from_list["comp_median"] == np.median(prices)
+        assert from_list["kept_comps"] == [vars(c) for c in expected_kept]
+        assert [(r["idx"], r["reason"]) for r in from_list["removals"]] == expected_removals
+    with pytest.raises(ValueError):
+        hybrid_price(21000.0, CompBatch.from_comps([]), 0.7, wcfg)
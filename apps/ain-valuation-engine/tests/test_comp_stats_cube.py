@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+import yaml
+
+from engine.comp_stats_cube import CompStatsCube
+from engine.comp_store import haversine_km
+from engine.pricing_core import BlendConfig, Comp, WeightsConfig, hybrid_price
+
+CENTROIDS = {"900": (34.05, -118.25), "606": (41.88, -87.63), "100": (40.75, -73.99)}
+
+
+@pytest.fixture
+def cfg():
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    return cfg
+
+
+def wcfg_for(cfg):
+    return WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+
+
+def random_listings(n, seed, start_id=0):
+    rng = np.random.default_rng(seed)
+    zips = list(CENTROIDS.values())
+    listings = []
+    for i in range(n):
+        lat, lon = zips[rng.integers(len(zips))]
+        listings.append({
+            "id": start_id + i,
+            "make": ["Toyota", "Honda"][rng.integers(2)], "model": "Camry", "year": int(rng.integers(2018, 2020)),
+            "lat": lat + rng.normal(0, 0.6), "lon": lon + rng.normal(0, 0.8),
+            "price": round(float(rng.normal(22000, 2500)), 2) * (3 if rng.random() < 0.03 else 1),
+            "mileage": int(rng.integers(5000, 120000)), "days_old": int(rng.integers(0, 60)),
+        })
+    return listings
+
+
+def raw_comps(cube, subject):
+    """The subject's segment comps in cube insertion order, with distance from the zip3 centroid."""
+    lat, lon = CENTROIDS[subject["zip"][:3]]
+    comps = []
+    for listing_id, (segment, price, mileage, days_old, _) in cube._listings.items():
+        if segment == (subject["make"].upper(), subject["model"].upper(), subject["year"]):
+            d = float(haversine_km(lat, lon, cube._listing_latlon[listing_id][0], cube._listing_latlon[listing_id][1]))
+            comps.append(Comp(price=price, mileage=mileage, distance_km=d, days_old=days_old))
+    return comps
+
+
+class TrackedCube(CompStatsCube):
+    """Keeps listing coordinates so tests can rebuild the raw comp list."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listing_latlon = {}
+
+    def add(self, listing):
+        self._listing_latlon[listing["id"]] = (listing["lat"], listing["lon"])
+        return super().add(listing)
+
+
+SUBJECTS = [{"make": make, "model": "Camry", "year": year, "zip": z}
+            for make in ("Toyota", "Honda") for year in (2018, 2019) for z in ("90012", "60601", "10001")]
+
+
+def assert_parity(cube, cfg):
+    wcfg = wcfg_for(cfg)
+    hits = 0
+    for subject in SUBJECTS:
+        from_cube = hybrid_price(21000.0, [], 0.7, wcfg, subject=subject, cube=cube) \
+            if cube.lookup(subject) is not None else None
+        comps = raw_comps(cube, subject)
+        if from_cube is None:
+            continue
+        hits += 1
+        assert from_cube == hybrid_price(21000.0, comps, 0.7, wcfg)
+    return hits
+
+
+def test_cube_matches_raw_comps_through_updates(cfg):
+    cube = TrackedCube(CENTROIDS, cfg)
+    for listing in random_listings(600, 0):
+        cube.add(listing)
+    assert assert_parity(cube, cfg) == len(SUBJECTS)
+
+    # Incremental maintenance: new listings, delistings, aging and expiry
+    for listing in random_listings(100, 1, start_id=10000):
+        cube.add(listing)
+    for listing_id in range(0, 600, 7):
+        assert cube.remove(listing_id)
+    assert not cube.remove(3.5)
+    cube.age(10)
+    assert cube.expire(60) > 0
+    assert assert_parity(cube, cfg) == len(SUBJECTS)
+
+
+def test_cell_stats(cfg):
+    cube = TrackedCube(CENTROIDS, cfg)
+    for listing in random_listings(300, 2):
+        cube.add(listing)
+    subject = SUBJECTS[0]
+    comps = [c for c in raw_comps(cube, subject) if c.distance_km <= 100]
+    cell = cube.cell("Toyota", "Camry", 2018, "900", 100)
+    prices = np.array([c.price for c in comps])
+    assert cell["k"] == len(comps)
+    assert cell["median"] == np.median(prices)
+    assert cell["mad"] == np.median(np.abs(prices - np.median(prices)))
+    assert cell["freshness_median"] == np.median([c.days_old for c in comps])
+    assert cube.cell("Toyota", "Camry", 2018, "900", 77) is None
+
+
+def test_misses_fall_back_to_raw_comps_and_are_counted(cfg):
+    cube = TrackedCube(CENTROIDS, cfg, segments=[("Toyota", "Camry", 2018)])
+    listings = random_listings(200, 3)
+    for listing in listings:
+        cube.add(listing)
+    assert all(cube._listings[l["id"]][0] == ("TOYOTA", "CAMRY", 2018) for l in listings if l["id"] in cube._listings)
+
+    wcfg = wcfg_for(cfg)
+    subject = {"make": "Toyota", "model": "Camry", "year": 2018, "zip": "90012"}
+    comps = raw_comps(cube, subject)
+    assert hybrid_price(21000.0, [], 0.7, wcfg, subject=subject, cube=cube) == hybrid_price(21000.0, comps, 0.7, wcfg)
+
+    honda = {"make": "Honda", "model": "Camry", "year": 2018, "zip": "90012"}
+    assert hybrid_price(21000.0, comps, 0.7, wcfg, subject=honda, cube=cube)["price"] > 0
+    with pytest.raises(ValueError):
+        hybrid_price(21000.0, [], 0.7, wcfg, subject={**subject, "zip": "33101"}, cube=cube)
+    other_cfg = {**cfg, "filters": {**cfg["filters"], "radius_steps_km": [10, 20]}}
+    assert cube.lookup(subject, other_cfg) is None
+
+    m = cube.metrics()
+    assert m["hits"] == 1 and m["misses"] == {"segment": 1, "zip3": 1, "config": 1}
+    assert m["hit_rate"] == pytest.approx(0.25)
+
+
+def test_subject_mileage_window_matches_raw_comps(cfg):
+    cube = TrackedCube(CENTROIDS, cfg)
+    for listing in random_listings(600, 4):
+        cube.add(listing)
+    wcfg = wcfg_for(cfg)
+    pcts = set()
+    for subject in SUBJECTS:
+        for mileage in (8000, 45000, 110000):
+            with_mileage = {**subject, "mileage": mileage}
+            if cube.lookup(with_mileage) is None:
+                continue
+            from_cube = hybrid_price(21000.0, [], 0.7, wcfg, subject=with_mileage, cube=cube)
+            assert from_cube == hybrid_price(21000.0, raw_comps(cube, subject), 0.7, wcfg, subject={"mileage": mileage})
+            pcts.add(from_cube["stats"]["mileage_delta_pct"])
+    assert 0.4 in pcts
+
+    # Window summaries are cached: repeats and subjects whose window holds the same comps reuse them
+    computed = cube.metrics()["computed"]
+    for subject in SUBJECTS:
+        for mileage in (8000, 45000, 45001, 110000):
+            cube.lookup({**subject, "mileage": mileage})
+    assert cube.metrics()["computed"] == computed
+    cube.age(1)
+    cube.lookup({**SUBJECTS[0], "mileage": 45000})
+    assert cube.metrics()["computed"] == computed + 1
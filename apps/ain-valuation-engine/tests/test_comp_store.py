@@ -0,0 +1,54 @@
+import numpy as np
+
+from engine.comp_batch import CompBatch
+from engine.comp_store import SpatialCompStore, haversine_km
+from engine.comps_selector import select_comps, select_comps_near
+
+CFG = {"filters": {"radius_steps_km": [25, 50, 100, 300, 1000], "comps": {"min_k": 3}}}
+
+
+def random_store(n, seed):
+    rng = np.random.default_rng(seed)
+    return SpatialCompStore(lat=rng.uniform(25, 49, n), lon=rng.uniform(-124, -67, n),
+                            price=rng.normal(22000, 3000, n), mileage=rng.integers(5000, 150000, n),
+                            days_old=rng.integers(0, 90, n), id=rng.permutation(n) + 1000)
+
+
+def full_scan(store, lat, lon, cfg):
+    batch = CompBatch(store.price, store.mileage, haversine_km(lat, lon, store.lat, store.lon),
+                      store.days_old, store.id)
+    return select_comps(batch, 0, cfg)
+
+
+def assert_same(a, b):
+    assert a.id.tolist() == b.id.tolist()
+    np.testing.assert_allclose(a.distance_km, b.distance_km)
+    assert a.price.tolist() == b.price.tolist()
+
+
+def test_ladder_matches_full_scan():
+    rng = np.random.default_rng(0)
+    for n in (5, 200, 20000):
+        store = random_store(n, n)
+        for _ in range(30):
+            lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+            assert_same(select_comps_near(store, lat, lon, CFG), full_scan(store, lat, lon, CFG))
+
+
+def test_fallback_returns_nearest_when_no_radius_has_enough():
+    store = SpatialCompStore(lat=[40.0, 10.0, -20.0, 41.0], lon=[-100.0, 20.0, 130.0, -100.0],
+                             price=[1, 2, 3, 4], mileage=[0] * 4, days_old=[0] * 4)
+    selected = select_comps_near(store, 40.5, -100.0, CFG)
+    assert selected.id.tolist() == [0, 3, 1]  # equidistant comps keep store order
+    assert_same(selected, full_scan(store, 40.5, -100.0, CFG))
+
+
+def test_radius_edge_and_from_records():
+    # One degree of latitude is ~111.2 km; a comp exactly at the radius is included
+    store = SpatialCompStore.from_records([
+        {"lat": 40.0, "lon": -100.0, "price": 1, "mileage": 1, "days_old": 1, "id": 7},
+        {"lat": 41.0, "lon": -100.0, "price": 2, "mileage": 2, "days_old": 2, "id": 8},
+    ])
+    edge = float(haversine_km(40.0, -100.0, 41.0, -100.0))
+    assert store.within(40.0, -100.0, edge).id.tolist() == [7, 8]
+    assert store.within(40.0, -100.0, edge - 1e-6).id.tolist() == [7]
@@ -0,0 +1,66 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+
+from val_engine import model
+from val_engine.compiled_model import CompiledTreeEnsemble, compile_model
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+@pytest.fixture(scope="module")
+def regression_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 12))
+    X[:, :3] = rng.integers(0, 6, size=(2000, 3))
+    y = 20000 + 3000 * X[:, 0] - 1500 * X[:, 4] + 800 * X[:, 5] * X[:, 6] + rng.normal(scale=500, size=2000)
+    return X, y
+
+
+@pytest.mark.parametrize("params", [
+    dict(n_estimators=200, max_depth=7, learning_rate=0.08, subsample=0.8, random_state=42),
+    dict(n_estimators=50, max_depth=3, init='zero', random_state=1),
+    dict(n_estimators=30, max_depth=None, max_leaf_nodes=16, loss='huber', random_state=2),
+])
+def test_compiled_matches_sklearn(regression_data, params):
+    X, y = regression_data
+    gbr = GradientBoostingRegressor(**params).fit(X, y)
+    compiled = CompiledTreeEnsemble.from_estimator(gbr)
+
+    np.testing.assert_allclose(compiled.predict(X), gbr.predict(X), rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(compiled.predict(X[:1].tolist()), gbr.predict(X[:1]), rtol=1e-9, atol=1e-6)
+
+
+def test_compiled_rejects_wrong_shape(regression_data):
+    X, y = regression_data
+    compiled = compile_model(GradientBoostingRegressor(n_estimators=5).fit(X, y))
+    with pytest.raises(ValueError):
+        compiled.predict(X[:, :5])
+    with pytest.raises(TypeError):
+        CompiledTreeEnsemble(object())
+
+
+def test_compiled_comprehensive_prediction_and_loading(tmp_path, monkeypatch):
+    model.train_model(random_vehicle_frame(1200))
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(50, seed=9).drop(columns=['price']).iterrows()]
+    compiled = compile_model(model._model)
+
+    for vehicle in vehicles[:10]:
+        expected = model.predict_price_comprehensive(vehicle)
+        actual = model.predict_price_comprehensive(vehicle, compiled, model._encoders)
+        assert actual['predicted_price'] == pytest.approx(expected['predicted_price'], rel=1e-9)
+    batch = model.predict_price_comprehensive_batch(vehicles, compiled, model._encoders)
+    assert [r['predicted_price'] for r in batch] == pytest.approx(
+        [r['predicted_price'] for r in model.predict_price_comprehensive_batch(vehicles)], rel=1e-9
+    )
+
+    monkeypatch.setattr(model, 'BUNDLE_PATH', str(tmp_path / 'missing_bundle.joblib'))
+    monkeypatch.setattr(model, 'MODEL_PATH', str(tmp_path / 'model.joblib'))
+    monkeypatch.setattr(model, 'ENCODERS_PATH', str(tmp_path / 'encoders.joblib'))
+    joblib.dump(model._model, model.MODEL_PATH)
+    joblib.dump(model._encoders, model.ENCODERS_PATH)
+    loaded, encoders = model.load_model_artifacts(compiled=True)
+    assert set(encoders) == set(model._encoders)
+    assert isinstance(loaded, CompiledTreeEnsemble)
+    assert isinstance(loaded.source_model, GradientBoostingRegressor)
+
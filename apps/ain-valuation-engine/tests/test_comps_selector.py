@@ -16,3 +16,15 @@ def test_select_comps_fallback():
     selected = select_comps(comps, subject_mileage=50000, cfg=cfg)
     assert len(selected) == 1
     assert selected[0].distance_km == 200
+
+def test_select_comps_widens_radius_for_mileage_window():
+    comps = [RawComp(price=10000, mileage=150000, distance_km=5, days_old=5),
+             RawComp(price=11000, mileage=140000, distance_km=10, days_old=7),
+             RawComp(price=12000, mileage=52000, distance_km=40, days_old=10),
+             RawComp(price=12500, mileage=48000, distance_km=45, days_old=10)]
+    cfg = {'filters': {'radius_steps_km': [20, 50, 100], 'comps': {'min_k': 2}}}
+    assert len(select_comps(comps, subject_mileage=50000, cfg=cfg)) == 2
+    selected = select_comps(comps, subject_mileage=50000, cfg=cfg, mileage_window=(30000, 70000))
+    assert [c.mileage for c in selected] == [150000, 140000, 52000, 48000]
+    # No radius holds enough comps in the window: the plain ladder applies
+    assert len(select_comps(comps, subject_mileage=50000, cfg=cfg, mileage_window=(0, 1000))) == 2
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+import yaml
+
+from engine.confidence import (ConfidenceEngine, ConfidenceInputs, PiecewiseMap, band_from_label, compiled_confidence,
+                               confidence_label, confidence_score)
+from engine.pricing_core import BlendConfig, ReliabilityInputs, WeightsConfig, reliability_score
+
+
+@pytest.fixture
+def cfg():
+    with open("configs/weights.v1.yaml") as f:
+        return yaml.safe_load(f)
+
+
+# Reference implementations (the per-call versions the engine replaced)
+
+def reference_piecewise(x, b, increasing=True, top=3.0):
+    x = max(b[0], min(b[-1], x))
+    if x <= b[1]:
+        s = (x - b[0]) / (b[1] - b[0] + 1e-9)
+    elif x <= b[2]:
+        s = 1.0 + (x - b[1]) / (b[2] - b[1] + 1e-9)
+    else:
+        s = 2.0 + (top - 2.0) * ((x - b[2]) / (b[3] - b[2] + 1e-9))
+    s = s / 3.0
+    return s if increasing else (1.0 - s)
+
+
+def reference_score(cfg, cin):
+    r = cfg["reliability"]
+    raw = (0.25 * reference_piecewise(cin.k_comps, r["k_comps_breakpoints"])
+           + 0.20 * reference_piecewise(cin.freshness_days_med, r["freshness_days_breakpoints"], False)
+           + 0.20 * reference_piecewise(cin.dispersion_mad, r["dispersion_mad_breakpoints"], False)
+           + 0.15 * max(0.0, min(1.0, cin.completeness))
+           + 0.10 * (1.0 if cin.history_verified else 0.6) + 0.10 * (1.0 if cin.condition_available else 0.7))
+    score = max(0.0, min(1.0, raw))
+    if cin.method_tag == "fallback_pricing":
+        score = min(score, cfg["confidence"]["cap_low_confidence"])
+    return float(score)
+
+
+def reference_label(cfg, score):
+    if score >= cfg["confidence"]["high_threshold"]:
+        return "High"
+    return "Medium" if score >= cfg["confidence"]["medium_threshold"] else "Low"
+
+
+def random_inputs(n, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "k": rng.integers(-2, 12, n), "fresh": rng.uniform(-5, 40, n), "mad": rng.uniform(-100, 4000, n),
+        "completeness": rng.uniform(-0.2, 1.2, n), "history": rng.random(n) < 0.5, "condition": rng.random(n) < 0.5,
+        "method": rng.choice(["live", "blended", "fallback_pricing"], n), "price": rng.uniform(5000, 80000, n),
+    }
+
+
+def test_scalar_and_vector_paths_match_reference(cfg):
+    x = random_inputs(5000, 0)
+    engine = ConfidenceEngine.from_config(cfg)
+    scores = engine.scores(x["k"], x["fresh"], x["mad"], x["completeness"], x["history"], x["condition"], x["method"])
+    labels = engine.labels(scores)
+    low, high = engine.bands(x["price"], labels)
+    for i in range(len(scores)):
+        cin = ConfidenceInputs(int(x["k"][i]), float(x["fresh"][i]), float(x["mad"][i]), float(x["completeness"][i]),
+                               bool(x["history"][i]), bool(x["condition"][i]), str(x["method"][i]))
+        expected = reference_score(cfg, cin)
+        label = reference_label(cfg, expected)
+        assert confidence_score(cfg, cin) == expected == scores[i]
+        assert confidence_label(cfg, expected) == label == labels[i]
+        assert band_from_label(cfg, float(x["price"][i]), label) == (low[i], high[i])
+    assert set(labels) == {"High", "Medium", "Low"}
+
+
+def test_breakpoint_edges(cfg):
+    m = PiecewiseMap.compile(cfg["reliability"]["k_comps_breakpoints"])
+    edges = [-1, 0, 3, 3.0000001, 5, 8, 100]
+    np.testing.assert_array_equal(m(edges), [m.scalar(e) for e in edges])
+    assert [m.scalar(e) for e in edges] == [reference_piecewise(e, [0, 3, 5, 8]) for e in edges]
+
+
+def test_reliability_score_delegates(cfg):
+    wcfg = WeightsConfig(reliability=cfg["reliability"], blend_weights=BlendConfig(**cfg["blend_weights"]))
+    x = random_inputs(2000, 1)
+    r = cfg["reliability"]
+    for i in range(2000):
+        rel = ReliabilityInputs(int(x["k"][i]), float(x["fresh"][i]), float(x["mad"][i]), float(x["completeness"][i]),
+                                bool(x["history"][i]), bool(x["condition"][i]))
+        raw = (0.25 * reference_piecewise(rel.k_comps, r["k_comps_breakpoints"], True, 4.0)
+               + 0.20 * reference_piecewise(rel.freshness_days, r["freshness_days_breakpoints"], False, 4.0)
+               + 0.20 * reference_piecewise(rel.dispersion_mad, r["dispersion_mad_breakpoints"], False, 4.0)
+               + 0.15 * rel.completeness + 0.10 * (1.0 if rel.history_verified else 0.6)
+               + 0.10 * (1.0 if rel.condition_available else 0.7))
+        assert reliability_score(rel, wcfg) == float(np.clip(raw, 0.0, 1.0))
+
+
+def test_engine_is_compiled_once_and_frozen(cfg):
+    engine = compiled_confidence(cfg)
+    assert compiled_confidence(cfg) is engine
+    assert compiled_confidence(dict(cfg)) is not engine
+    with pytest.raises(ValueError):
+        engine.bands_pct[0, 0] = 0.5
+    with pytest.raises(AttributeError):
+        engine.fallback_cap = 0.9
+    with pytest.raises(KeyError):
+        band_from_label(cfg, 20000.0, "Unknown")
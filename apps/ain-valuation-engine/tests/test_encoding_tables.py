@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from val_engine import model, shap_explainer
+
+
+def _label_encode(le, value):
+    """Reference per-value encoding with the LabelEncoder ('Unknown' fallback, else 0)."""
+    if value in le.classes_:
+        return le.transform([value])[0]
+    if 'Unknown' in le.classes_:
+        return le.transform(['Unknown'])[0]
+    return 0
+
+
+def test_table_matches_label_encoder():
+    le = LabelEncoder().fit(['Toyota', 'Honda', 'Ford', 'Unknown'])
+    table = model.CategoryTable(le.classes_)
+    values = ['Toyota', 'Ford', 'Tesla', 'Unknown', '', 'honda']
+    assert [table.encode(v) for v in values] == [_label_encode(le, v) for v in values]
+    np.testing.assert_array_equal(table.encode_column(values), [_label_encode(le, v) for v in values])
+
+
+def test_table_without_unknown_class_falls_back_to_zero():
+    le = LabelEncoder().fit(['Good', 'Fair'])
+    table = model.CategoryTable(le.classes_)
+    assert table.encode('Excellent') == 0
+    assert table.encode('Excellent', default=7) == 7
+    np.testing.assert_array_equal(table.encode_column(['Good', 'Excellent', None]), [1, 0, 0])
+
+
+def test_tables_are_cached_per_encoders_dict():
+    encoders = {'make': LabelEncoder().fit(['Toyota', 'Unknown'])}
+    tables = model.get_encoding_tables(encoders)
+    assert model.get_encoding_tables(encoders) is tables
+    assert model.get_encoding_tables(dict(encoders)) is not tables
+
+
+def test_encode_input_uses_tables(monkeypatch):
+    encoders = {
+        'make': LabelEncoder().fit(['Toyota', 'Honda', 'Unknown']),
+        'model': LabelEncoder().fit(['Camry', 'Civic']),
+        'condition': LabelEncoder().fit(['Good', 'Excellent']),
+    }
+    monkeypatch.setattr(shap_explainer, '_encoders', encoders)
+    df = pd.DataFrame([{'year': 2020, 'mileage': 1000, 'make': 'Tesla', 'model': 'Civic',
+                        'condition': 'Excellent', 'zipcode': 90210}])
+    encoded = shap_explainer.encode_input(df)
+    assert encoded[['make', 'model', 'condition']].iloc[0].tolist() == [0, 1, 0]
+    assert encoded['make'].dtype == np.int64
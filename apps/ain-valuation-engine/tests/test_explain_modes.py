@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+import pytest
+
+from tests.utils.engine import VEHICLE, install_test_engine
+from val_engine import main
+from val_engine.utils.data_loader import preprocess_input
+
+
+@pytest.fixture()
+def engine(monkeypatch):
+    install_test_engine(monkeypatch, explain_delay=0.05)
+
+
+def test_deferred_returns_price_then_explanation(engine):
+    inline = main.run_valuation(VEHICLE, mode='buy')
+    deferred = main.run_valuation(VEHICLE, mode='buy', explain='deferred', valuation_id='val-1')
+
+    assert deferred['valuation_id'] == 'val-1'
+    assert deferred['estimated_value'] == inline['estimated_value']
+    assert deferred['explanation_status'] == 'pending' and deferred['summary'] is None
+    assert 'explain' not in deferred['debug']['stage_timings_ms']
+
+    explanation = main.get_deferred_explanation('val-1', timeout=5)
+    assert explanation['explanation_status'] == 'complete'
+    assert explanation['adjustments'] == inline['adjustments']
+    assert explanation['summary'] == inline['summary']
+    assert main.get_deferred_explanation('unknown') is None
+
+
+def test_none_skips_explanation(engine):
+    result = main.run_valuation(VEHICLE, explain='none')
+    assert result['explanation_status'] == 'none' and result['adjustments'] is None
+    assert list(result['debug']['stage_timings_ms']) == ['preprocess', 'predict', 'audit_log']
+    with pytest.raises(ValueError):
+        main.run_valuation(VEHICLE, explain='later')
+
+
+def test_failed_deferred_explanation_is_reported(engine, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("llm down")
+
+    monkeypatch.setattr(main, 'generate_valuation_summary', broken)
+    main.run_valuation(VEHICLE, explain='deferred', valuation_id='val-2')
+    explanation = main.get_deferred_explanation('val-2', timeout=5)
+    assert explanation['explanation_status'] == 'failed' and 'llm down' in explanation['explanation_error']
+
+
+def test_deferred_p95_close_to_raw_prediction(engine):
+    def p95(fn, n=40):
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return np.percentile(timings, 95)
+
+    input_df = preprocess_input(VEHICLE)
+    predict_p95 = p95(lambda: main.predict_price(input_df, main._loaded_model, main._loaded_encoders))
+    deferred_p95 = p95(lambda: main.run_valuation(VEHICLE, explain='deferred'))
+    assert deferred_p95 < 0.05  # the stubbed explainer alone takes 50ms
+    assert deferred_p95 < 3 * predict_p95 + 0.005, f"deferred {deferred_p95 * 1e3:.2f}ms vs predict {predict_p95 * 1e3:.2f}ms"
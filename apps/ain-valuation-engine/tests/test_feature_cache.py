@@ -0,0 +1,63 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from val_engine import feature_cache, model
+from val_engine.feature_cache import FeatureCache, hash_frame
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+@pytest.fixture()
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_cache, 'FEATURE_CACHE_DIR', str(tmp_path / 'features'))
+    return tmp_path / 'features'
+
+
+def test_hash_frame_tracks_content():
+    df = random_vehicle_frame(50)
+    assert hash_frame(df) == hash_frame(random_vehicle_frame(50))
+    changed = df.copy()
+    changed.at[3, 'price'] += 1
+    assert hash_frame(changed) != hash_frame(df)
+
+
+def test_train_model_reuses_cached_features(cache_dir, monkeypatch):
+    df = random_vehicle_frame(1200)
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(30, seed=8).drop(columns=['price']).iterrows()]
+
+    model.train_model(df, use_feature_cache=True)
+    expected = model.predict_price_comprehensive_batch(vehicles)
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("features were re-engineered despite a cache hit")
+
+    monkeypatch.setattr(model, '_training_features', fail)
+    model.train_model(df, use_feature_cache=True)
+    assert model.predict_price_comprehensive_batch(vehicles) == expected
+
+
+def test_no_feature_cache_skips_cache(cache_dir):
+    model.train_model(random_vehicle_frame(1200), use_feature_cache=False)
+    assert not cache_dir.exists()
+
+
+def test_eviction_by_size_and_age(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_bytes=10 ** 9, max_age_seconds=3600)
+    for i in range(3):
+        cache.store(f"k{i}", frame=pd.DataFrame({'x': np.arange(1000) + i}), arrays={'a': np.zeros(1000)})
+        os.utime(tmp_path / f"k{i}", (time.time() - 100 + i, time.time() - 100 + i))
+
+    assert cache.load("k0") is not None  # k0 becomes most recently used
+    cache.max_bytes = 2.5 * sum(f.stat().st_size for f in (tmp_path / "k0").iterdir())
+    assert cache.evict() == 1
+    assert sorted(os.listdir(tmp_path)) == ["k0", "k2"]
+
+    os.utime(tmp_path / "k2", (time.time() - 7200, time.time() - 7200))
+    assert cache.load("k2") is None
+    assert sorted(os.listdir(tmp_path)) == ["k0"]
+    entry = cache.load("k0")
+    assert entry['frame']['x'].tolist() == list(range(1000))
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from engine.comp_batch import CompBatch
+from engine.pricing_core import (BlendConfig, Comp, WeightsConfig, fallback_price, fallback_price_batch,
+                                 hybrid_price_batch, price_subject)
+
+
+@pytest.fixture
+def wcfg():
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    return WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+
+
+def random_pool(rng, n):
+    return [Comp(price=round(float(rng.normal(22000, 3000)), 2) * (3 if rng.random() < 0.03 else 1),
+                 mileage=int(rng.integers(5000, 120000)), distance_km=float(rng.uniform(0, 300)),
+                 days_old=int(rng.integers(0, 90))) for _ in range(n)]
+
+
+def random_subjects(rng, n, pools):
+    return [{
+        "pool": pools[rng.integers(len(pools))],
+        "p_ml": float(rng.normal(21000, 4000)),
+        "rel_score": float(rng.uniform(-0.1, 1.1)),
+        "msrp": float(rng.uniform(15000, 90000)),
+        "age_years": float(rng.choice([0, 1, 2.5, 3, rng.uniform(0, 15)])),
+        "mileage": int(rng.integers(0, 200000)),
+        "condition_proxy": float(rng.uniform(0, 1)),
+        "salvage": bool(rng.random() < 0.1),
+        "rebuilt": bool(rng.random() < 0.1),
+        "is_ev": bool(rng.random() < 0.2),
+        "soh_known": bool(rng.random() < 0.5),
+    } for _ in range(n)]
+
+
+def assert_same(batch, i, expected):
+    for key, value in expected.items():
+        got = batch[key][i]
+        if value is None:
+            assert math.isnan(got), key
+        else:
+            assert got == value, (key, i)
+
+
+def test_batch_matches_scalar_path(wcfg):
+    rng = np.random.default_rng(0)
+    store = {
+        "camry": random_pool(rng, 40),
+        "civic": CompBatch.from_comps(random_pool(rng, 300)),
+        "sparse": random_pool(rng, 2),
+        "far": [Comp(price=20000.0, mileage=50000, distance_km=900.0, days_old=3)] * 10,
+        "empty": [],
+    }
+    subjects = random_subjects(rng, 500, list(store) + ["unknown"])
+    batch = hybrid_price_batch(subjects, store, wcfg)
+
+    methods = set()
+    for i, subject in enumerate(subjects):
+        expected = price_subject(subject, store.get(subject["pool"]), wcfg)
+        assert_same(batch, i, expected)
+        methods.add(expected["method"])
+    assert methods == {"blended", "fallback_pricing"}
+    # Subject mileage windows split a pool into groups with their own comps
+    civic = [i for i, subject in enumerate(subjects) if subject["pool"] == "civic"]
+    assert len(set(batch["comp_median"][civic].tolist())) > 1
+
+    # Columnar input gives the same result
+    columns = hybrid_price_batch(pd.DataFrame(subjects), store, wcfg)
+    for key in batch:
+        np.testing.assert_array_equal(columns[key], batch[key])
+
+
+def test_missing_flags_default_like_scalar_path(wcfg):
+    subjects = [{"pool": "none", "p_ml": 20000.0, "rel_score": 0.5, "msrp": 30000.0,
+                 "age_years": 4, "mileage": 48000, "condition_proxy": 0.6}]
+    batch = hybrid_price_batch(subjects, {}, wcfg)
+    assert_same(batch, 0, price_subject(subjects[0], None, wcfg))
+    assert len(hybrid_price_batch([], {}, wcfg)["price"]) == 0
+
+    # No mileage: comps are selected and filtered without a window
+    comps = random_pool(np.random.default_rng(2), 50)
+    batch = hybrid_price_batch({"pool": ["a"], "p_ml": [20000.0], "rel_score": [0.5], "msrp": [30000.0],
+                                "age_years": [4], "condition_proxy": [0.6]}, {"a": comps}, wcfg)
+    assert_same(batch, 0, price_subject({**subjects[0], "pool": "a", "mileage": None}, comps, wcfg))
+
+
+def test_fallback_price_batch_is_exact(wcfg):
+    rng = np.random.default_rng(1)
+    n = 20000
+    args = (rng.uniform(10000, 100000, n), rng.uniform(-1, 20, n), rng.integers(0, 250000, n), rng.uniform(0, 1, n))
+    flags = rng.random((4, n)) < 0.3
+    got = fallback_price_batch(*args, wcfg.reliability, *flags)
+    expected = [fallback_price(*(float(a[i]) for a in args), wcfg.reliability, *(bool(f[i]) for f in flags))
+                for i in range(n)]
+    np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,74 @@
+import pytest
+
+from val_engine import model
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+def _priced_frame(n, seed, shift=0):
+    """Listings whose price follows year and mileage, so held-out MAE is meaningful."""
+    df = random_vehicle_frame(n, seed=seed)
+    features = model.engineer_comprehensive_features_frame(df).reset_index(drop=True)
+    df['price'] = 15000 + 900 * (features['year'] - 2005) - 0.08 * features['mileage'] + shift
+    return df
+
+
+@pytest.fixture()
+def base_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(model, 'BUNDLE_PATH', str(tmp_path / 'bundle.joblib'))
+    df = _priced_frame(1500, seed=1)
+    model.train_model(df)
+    model.save_model_artifacts()
+    return df
+
+
+def test_incremental_extends_model_and_passes_gate(base_model):
+    previous = model._model
+    n_before = previous.estimators_.shape[0]
+
+    report = model.train_model_incremental(_priced_frame(600, seed=2, shift=4000), n_new_estimators=30)
+
+    assert report['mode'] == 'incremental'
+    assert report['candidate_mae'] < report['previous_mae']
+    assert model._model is not previous and previous.estimators_.shape[0] == n_before
+    assert n_before < report['n_estimators'] <= n_before + 30
+
+
+def test_incremental_model_is_compiled_and_saved(base_model):
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(50, seed=5).drop(columns=['price']).iterrows()]
+    before = model.predict_price_comprehensive_batch(vehicles)
+    model.train_model_incremental(_priced_frame(600, seed=2, shift=4000), n_new_estimators=30)
+    after = model.predict_price_comprehensive_batch(vehicles)
+    assert after != before
+
+    compiled = model.get_compiled_model()
+    assert compiled.source_model is model._model
+    compiled_prices = [r['predicted_price'] for r in model.predict_price_comprehensive_batch(vehicles, compiled, model._encoders)]
+    assert compiled_prices == pytest.approx([r['predicted_price'] for r in after], rel=1e-9)
+
+    version = model._model_version
+    reloaded, encoders = model.load_model_artifacts(compiled=True)
+    assert model._model_version == version
+    reloaded_prices = [r['predicted_price'] for r in model.predict_price_comprehensive_batch(vehicles, reloaded, encoders)]
+    assert reloaded_prices == pytest.approx([r['predicted_price'] for r in after], rel=1e-9)
+
+
+def test_incremental_rejected_keeps_previous_model(base_model):
+    previous = model._model
+    report = model.train_model_incremental(_priced_frame(400, seed=3), mae_tolerance=-1.0)
+    assert report['mode'] == 'rejected'
+    assert model._model is previous
+
+
+def test_vocabulary_change_forces_full_retrain(base_model):
+    full_df = base_model
+    new_df = _priced_frame(300, seed=4)
+    new_df.loc[::10, 'make'] = 'Rivian'
+
+    with pytest.raises(ValueError, match="make"):
+        model.train_model_incremental(new_df)
+
+    full_df = full_df.copy()
+    full_df.loc[::7, 'make'] = 'Rivian'
+    report = model.train_model_incremental(new_df, full_data=full_df)
+    assert report['mode'] == 'full'
+    assert 'Rivian' in model._encoders['make'].classes_
@@ -0,0 +1,193 @@
+import datetime as dt
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from engine.listing_store import ListingStore
+from engine.pricing_core import BlendConfig, Comp, WeightsConfig, hybrid_price
+from val_engine.market import compute_market_anchor, open_comps
+
+TODAY = dt.date(2025, 6, 1)
+
+
+def random_listings(n, seed):
+    rng = np.random.default_rng(seed)
+    listings = []
+    for i in range(n):
+        listings.append({
+            "vin": f"VIN{seed}{i:06d}" if rng.random() < 0.8 else None,
+            "source": ["cars.com", "autotrader"][rng.integers(2)],
+            "make": ["Toyota", "TOYOTA ", "Honda"][rng.integers(3)],
+            "model": ["Camry", "Civic"][rng.integers(2)],
+            "year": int(rng.integers(2017, 2021)),
+            "trim": [None, "LE", "LE Plus", "XLE", "SE", "L"][rng.integers(6)],
+            "price": round(float(rng.normal(22000, 3000)), 2),
+            "mileage": int(rng.integers(0, 150000)),
+            "city": "Austin",
+            "lat": 30.27 + rng.normal(0, 1.0) if rng.random() < 0.9 else None,
+            "lon": -97.74 + rng.normal(0, 1.0) if rng.random() < 0.9 else None,
+            "days_old": int(rng.integers(0, 60)) if rng.random() < 0.9 else None,
+        })
+    return listings
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ListingStore(str(tmp_path / "store"), row_group_size=50)
+    listings = random_listings(600, 0)
+    for i in range(0, 600, 200):  # three ingestion batches
+        store.append(listings[i:i + 200], today=TODAY)
+    return store, listings
+
+
+def reference(listings):
+    df = pd.DataFrame(listings)
+    df["make"] = df["make"].str.strip().str.upper()
+    df["model"] = df["model"].str.strip().str.upper()
+    return df
+
+
+def test_scan_prunes_and_pushes_down_filters(store):
+    store, listings = store
+    df = reference(listings)
+    assert sorted(store.partitions())[0] == ("HONDA", "CAMRY", 2017)
+    assert len(store.files("Toyota", "Camry", 2019)) == 3
+
+    table = store.scan("toyota", "camry", year=(2018, 2019), trim_family="LE", mileage=(20000, 80000))
+    expected = df[(df.make == "TOYOTA") & (df.model == "CAMRY") & df.year.between(2018, 2019)
+                  & df.trim.fillna("").str.startswith("LE") & df.mileage.between(20000, 80000)]
+    assert sorted(table["price"].to_pylist()) == sorted(expected.price)
+    assert table.num_rows > 0
+
+    exact = store.scan("Toyota", "Camry", 2019, trim="L", columns=["trim", "mileage"])
+    assert exact.column_names == ["trim", "mileage"] and set(exact["trim"].to_pylist()) <= {"L"}
+    assert store.scan("Ford", "F-150").num_rows == 0
+    assert store.count("Toyota", "Camry") == len(df[(df.make == "TOYOTA") & (df.model == "CAMRY")])
+
+
+def test_compaction_dedupes_and_sorts(store):
+    store, listings = store
+    store.append([dict(listings[0], price=1.0), dict(listings[1])], today=TODAY)  # relisted / duplicated
+    before = store.scan(listings[0]["make"], listings[0]["model"], listings[0]["year"])
+
+    assert store.compact(make="Toyota", model="Camry") > 0
+    assert store.compact(make="Toyota", model="Camry") == 0  # already one file per partition
+    for make, model, year in store.partitions():
+        if (make, model) == ("TOYOTA", "CAMRY"):
+            files = store.files(make, model, year)
+            assert len(files) == 1 and not glob.glob(os.path.join(os.path.dirname(files[0]), ".tmp-*"))
+            mileage = store.scan(make, model, year)["mileage"].to_numpy()
+            assert np.all(np.diff(mileage) >= 0)
+
+    after = store.scan(listings[0]["make"], listings[0]["model"], listings[0]["year"])
+    if listings[0]["vin"]:
+        rows = [r for r in after.to_pylist() if r["vin"] == listings[0]["vin"]]
+        assert [r["price"] for r in rows] == [1.0]  # the newest copy wins
+    assert after.num_rows <= before.num_rows
+
+    store.append(random_listings(10, 9), today=TODAY)  # appends still work after compaction
+    assert store.compact() > 0
+
+
+def test_reads_during_compaction_see_one_copy(store, monkeypatch):
+    store, listings = store
+    expected = sorted(store.scan("Toyota", "Camry", 2019)["price"].to_pylist())
+    parts = store.files("Toyota", "Camry", 2019)
+
+    # Compacted file written, old parts not deleted yet: readers skip the superseded parts
+    real_remove = os.remove
+    monkeypatch.setattr(os, "remove", lambda path: None)
+    assert store.compact(make="Toyota", model="Camry", year=2019) == 1
+    monkeypatch.setattr(os, "remove", real_remove)
+    assert all(os.path.exists(f) for f in parts)
+    assert len(store.files("Toyota", "Camry", 2019)) == 1
+    compacted = sorted(store.scan("Toyota", "Camry", 2019)["price"].to_pylist())
+    assert len(compacted) <= len(expected) and set(compacted) <= set(expected)
+    assert store.count("Toyota", "Camry", 2019) == len(compacted)
+
+    # Files listed before the compaction deleted them: the scan lists the partition again
+    listed = store.files
+    stale = iter([parts])
+    monkeypatch.setattr(store, "files", lambda *args: next(stale, None) or listed(*args))
+    for f in parts:
+        os.remove(f)
+    assert sorted(store.scan("Toyota", "Camry", 2019)["price"].to_pylist()) == compacted
+
+
+def test_market_anchor_matches_merged_json(store, tmp_path):
+    store, listings = store
+    cohort = [l for l in listings if l["make"].strip().upper() == "TOYOTA" and l["model"] == "Camry"]
+    path = tmp_path / "merged.json"
+    path.write_text(json.dumps({"listings": cohort}))
+    from_json = open_comps(str(path))
+    from_store = open_comps(store.root)
+    assert isinstance(from_store, ListingStore)
+
+    for trim in (None, "LE", "XLE", "L", "ZZ"):
+        a = compute_market_anchor(from_json, target_trim=trim)
+        b = compute_market_anchor(from_store, target_trim=trim, make="Toyota", model="Camry")
+        assert b["median_price"] == a["median_price"]
+        assert b["price_range"] == a["price_range"]
+        assert b["comps_used"] == a["comps_used"]
+    with pytest.raises(ValueError):
+        compute_market_anchor(from_store)
+
+
+def test_hybrid_price_reads_comps_from_store(store):
+    store, listings = store
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    wcfg = WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+    subject = {"make": "Toyota", "model": "Camry", "year": 2019, "trim": "LE", "mileage": 50000,
+               "lat": 30.27, "lon": -97.74}
+
+    batch = store.comps_for(subject, cfg, as_of=TODAY)
+    assert len(batch) > 0 and batch.mileage_sorted
+    assert np.all(np.diff(batch.mileage) >= 0)
+    assert batch.mileage.max() <= 110000  # widest mileage window step: 50000 +/- 3.0 * 40%
+    assert batch.days_old.min() >= 0
+
+    # Same comps built by hand from the listings
+    df = reference(listings)
+    rows = df[(df.make == "TOYOTA") & (df.model == "CAMRY") & (df.year == 2019)
+              & df.trim.fillna("").str.startswith("LE") & df.mileage.between(-10000, 110000)]
+    assert sorted(batch.price.tolist()) == sorted(rows.price)
+
+    result = hybrid_price(21000.0, [], 0.7, wcfg, subject=subject, store=store)
+    comps = [Comp(p, m, d, a) for p, m, d, a in zip(batch.price, batch.mileage, batch.distance_km, batch.days_old)]
+    # comps_for uses today's date; days_old only shifts freshness, so compare the price path
+    expected = hybrid_price(21000.0, comps, 0.7, wcfg, subject={"mileage": 50000})
+    assert result["comp_median"] == expected["comp_median"]
+    assert result["stats"] == expected["stats"]
+    with pytest.raises(ValueError):
+        hybrid_price(21000.0, [], 0.7, wcfg, subject={**subject, "make": "Ford"}, store=store)
+
+
+def test_sparse_mileage_window_scans_all_comps(store):
+    store, listings = store
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    wcfg = WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+    subject = {"make": "Toyota", "model": "Camry", "year": 2019, "mileage": 500}
+
+    # Fewer than min_k comps inside even the widest window: the ladder keeps them all, so the store returns them all
+    df = reference(listings)
+    rows = df[(df.make == "TOYOTA") & (df.model == "CAMRY") & (df.year == 2019)]
+    assert rows.mileage.between(-1000, 2000).sum() < cfg["filters"]["comps"]["min_k"]
+    batch = store.comps_for(subject, cfg, as_of=TODAY)
+    assert sorted(batch.price.tolist()) == sorted(rows.price)
+
+    # hybrid_price scans as of today, so rebuild the comps with today's ages
+    result = hybrid_price(21000.0, [], 0.7, wcfg, subject=subject, store=store)
+    batch = store.comps_for(subject, cfg)
+    comps = [Comp(p, m, d, a) for p, m, d, a in zip(batch.price, batch.mileage, batch.distance_km, batch.days_old)]
+    expected = hybrid_price(21000.0, comps, 0.7, wcfg, subject={"mileage": 500})
+    assert result["comp_median"] == expected["comp_median"]
+    assert result["stats"] == expected["stats"]
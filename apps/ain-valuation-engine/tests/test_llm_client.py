@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from val_engine import llm_client, llm_summary
+from val_engine.llm_client import AsyncLLMClient, LLMTimeoutError, PromptCache
+from tests.utils.engine import VEHICLE
+
+
+class StubLLMServer:
+    """OpenAI-compatible /chat/completions stub that records requests and peak concurrency."""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers), body))
+                    number = len(stub.requests)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.in_flight -= 1
+                payload = json.dumps({'choices': [{'message': {
+                    'content': f" summary #{number} "}}]}).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubLLMServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    clients = []
+
+    def make(server, **kwargs):
+        kwargs.setdefault('cache', PromptCache(str(tmp_path / 'llm.sqlite3')))
+        client = AsyncLLMClient(api_key='test-key', api_base=server.url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def use_client(monkeypatch):
+    def use(client):
+        monkeypatch.setattr(llm_summary, 'USE_MOCK_LLM', False)
+        monkeypatch.setattr(llm_client, '_client', client)
+    return use
+
+
+def test_identical_prompts_hit_the_persistent_cache(stub, make_client, use_client, tmp_path):
+    use_client(make_client(stub))
+    first = llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell')
+    second = llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell')
+    assert first == second == 'summary #1'
+    path, headers, body = stub.requests[0]
+    assert path == '/v1/chat/completions'
+    assert headers['Authorization'] == 'Bearer test-key'
+    assert body['max_tokens'] == 500 and '$24,750.00' in body['messages'][1]['content']
+
+    # A different prompt misses; a new client on the same file (another worker) hits
+    llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='buy')
+    use_client(make_client(stub))
+    assert llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell') == 'summary #1'
+    assert len(stub.requests) == 2
+
+
+def test_expired_responses_are_refetched(stub, make_client, tmp_path):
+    client = make_client(stub, cache=PromptCache(str(tmp_path / 'ttl.sqlite3'), ttl_seconds=0.0))
+    messages = [{'role': 'user', 'content': 'hello'}]
+    assert client.complete(messages) == 'summary #1'
+    assert client.complete(messages) == 'summary #2'
+    assert client.cache.purge_expired() == 1
+
+
+def test_concurrency_limit(make_client):
+    server = StubLLMServer(delay=0.1)
+    try:
+        client = make_client(server, max_concurrency=2, cache=None)
+
+        async def run():
+            return await asyncio.gather(*[client.acomplete([{'role': 'user', 'content': str(i)}])
+                                          for i in range(6)])
+
+        assert len(set(asyncio.run(run()))) == 6
+        assert server.max_in_flight == 2
+    finally:
+        server.close()
+
+
+def test_timeout_and_budget_fall_back_to_mock(make_client, use_client):
+    server = StubLLMServer(delay=0.5)
+    try:
+        mock = llm_summary._generate_mock_summary(24750.0, VEHICLE, 'sell')
+        use_client(make_client(server, timeout=0.1))
+        assert llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell') == mock
+
+        # Each call would finish within the HTTP timeout, but queued calls run out of budget
+        client = make_client(server, timeout=5, budget=0.8, max_concurrency=1, cache=None)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(_complete_or_timeout(client)))
+                   for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results.count('timeout') >= 1 and any(r.startswith('summary') for r in results)
+    finally:
+        server.close()
+
+
+def _complete_or_timeout(client):
+    try:
+        return client.complete([{'role': 'user', 'content': 'hello'}])
+    except LLMTimeoutError:
+        return 'timeout'
+
+
+def test_server_errors_fall_back_and_are_not_cached(make_client, use_client):
+    server = StubLLMServer(status=500)
+    try:
+        client = make_client(server)
+        use_client(client)
+        mock = llm_summary._generate_mock_summary(24750.0, VEHICLE, 'sell')
+        assert llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell') == mock
+        server.status = 200
+        assert llm_summary.generate_valuation_summary(24750.0, VEHICLE, mode='sell') == 'summary #2'
+    finally:
+        server.close()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+import yaml
+
+from engine.comp_batch import CompBatch
+from engine.comps_filter import RawComp, filter_comp_batch, filter_comps
+from engine.pricing_core import BlendConfig, WeightsConfig, comp_summary, hybrid_price
+
+
+def load_cfg():
+    with open("configs/weights.v1.yaml") as f:
+        cfg = yaml.safe_load(f)
+    cfg["filters"]["radius_steps_km"] = cfg["filters"]["comps"]["radius_km_ladder"]
+    return cfg
+
+
+def random_batch(rng, n):
+    return CompBatch(np.round(rng.normal(22000, 3000, n), 2), rng.integers(0, 150000, n),
+                     rng.uniform(0, 200, n), rng.integers(0, 60, n))
+
+
+def reference_window(mileage, subject, pct_steps, min_k):
+    """Linear scan over every step of the ladder."""
+    for pct in pct_steps:
+        inside = [i for i, m in enumerate(mileage) if subject - pct * subject <= m <= subject + pct * subject]
+        if len(inside) >= min_k:
+            return inside, pct
+    return list(range(len(mileage))), None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_window_matches_scan_and_sorted_batches_agree(seed):
+    cfg = load_cfg()
+    rng = np.random.default_rng(seed)
+    batch = random_batch(rng, int(rng.integers(1, 80)))
+    subject = float(rng.integers(1000, 160000))
+    inside, pct = reference_window(batch.mileage.tolist(), subject, [0.4 * f for f in (1.0, 1.5, 2.0, 3.0)], 3)
+
+    kept, removals, stats = filter_comp_batch(batch, cfg, 0.4, subject)
+    assert stats["mileage_delta_pct"] == pct
+    removed_for_mileage = sorted(r.idx for r in removals if r.reason.startswith("mileage_delta"))
+    assert removed_for_mileage == sorted(set(range(len(batch))) - set(inside))
+    assert set(kept.id.tolist()) <= set(inside)
+
+    # Ladder on the window's candidates only
+    expected, _, expected_stats = filter_comp_batch(batch.take(np.array(inside, dtype=np.intp)), cfg, 0.4)
+    assert kept.id.tolist() == expected.id.tolist()
+    assert {k: v for k, v in stats.items() if k != "mileage_delta_pct"} == expected_stats
+
+    # A mileage-sorted copy (binary search) keeps the same comps
+    sorted_kept, sorted_removals, sorted_stats = filter_comp_batch(batch.sort_by_mileage(), cfg, 0.4, subject)
+    assert sorted(sorted_kept.id.tolist()) == sorted(kept.id.tolist())
+    assert sorted_stats == stats
+    assert len(sorted_removals) == len(removals)
+
+
+def test_window_widens_then_gives_up():
+    cfg = load_cfg()
+    comps = [RawComp(20000 + i, m, 5.0, 3) for i, m in enumerate([50000, 52000, 69000, 80000, 140000, 150000])]
+    kept, removals, stats = filter_comps(comps, cfg, 0.4, subject_mileage=50000)
+    assert stats["mileage_delta_pct"] == 0.4
+    assert [(r.idx, r.reason) for r in removals] == [(3, "mileage_delta>0.4"), (4, "mileage_delta>0.4"),
+                                                     (5, "mileage_delta>0.4")]
+
+    kept, removals, stats = filter_comps(comps, cfg, 0.2, subject_mileage=50000)
+    assert stats["mileage_delta_pct"] == pytest.approx(0.4)  # 0.2 keeps 2 comps, 2 x 0.2 keeps 3
+    assert len(kept) == 3
+
+    kept, removals, stats = filter_comps(comps[:2] + comps[4:], cfg, 0.1, subject_mileage=100000)
+    assert stats["mileage_delta_pct"] is None and len(removals) == 0  # no step reaches min_k: nothing cut
+
+    # Without a subject mileage nothing changes
+    kept, removals, stats = filter_comps(comps, cfg, 0.4)
+    assert len(kept) == len(comps) and "mileage_delta_pct" not in stats
+
+
+def test_window_runs_before_price_outliers():
+    cfg = load_cfg()
+    # Low-mileage comps around 30k; a block of high-mileage cheap comps would skew the IQR
+    prices = [30000, 30500, 31000, 31500, 32000] + [9000] * 6
+    mileage = [40000, 41000, 42000, 43000, 44000] + [190000] * 6
+    batch = CompBatch(prices, mileage, [1.0] * 11, [1] * 11)
+    kept, removals, stats = filter_comp_batch(batch, cfg, 0.4, 42000)
+    assert kept.id.tolist() == [0, 1, 2, 3, 4]
+    assert stats["median"] == 31000.0
+    assert not any(r.reason == "price_outlier" for r in removals)
+
+
+def test_hybrid_price_uses_subject_mileage():
+    cfg = load_cfg()
+    wcfg = WeightsConfig(reliability=cfg, blend_weights=BlendConfig(**cfg["blend_weights"]))
+    rng = np.random.default_rng(4)
+    batch = random_batch(rng, 200)
+    plain = hybrid_price(21000.0, batch, 0.7, wcfg)
+    windowed = hybrid_price(21000.0, batch, 0.7, wcfg, subject={"mileage": 30000})
+    assert windowed["stats"]["mileage_delta_pct"] == 0.4
+    assert all(12000 <= c["mileage"] <= 42000 for c in windowed["kept_comps"])
+    assert len(windowed["kept_comps"]) < len(plain["kept_comps"])
+
+
+def test_selected_comps_stay_mileage_sorted():
+    cfg = load_cfg()
+    batch = random_batch(np.random.default_rng(5), 300).sort_by_mileage()
+    assert batch.take(np.array([0, 3, 3, 10])).mileage_sorted
+    assert not batch.take(np.array([3, 0])).mileage_sorted
+    assert not batch.take(np.array([-1, 0])).mileage_sorted
+
+    summary = comp_summary(batch, cfg, subject_mileage=50000)
+    assert len(summary["selected"]) < len(batch)  # the radius ladder cut comps by integer positions
+    assert summary["selected"].mileage_sorted and summary["kept"].mileage_sorted
+    unsorted = comp_summary(batch.take(np.random.default_rng(6).permutation(len(batch))), cfg, subject_mileage=50000)
+    assert sorted(unsorted["kept"].id.tolist()) == sorted(summary["kept"].id.tolist())
+    assert unsorted["stats"] == summary["stats"]
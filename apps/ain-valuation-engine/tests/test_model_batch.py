@@ -0,0 +1,32 @@
+import pytest
+
+from val_engine import model
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+@pytest.fixture(scope="module")
+def trained_model():
+    df = random_vehicle_frame(1200)
+    model.train_model(df)
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(400, seed=3).drop(columns=['price']).iterrows()]
+    # Drop some fields so vehicles have different key layouts
+    for vehicle in vehicles[::3]:
+        vehicle.pop('valuation_video')
+        vehicle.pop('overall_condition_rating')
+    for vehicle in vehicles[::5]:
+        vehicle.pop('year')
+        vehicle['make'] = 'UnseenMake'
+    return model._model, model._encoders, vehicles
+
+
+def test_batch_matches_single_row(trained_model):
+    model_instance, encoders, vehicles = trained_model
+    batch = model.predict_price_comprehensive_batch(vehicles, model_instance, encoders)
+    single = [model.predict_price_comprehensive(v, model_instance, encoders) for v in vehicles]
+    assert batch == single
+
+
+def test_batch_empty(trained_model):
+    model_instance, encoders, _ = trained_model
+    assert model.predict_price_comprehensive_batch([], model_instance, encoders) == []
+
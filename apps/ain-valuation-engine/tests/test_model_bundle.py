@@ -0,0 +1,88 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from val_engine import model
+from val_engine.compiled_model import CompiledTreeEnsemble
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+@pytest.fixture(scope="module")
+def bundle_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bundle") / "bundle.joblib"
+    model.train_model(random_vehicle_frame(1200))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(model, 'BUNDLE_PATH', str(path))
+        model.save_model_artifacts()
+    return path
+
+
+def test_bundle_round_trip_is_memory_mapped(bundle_path, monkeypatch):
+    vehicles = [row.to_dict() for _, row in random_vehicle_frame(50, seed=4).drop(columns=['price']).iterrows()]
+    expected = model.predict_price_comprehensive_batch(vehicles)
+    spec = dict(model.get_feature_spec())
+    classes = {col: list(le.classes_) for col, le in model._encoders.items()}
+
+    monkeypatch.setattr(model, 'BUNDLE_PATH', str(bundle_path))
+    loaded, encoders = model.load_model_artifacts()
+    compiled = model.get_compiled_model()
+
+    assert isinstance(compiled, CompiledTreeEnsemble) and compiled.source_model is loaded
+    assert isinstance(compiled.threshold, np.memmap) and isinstance(compiled.leaf_value, np.memmap)
+    assert {col: list(le.classes_) for col, le in encoders.items()} == classes
+    assert model.get_feature_spec() == spec
+    assert model.predict_price_comprehensive_batch(vehicles) == expected
+    compiled_prices = [r['predicted_price'] for r in model.predict_price_comprehensive_batch(vehicles, compiled, encoders)]
+    assert compiled_prices == pytest.approx([r['predicted_price'] for r in expected], rel=1e-9)
+
+    stats = model.get_load_stats()
+    assert stats['path'] == str(bundle_path) and stats['mmap_mode'] == 'r'
+    assert stats['load_seconds'] > 0
+
+
+def test_bundle_loads_in_fresh_worker(bundle_path):
+    script = (
+        "import os, sys\n"
+        "os.environ['AIN_TABULAR_BUNDLE_PATH'] = sys.argv[1]\n"
+        "from val_engine import model\n"
+        "m, enc = model.load_model_artifacts(compiled=True)\n"
+        "assert type(m).__name__ == 'CompiledTreeEnsemble' and enc\n"
+        "print(model.get_load_stats()['load_seconds'])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, str(bundle_path)],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout.strip().splitlines()[-1]) < 5.0
+
+
+def test_explainer_builds_lazily(bundle_path, monkeypatch):
+    from tests.utils.engine import VEHICLE
+    from val_engine import shap_explainer
+
+    monkeypatch.setattr(model, 'BUNDLE_PATH', str(bundle_path))
+    loaded, _ = model.load_model_artifacts()
+
+    shap_explainer.set_explainer(loaded)
+    expected = shap_explainer.explain_prediction_comprehensive(VEHICLE)
+    shap_explainer.register_explainer(loaded)
+    assert shap_explainer.explainer is None
+    explanation = shap_explainer.explain_prediction_comprehensive(VEHICLE)
+    np.testing.assert_allclose(explanation['shap_values'], expected['shap_values'])
+    assert explanation['prediction_value'] == pytest.approx(expected['prediction_value'])
+
+    script = (
+        "import os, sys, json\n"
+        "os.environ['AIN_TABULAR_BUNDLE_PATH'] = sys.argv[1]\n"
+        "from val_engine import model, shap_explainer\n"
+        "m, _ = model.load_model_artifacts()\n"
+        "shap_explainer.register_explainer(m)\n"
+        "assert 'shap' not in sys.modules\n"
+        "print(shap_explainer.explain_prediction_comprehensive(json.loads(sys.argv[2]))['prediction_value'])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, str(bundle_path), json.dumps(VEHICLE)],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout.strip().splitlines()[-1]) == pytest.approx(expected['prediction_value'])
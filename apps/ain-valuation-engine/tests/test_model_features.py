@@ -0,0 +1,33 @@
+import pandas as pd
+
+from val_engine.model import engineer_comprehensive_features, engineer_comprehensive_features_frame
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+def _per_row_features(df):
+    rows = [engineer_comprehensive_features(row.to_dict()).iloc[0].to_dict() for _, row in df.iterrows()]
+    return pd.DataFrame(rows)
+
+
+def test_frame_features_match_per_row_mixed_formats():
+    df = random_vehicle_frame(500)
+    expected = _per_row_features(df)
+    actual = engineer_comprehensive_features_frame(df).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def test_frame_features_match_per_row_simple_columns():
+    df = pd.DataFrame({
+        'year': [2020, 2019, 2026],
+        'mileage': [25000, 35000, 100],
+        'make': ['Toyota', 'Honda', 'Tesla'],
+        'model': ['Camry', 'Civic', 'Model Y'],
+        'condition': ['Excellent', 'Good', 'Rough'],
+        'zipcode': [90210, 10001, 0],
+        'fuel_type': ['Gasoline', 'Gasoline', 'Electric'],
+        'price': [22000, 18000, 45000],
+    })
+    expected = _per_row_features(df)
+    actual = engineer_comprehensive_features_frame(df)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
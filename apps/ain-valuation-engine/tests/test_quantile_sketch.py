@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+
+from engine.calibrate_intervals import learn_bands_from_residuals, learn_bands_from_sketches
+from engine.quantile_sketch import KLLSketch, SegmentSketches
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(sketch, data):
+    ordered = np.sort(data)
+    ranks = np.searchsorted(ordered, sketch.quantiles(QS), side="right") / len(data)
+    return np.max(np.abs(ranks - QS))
+
+
+def prices(n, seed):
+    return np.random.default_rng(seed).lognormal(10, 0.3, n)
+
+
+def test_exact_until_first_compaction():
+    data = prices(200, 0)
+    sketch = KLLSketch(k=200)
+    sketch.update(data)
+    assert sketch.exact
+    np.testing.assert_array_equal(sketch.quantiles(QS), np.quantile(data, QS))
+    assert sketch.median() == np.median(data)
+    assert sketch.mad() == np.median(np.abs(data - np.median(data)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_error_bound(seed):
+    data = prices(50000, seed)
+    sketch = KLLSketch(k=200, seed=seed)
+    sketch.update(data)
+    assert not sketch.exact and len(sketch) == len(data)
+    assert rank_error(sketch, data) <= 0.02
+    assert sketch.quantile(0.0) == data.min() and sketch.quantile(1.0) == data.max()
+    assert abs(sketch.rank(np.median(data)) - 0.5) <= 0.02
+
+    exact_mad = np.median(np.abs(data - np.median(data)))
+    assert sketch.mad() == pytest.approx(exact_mad, rel=0.05)
+
+
+def test_merge_across_workers_keeps_the_bound():
+    data = np.random.default_rng(7).normal(22000, 3000, 120000)
+    workers = [KLLSketch(k=200, seed=i) for i in range(8)]
+    for i, sketch in enumerate(workers):
+        sketch.update(data[i::8])
+
+    # Ship through JSON as another process would, then merge
+    merged = KLLSketch(k=200, seed=99)
+    for sketch in workers:
+        merged.merge(KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))))
+    assert merged.n == len(data)
+    assert rank_error(merged, data) <= 0.02
+    assert merged.median() == pytest.approx(np.median(data), rel=0.01)
+    assert sum(len(level) for level in merged._levels) < 1000  # O(k) memory
+
+
+def test_segment_sketches():
+    rng = np.random.default_rng(3)
+    a, b = SegmentSketches(seed=1), SegmentSketches(seed=2)
+    camry = rng.normal(24000, 2000, 4000)
+    civic = rng.normal(21000, 1500, 50)
+    for i, price in enumerate(camry):
+        (a if i % 2 else b).add(("TOYOTA", "CAMRY", 2019, "900"), price)
+    a.update(("HONDA", "CIVIC", 2019, "900"), civic)
+    a.merge(b)
+
+    assert a.median(("TOYOTA", "CAMRY", 2019, "900")) == pytest.approx(np.median(camry), rel=0.01)
+    assert a.median(("HONDA", "CIVIC", 2019, "900")) == np.median(civic)  # small segment: exact
+    assert a.mad(("HONDA", "CIVIC", 2019, "900")) == np.median(np.abs(civic - np.median(civic)))
+    assert a.median(("FORD", "F-150", 2019, "900")) is None
+    assert len(a) == 2
+
+
+def test_bands_from_sketches_match_residual_bands():
+    rng = np.random.default_rng(5)
+    labels = rng.choice(["High", "Medium", "Low"], 30000, p=[0.5, 0.3, 0.2]).tolist() + ["Low"] * 10
+    residuals = rng.normal(0.0, 0.08, len(labels))
+    exact = learn_bands_from_residuals(residuals, labels)
+
+    sketches = {}
+    for label, r in zip(labels, residuals):
+        sketches.setdefault(label, KLLSketch(seed=0)).add(r)
+    approx = learn_bands_from_sketches(sketches)
+    for label in exact:
+        assert approx[label] == pytest.approx(exact[label], abs=0.005)
+
+    small = {"High": KLLSketch()}
+    small["High"].update(residuals[:10])
+    assert learn_bands_from_sketches(small) == learn_bands_from_residuals(residuals[:10], ["High"] * 10)
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from tests.utils.engine import VEHICLE, install_test_engine
+from val_engine import main, model, shap_explainer
+from val_engine.result_cache import ValuationResultCache, valuation_cache_key
+
+
+@pytest.fixture()
+def cached_engine(monkeypatch, tmp_path):
+    install_test_engine(monkeypatch, explain_delay=0.02)
+    calls = []
+    explain = shap_explainer.explain_prediction_comprehensive
+    monkeypatch.setattr(shap_explainer, 'explain_prediction_comprehensive',
+                        lambda vehicle: calls.append(vehicle) or explain(vehicle))
+    cache = ValuationResultCache(disk_dir=str(tmp_path / 'results'))
+    monkeypatch.setattr(main, '_result_cache', cache)
+    return cache, calls
+
+
+def test_cache_key_is_canonical():
+    reordered = {k: VEHICLE[k] for k in reversed(list(VEHICLE))}
+    key = valuation_cache_key(VEHICLE, 'sell', 'v1')
+    assert valuation_cache_key({**reordered, 'mileage': {'value': 40000.0}}, 'sell', 'v1') == key
+    assert valuation_cache_key(VEHICLE, 'buy', 'v1') != key
+    assert valuation_cache_key(VEHICLE, 'sell', 'v2') != key
+    assert valuation_cache_key({**VEHICLE, 'mileage': {'value': 40001}}, 'sell', 'v1') != key
+    assert valuation_cache_key({**VEHICLE, 'trim': None}, 'sell', 'v1') != key
+
+
+def test_whitespace_variants_get_distinct_keys(cached_engine):
+    # The model prices ' Ford ' and 'Ford' differently, so they must not share a cached result
+    padded = {**VEHICLE, 'make': {'value': ' %s ' % VEHICLE['make']['value']}}
+    assert valuation_cache_key(padded, 'sell', 'v1') != valuation_cache_key(VEHICLE, 'sell', 'v1')
+    _, calls = cached_engine
+    first = main.run_valuation(VEHICLE)
+    second = main.run_valuation(padded)
+    assert len(calls) == 2 and second['debug']['cache'] == 'miss'
+    assert second['input_data'] == padded and first['input_data'] == VEHICLE
+
+
+def test_repeat_valuation_is_served_from_cache(cached_engine):
+    cache, calls = cached_engine
+    first = main.run_valuation(VEHICLE, mode='buy')
+    second = main.run_valuation({**VEHICLE, 'mileage': {'value': 40000.0}}, mode='buy')
+
+    assert len(calls) == 1
+    assert (first['debug']['cache'], second['debug']['cache']) == ('miss', 'hit')
+    assert second['valuation_id'] != first['valuation_id']
+    for field in ('estimated_value', 'adjustments', 'summary', 'explanation_status'):
+        assert second[field] == first[field]
+
+    metrics = main.get_result_cache_metrics()
+    assert metrics['hits'] == 1 and metrics['misses'] == 1 and metrics['hit_ratio'] == 0.5
+    assert metrics['mean_latency_ms']['hit'] < metrics['mean_latency_ms']['miss']
+
+    main.run_valuation(VEHICLE, mode='sell')
+    assert len(calls) == 2
+
+
+def test_retrained_model_misses(cached_engine, monkeypatch):
+    _, calls = cached_engine
+    main.run_valuation(VEHICLE)
+    monkeypatch.setattr(model, '_model_version', 'retrained')
+    main.run_valuation(VEHICLE)
+    assert len(calls) == 2
+
+
+def test_deferred_result_is_cached_once_explained(cached_engine):
+    _, calls = cached_engine
+    deferred = main.run_valuation(VEHICLE, explain='deferred')
+    main.get_deferred_explanation(deferred['valuation_id'], timeout=5)
+    inline = main.run_valuation(VEHICLE)
+    assert len(calls) == 1 and inline['debug']['cache'] == 'hit'
+
+
+def test_deferred_hit_explanation_is_retrievable(cached_engine):
+    main.run_valuation(VEHICLE)
+    deferred = main.run_valuation(VEHICLE, explain='deferred')
+    assert deferred['debug']['cache'] == 'hit'
+    explanation = main.get_deferred_explanation(deferred['valuation_id'])
+    assert explanation == {field: deferred[field] for field in ('adjustments', 'summary', 'explanation_status')}
+
+
+def test_hit_records_cache_stage(cached_engine, monkeypatch):
+    observed = []
+    monkeypatch.setattr(main.StageTimer, 'observe', lambda timer, mode: observed.append((list(timer.spans), mode)))
+    main.run_valuation(VEHICLE, mode='buy')
+    hit = main.run_valuation(VEHICLE, mode='buy')
+    assert list(hit['debug']['stage_timings_ms']) == ['cache', 'audit_log']
+    assert observed[-1] == (['cache', 'audit_log'], 'buy')
+
+
+def test_disk_tier_shared_between_workers(tmp_path):
+    worker_a = ValuationResultCache(disk_dir=str(tmp_path))
+    worker_b = ValuationResultCache(disk_dir=str(tmp_path))
+    worker_a.put('k', {'estimated_value': 21000.5, 'explanation_status': 'complete'})
+    assert worker_b.get('k') == {'estimated_value': 21000.5, 'explanation_status': 'complete'}
+    assert worker_b.metrics()['disk_hits'] == 1
+
+
+def test_ttl_and_lru_bounds(tmp_path):
+    cache = ValuationResultCache(max_entries=2, ttl_seconds=0.05, disk_dir=None)
+    for key in 'abc':
+        cache.put(key, {'key': key})
+    assert cache.get('a') is None and cache.get('c') == {'key': 'c'}
+    time.sleep(0.06)
+    assert cache.get('c') is None
@@ -0,0 +1,67 @@
+import copy
+
+import numpy as np
+import pytest
+
+from tests.utils.engine import VEHICLE
+from val_engine import main, model, shap_explainer
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+
+@pytest.fixture(scope="module")
+def vehicles():
+    model.train_model(random_vehicle_frame(1200))
+    shap_explainer.set_explainer(model._model)
+    rng = np.random.default_rng(4)
+    batch = []
+    for i in range(40):
+        vehicle = copy.deepcopy(VEHICLE)
+        vehicle['year'] = {'value': int(rng.integers(2008, 2024)), 'verified': bool(i % 2)}
+        vehicle['mileage'] = {'value': int(rng.integers(1000, 150000))}
+        vehicle['make'] = {'value': ['Toyota', 'Honda', 'Ford', 'Tesla'][i % 4]}
+        if i % 3 == 0:
+            vehicle['trim_level'] = {'value': 'XLE', 'verified': True}
+        batch.append(vehicle)
+    return batch
+
+
+def test_batch_matches_single_explanations(vehicles):
+    batch = shap_explainer.explain_predictions_comprehensive_batch(vehicles)
+    assert len(batch) == len(vehicles)
+
+    for vehicle, explanation in zip(vehicles, batch):
+        single = shap_explainer.explain_prediction_comprehensive(vehicle)
+        assert set(explanation) == set(single)
+        np.testing.assert_allclose(explanation['shap_values'], single['shap_values'], atol=1e-6)
+        assert explanation['feature_names'] == single['feature_names']
+        assert explanation['data_quality_impact'] == single['data_quality_impact']
+        assert explanation['verification_confidence'] == single['verification_confidence']
+        assert explanation['prediction_confidence'] == pytest.approx(single['prediction_confidence'])
+        # Contributions add up to the model's own prediction
+        assert explanation['prediction_value'] == pytest.approx(
+            model.predict_price_comprehensive(vehicle)['predicted_price'], rel=1e-6)
+
+
+def test_batch_calls_explainer_once(vehicles, monkeypatch):
+    calls = []
+    shap_values = shap_explainer.explainer.shap_values
+
+    def counting_shap_values(features):
+        calls.append(len(features))
+        return shap_values(features)
+
+    monkeypatch.setattr(shap_explainer.explainer, 'shap_values', counting_shap_values)
+    shap_explainer.explain_predictions_comprehensive_batch(vehicles)
+    assert calls == [len(vehicles)]
+
+
+def test_batch_validation_and_engine_helper(vehicles):
+    with pytest.raises(KeyError):
+        shap_explainer.explain_predictions_comprehensive_batch([vehicles[0], {'make': {'value': 'Ford'}}])
+    assert shap_explainer.explain_predictions_comprehensive_batch([]) == []
+
+    legacy = {'make': 'Ford', 'model': 'F-150', 'year': 2018, 'mileage': 60000}
+    explanations = main.explain_valuations_batch([vehicles[0], legacy, vehicles[1]])
+    assert explanations[1] is None
+    assert explanations[0]['feature_names'] == explanations[2]['feature_names']
+    assert explanations[0]['feature_names'] is not explanations[2]['feature_names']
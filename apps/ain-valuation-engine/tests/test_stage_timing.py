@@ -0,0 +1,53 @@
+import statistics
+import time
+
+import pytest
+
+from tests.utils.engine import VEHICLE, install_test_engine
+from val_engine import main, shap_explainer
+from val_engine.timing import StageTimer, server_timing_header
+
+
+@pytest.fixture()
+def engine(monkeypatch):
+    install_test_engine(monkeypatch, explain_delay=0.02)
+
+
+def test_run_valuation_reports_stage_breakdown(engine):
+    result = main.run_valuation(VEHICLE, mode='buy')
+    stages = result['debug']['stage_timings_ms']
+    assert list(stages) == ['preprocess', 'predict', 'explain', 'summary', 'audit_log']
+    assert stages['explain'] >= 20
+    assert sum(stages.values()) <= result['debug']['total_ms']
+
+
+def test_stage_timing_can_be_disabled(engine, monkeypatch):
+    monkeypatch.setattr(main, 'StageTimer', lambda: StageTimer(enabled=False))
+    assert 'debug' not in main.run_valuation(VEHICLE)
+
+
+def test_server_timing_header():
+    assert server_timing_header({'predict': 0.4125, 'explain': 12.0}) == 'predict;dur=0.412, explain;dur=12.000'
+
+
+def test_timing_overhead_under_one_percent(engine, monkeypatch):
+    monkeypatch.setattr(shap_explainer, 'explain_prediction_comprehensive',
+                        lambda vehicle: {'shap_values': [[]], 'feature_names': []})
+    valuation_s = statistics.median(_timed(lambda: main.run_valuation(VEHICLE)) for _ in range(20))
+
+    def five_spans():
+        timer = StageTimer()
+        for stage in ('preprocess', 'predict', 'explain', 'summary', 'audit_log'):
+            with timer.stage(stage):
+                pass
+        timer.observe('sell')
+        timer.breakdown_ms()
+
+    overhead_s = _timed(lambda: [five_spans() for _ in range(1000)]) / 1000
+    assert overhead_s < 0.01 * valuation_s, f"{overhead_s * 1e6:.1f}us per valuation vs {valuation_s * 1e3:.2f}ms"
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
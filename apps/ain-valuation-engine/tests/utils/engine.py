@@ -0,0 +1,26 @@
+"""Valuation engine wired to a freshly trained model with stubbed SHAP and LLM stages."""
+import time
+
+from val_engine import main, model, shap_explainer
+from val_engine.utils.synthetic_vehicles import random_vehicle_frame
+
+VEHICLE = {
+    'vin': {'value': '1HGCM82633A004352'}, 'year': {'value': 2019, 'verified': True},
+    'mileage': {'value': 40000}, 'make': {'value': 'Toyota'}, 'model': {'value': 'Camry'},
+    'overall_condition_rating': {'value': 'Good'}, 'zipcode': {'value': 90210},
+}
+
+
+def install_test_engine(monkeypatch, explain_delay=0.0):
+    """Point ``main`` at a trained model; the explainer sleeps ``explain_delay`` seconds."""
+    model.train_model(random_vehicle_frame(1200))
+    monkeypatch.setattr(main, '_loaded_model', model._model)
+    monkeypatch.setattr(main, '_loaded_encoders', model._encoders)
+    monkeypatch.setattr(main, '_shap_explainer_instance', True)
+
+    def explain(vehicle):
+        time.sleep(explain_delay)
+        return {'shap_values': [[1.0, -2.0]], 'expected_value': 20000.0, 'feature_names': ['year', 'mileage']}
+
+    monkeypatch.setattr(shap_explainer, 'explain_prediction_comprehensive', explain)
+    monkeypatch.setattr(main, 'generate_valuation_summary', lambda *args, **kwargs: 'summary')
@@ -19,3 +19,147 @@ def test_llm_timeout():
     # result is a dict with 'explanation' key
     explanation = result["explanation"] if isinstance(result, dict) else result
     assert "Estimated value" in explanation or "limited data" in explanation or "factual, user-friendly explanation" in explanation
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from engine import llm_explain
+
+
+class SlowLLM:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+            self.timeouts.append(timeout)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return f"LLM says: {prompt[:20]}"
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    def install(delay=0.0, workers=2, queue=2, failures=2, cooldown=0.3):
+        fake = SlowLLM(delay)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_explain, "openai", type("FakeOpenAI", (), {})())
+        monkeypatch.setattr(llm_explain, "_call_llm", fake)
+        monkeypatch.setattr(llm_explain, "_executor", executor)
+        monkeypatch.setattr(llm_explain, "_admission", threading.BoundedSemaphore(workers + queue))
+        monkeypatch.setattr(llm_explain, "_breaker", llm_explain.CircuitBreaker(failures, cooldown))
+        monkeypatch.setattr(llm_explain, "_inflight", {})
+        llm_explain.reset_metrics()
+        installed.append(executor)
+        return fake
+    installed = []
+    yield install
+    for executor in installed:
+        executor.shutdown(wait=True)
+
+
+def _explain(value, timeout=2):
+    return llm_explanation({"value": value, "confidence": 0.8}, [{"feature": "mileage"}], "ml_xgb", True,
+                           timeout=timeout)["explanation"]
+
+
+def _concurrently(fn, args):
+    results = [None] * len(args)
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, fn(args[i]))) for i in range(len(args))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_prompts_are_coalesced(llm):
+    fake = llm(delay=0.2)
+    results = _concurrently(_explain, [20000] * 5)
+    assert fake.calls == 1
+    assert len(set(results)) == 1 and results[0].startswith("LLM says")
+    m = llm_explain.metrics()
+    assert m["requests"] == 5 and m["llm"] == 5 and m["coalesced"] == 4 and m["fallback_rate"] == 0.0
+
+
+def test_pool_is_bounded_and_sheds_excess_load(llm):
+    fake = llm(delay=0.3, workers=2, queue=1)
+    threads_before = threading.active_count()
+    results = _concurrently(_explain, list(range(6)))
+    assert fake.max_running == 2 and fake.calls == 3
+    assert threading.active_count() <= threads_before + 2
+    assert sum(r.startswith("LLM says") for r in results) == 3
+    m = llm_explain.metrics()
+    assert m["fallbacks"] == {"overloaded": 3} and m["fallback_rate"] == 0.5
+    assert m["mean_queue_wait_ms"] > 50 and m["mean_call_latency_ms"] >= 300
+
+
+def test_breaker_opens_after_repeated_timeouts(llm):
+    fake = llm(delay=0.5, workers=4, failures=2, cooldown=0.3)
+    assert "Estimated value" in _explain(1, timeout=0.05)
+    assert "Estimated value" in _explain(2, timeout=0.05)
+    assert llm_explain.metrics()["breaker"] == "open"
+
+    # Open: the LLM is skipped entirely
+    assert "Estimated value" in _explain(3, timeout=0.05)
+    assert fake.calls == 2
+    assert llm_explain.metrics()["fallbacks"] == {"timeout": 2, "circuit_open": 1}
+
+    # After the cooldown one trial call goes through and closes the breaker on success
+    fake.delay = 0.0
+    time.sleep(0.35)
+    assert _explain(4).startswith("LLM says")
+    assert llm_explain.metrics()["breaker"] == "closed"
+    assert fake.timeouts == [0.05, 0.05, 2]  # every call carries the caller's timeout
+
+
+def test_overloaded_trial_does_not_wedge_the_breaker(llm):
+    fake = llm(delay=0.5, workers=1, queue=0, failures=1, cooldown=0.2)
+    assert "Estimated value" in _explain(1, timeout=0.05)
+    assert llm_explain.metrics()["breaker"] == "open"
+
+    # Cooldown over while the pool is still busy: the trial call is shed as overloaded
+    time.sleep(0.25)
+    assert llm_explain.metrics()["breaker"] == "half_open"
+    assert "Estimated value" in _explain(2, timeout=0.05)
+    assert llm_explain.metrics()["fallbacks"] == {"timeout": 1, "overloaded": 1}
+
+    # Once the slot frees up the trial is still available and closes the breaker
+    fake.delay = 0.0
+    time.sleep(0.35)
+    assert _explain(3).startswith("LLM says")
+    assert llm_explain.metrics()["breaker"] == "closed"
+
+
+def test_queued_call_timing_out_does_not_deadlock(llm):
+    fake = llm(delay=0.5, workers=1, queue=1, failures=10)
+    results = {}
+    first = threading.Thread(target=lambda: results.__setitem__("a", _explain(1, timeout=2)))
+    first.start()
+    time.sleep(0.05)
+    # Queued behind the first call and abandoned before it starts: cancelled, slot freed
+    queued = threading.Thread(target=lambda: results.__setitem__("b", _explain(2, timeout=0.1)))
+    queued.start()
+    queued.join(2)
+    assert not queued.is_alive() and "Estimated value" in results["b"]
+
+    later = threading.Thread(target=lambda: results.__setitem__("c", _explain(3, timeout=2)))
+    later.start()
+    for t in (first, later):
+        t.join(3)
+        assert not t.is_alive()
+    assert results["a"].startswith("LLM says") and results["c"].startswith("LLM says")
+    assert fake.calls == 2  # the cancelled call never ran
@@ -17,7 +17,7 @@ __author__ = "AIN Engineering Team"
 
 # Main exports for easy access
 from .main import run_valuation, initialize_valuation_engine
-from .model import predict_price_comprehensive, train_model
+from .model import predict_price_comprehensive, predict_price_comprehensive_batch, train_model, train_model_incremental
 from .shap_explainer import explain_prediction_comprehensive
 from .llm_summary import generate_valuation_summary
 
@@ -25,7 +25,9 @@ __all__ = [
     "run_valuation",
     "initialize_valuation_engine", 
     "predict_price_comprehensive",
+    "predict_price_comprehensive_batch",
     "train_model",
+    "train_model_incremental",
     "explain_prediction_comprehensive",
     "generate_valuation_summary"
 ]
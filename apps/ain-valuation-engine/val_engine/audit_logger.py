@@ -0,0 +1,211 @@
+"""
+Background, batched writer for valuation audit records.
+
+Valuation requests hand their audit row to ``AuditLogWriter.submit``, which
+only enqueues it. A daemon thread drains the queue and hands batches to an
+``insert_batch`` callable (a bulk Supabase insert in production, any stand-in
+in tests), flushing whenever ``batch_size`` records are buffered or
+``flush_interval`` seconds have passed since the first buffered record.
+
+Failed inserts are retried with exponential backoff. Batches that still
+fail, and records that arrive while the queue is full, are appended to a
+local NDJSON spill file so nothing is lost while the backend is down;
+``replay_spill`` re-enqueues them later.
+
+Example:
+    >>> writer = AuditLogWriter(lambda rows: client.table('valuation_audits').insert(rows).execute())
+    >>> writer.start()
+    >>> writer.submit({'valuation_id': '...', 'estimated_value': 21500.0})
+    >>> writer.metrics()['queue_depth']
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIT_SPILL_PATH = os.getenv("AIN_AUDIT_SPILL_PATH", "valuation_audit_spill.ndjson")
+AUDIT_BATCH_SIZE = int(os.getenv("AIN_AUDIT_BATCH_SIZE", "50"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AIN_AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_MAX_QUEUE = int(os.getenv("AIN_AUDIT_MAX_QUEUE", "10000"))
+
+# Prometheus metrics (optional)
+try:
+    from prometheus_client import Counter, Gauge
+    AUDIT_QUEUE_DEPTH = Gauge('valuation_audit_queue_depth', 'Audit records waiting to be written')
+    AUDIT_RECORDS = Counter('valuation_audit_records_total', 'Audit records by outcome', ['outcome'])
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class AuditLogWriter:
+    """
+    Queue plus daemon thread that writes audit records in batches.
+
+    Args:
+        insert_batch: Called with a list of records; must raise on failure.
+        batch_size: Flush once this many records are buffered.
+        flush_interval: Flush at most this many seconds after the first buffered record.
+        max_queue: Queue capacity; records beyond it go straight to the spill file.
+        max_retries: Retries per batch before it is spilled.
+        backoff_base: First retry delay in seconds, doubled per attempt.
+        backoff_max: Upper bound for a single retry delay.
+        spill_path: NDJSON file for records that could not be written.
+        sleep: Sleep function used between retries (injectable for tests).
+    """
+
+    def __init__(self, insert_batch: Callable[[List[Dict[str, Any]]], Any],
+                 batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 max_queue: int = AUDIT_MAX_QUEUE,
+                 max_retries: int = 4,
+                 backoff_base: float = 0.2,
+                 backoff_max: float = 5.0,
+                 spill_path: Optional[str] = AUDIT_SPILL_PATH,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.spill_path = spill_path
+        self._sleep = sleep
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._counts = {'submitted': 0, 'written': 0, 'batches': 0, 'retries': 0,
+                        'failed_batches': 0, 'spilled': 0}
+
+    def start(self) -> "AuditLogWriter":
+        """Start the background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """
+        Enqueue a record without blocking.
+
+        Returns:
+            bool: True if queued, False if the queue was full and the record was spilled.
+        """
+        self._counts['submitted'] += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._spill([record])
+            return False
+        if PROMETHEUS_AVAILABLE:
+            AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every queued record has been written or spilled; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush outstanding records and stop the background thread."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def metrics(self) -> Dict[str, int]:
+        """Queue depth and cumulative counts of submitted, written, retried and spilled records."""
+        return {'queue_depth': self._queue.qsize(), **self._counts}
+
+    def replay_spill(self) -> int:
+        """
+        Re-enqueue records from the spill file (which is consumed in the process).
+
+        Returns:
+            int: Number of records re-enqueued
+        """
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+        with self._spill_lock:
+            replay_path = f"{self.spill_path}.replay"
+            os.replace(self.spill_path, replay_path)
+        replayed = 0
+        with open(replay_path) as f:
+            for line in f:
+                if line.strip():
+                    self.submit(json.loads(line))
+                    replayed += 1
+        os.remove(replay_path)
+        return replayed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                if PROMETHEUS_AVAILABLE:
+                    AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.insert_batch(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Audit batch of {len(batch)} failed after {attempt + 1} attempts: {e}")
+                    self._counts['failed_batches'] += 1
+                    self._spill(batch)
+                    return
+                self._counts['retries'] += 1
+                self._sleep(min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            else:
+                self._counts['batches'] += 1
+                self._counts['written'] += len(batch)
+                if PROMETHEUS_AVAILABLE:
+                    AUDIT_RECORDS.labels(outcome='written').inc(len(batch))
+                return
+
+    def _spill(self, records: List[Dict[str, Any]]) -> None:
+        self._counts['spilled'] += len(records)
+        if PROMETHEUS_AVAILABLE:
+            AUDIT_RECORDS.labels(outcome='spilled').inc(len(records))
+        if not self.spill_path:
+            logger.warning(f"Dropping {len(records)} audit records (no spill file configured)")
+            return
+        try:
+            with self._spill_lock, open(self.spill_path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to spill {len(records)} audit records to {self.spill_path}: {e}")
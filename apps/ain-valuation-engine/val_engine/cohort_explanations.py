@@ -0,0 +1,230 @@
+"""
+Approximate SHAP explanations from precomputed cohort templates.
+
+Valuations of the same cohort (make, model, year bucket, condition band)
+get very similar SHAP contributions. ``CohortExplanationCache.build`` runs
+exact SHAP over the training set once, offline, and keeps per cohort:
+
+- the mean contribution vector (the template);
+- a linear fit of contribution against feature value for the per-vehicle
+  mileage and condition features, which are the terms that still vary
+  inside a cohort;
+- the range of those features seen in training and the cohort's 90th
+  percentile approximation error (L1 over features, in dollars).
+
+At serving time ``approximate`` fills in the template, evaluates the
+per-vehicle fits and estimates the error as the larger of the cohort's
+offline error and the additivity gap ``|prediction - base - sum(contributions)|``.
+Exact SHAP values sum to the prediction, so a large gap means a poor
+approximation. Vehicles outside their cohort's ranges, unknown cohorts and
+estimates above ``max_error`` (a fraction of the predicted price) return
+None, and the caller computes exact SHAP instead.
+
+The cache records the model version it was built for and is ignored for
+any other model.
+
+Example:
+    >>> cache = CohortExplanationCache.build(training_df)
+    >>> cache.save('cohort_explanations.joblib')
+    >>> contributions, error = get_cohort_cache().approximate(key, processed_row, predicted_price)
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COHORT_EXPLANATIONS_PATH = os.getenv("AIN_COHORT_EXPLANATIONS_PATH", "cohort_explanations.joblib")
+COHORT_EXPLAIN_MAX_ERROR = float(os.getenv("AIN_COHORT_EXPLAIN_MAX_ERROR", "0.03"))  # Fraction of the predicted price
+COHORT_MIN_ROWS = int(os.getenv("AIN_COHORT_MIN_ROWS", "20"))
+COHORT_FORMAT_VERSION = 1
+YEAR_BUCKET_YEARS = 3
+
+# Features whose contributions are re-estimated per vehicle instead of taken from the template
+MILEAGE_FEATURES = ('mileage', 'age_mileage_ratio')
+CONDITION_FEATURES = ('composite_condition_score', 'video_ai_condition_score')
+ADJUSTED_FEATURES = MILEAGE_FEATURES + CONDITION_FEATURES
+
+
+def cohort_keys(features_df: pd.DataFrame) -> pd.Series:
+    """Cohort key ('make|model|year bucket|condition') for each row of an unencoded feature frame."""
+    year = pd.to_numeric(features_df['year'], errors='coerce').fillna(0).astype(int)
+    bucket = (year // YEAR_BUCKET_YEARS * YEAR_BUCKET_YEARS).astype(str)
+    return (features_df['make'].astype(str) + '|' + features_df['model'].astype(str) + '|'
+            + bucket + '|' + features_df['condition'].astype(str))
+
+
+class CohortExplanationCache:
+    """
+    Per-cohort SHAP contribution templates for one model version.
+
+    Args:
+        model_version: Version of the model the templates were computed for.
+        feature_names: Feature order of the contribution vectors.
+        expected_value: The explainer's base value.
+        cohorts: Cohort key -> template, fits, ranges and offline error (see build).
+        max_error: Largest accepted error estimate, as a fraction of the predicted price.
+    """
+
+    def __init__(self, model_version: Optional[str], feature_names: List[str], expected_value: float,
+                 cohorts: Dict[str, Dict[str, Any]], max_error: float = COHORT_EXPLAIN_MAX_ERROR):
+        self.model_version = model_version
+        self.feature_names = list(feature_names)
+        self.expected_value = float(expected_value)
+        self.cohorts = cohorts
+        self.max_error = max_error
+        self._adjusted = np.array([self.feature_names.index(f) for f in ADJUSTED_FEATURES
+                                   if f in self.feature_names], dtype=np.int64)
+
+    @classmethod
+    def build(cls, training_df: pd.DataFrame, min_rows: int = COHORT_MIN_ROWS,
+              chunk_size: int = 5000) -> "CohortExplanationCache":
+        """
+        Compute cohort templates from exact SHAP values over the training set.
+
+        Uses the current model, encoders and SHAP explainer (set_explainer or
+        register_explainer must have been called). Cohorts with fewer than
+        ``min_rows`` training rows are left out and always explained exactly.
+        """
+        from . import model as model_module
+        from .shap_explainer import _encode_comprehensive_features, get_explainer
+
+        explainer = get_explainer()
+        if explainer is None:
+            raise RuntimeError("SHAP explainer not initialized. Call set_explainer(model) after training.")
+
+        features_df, _, _ = model_module._training_features(training_df, use_enhanced_features=True)
+        processed = _encode_comprehensive_features(features_df)
+        shap_values = np.vstack([
+            np.asarray(explainer.shap_values(processed.iloc[start:start + chunk_size]))
+            for start in range(0, len(processed), chunk_size)
+        ])
+        X = processed.to_numpy(dtype=np.float64)
+        feature_names = processed.columns.tolist()
+        adjusted = [feature_names.index(f) for f in ADJUSTED_FEATURES if f in feature_names]
+
+        keys = cohort_keys(features_df)
+        cohorts = {}
+        for key, rows in keys.groupby(keys).indices.items():
+            if len(rows) < min_rows:
+                continue
+            S, x = shap_values[rows], X[np.ix_(rows, adjusted)]
+            template = S.mean(axis=0)
+            slopes, intercepts = np.zeros(len(adjusted)), template[adjusted].copy()
+            for j, column in enumerate(adjusted):
+                if np.ptp(x[:, j]) > 0:
+                    slopes[j], intercepts[j] = np.polyfit(x[:, j], S[:, column], 1)
+
+            approx = np.broadcast_to(template, S.shape).copy()
+            approx[:, adjusted] = intercepts + slopes * x
+            cohorts[key] = {
+                'template': template,
+                'slopes': slopes,
+                'intercepts': intercepts,
+                'low': x.min(axis=0),
+                'high': x.max(axis=0),
+                'error': float(np.percentile(np.abs(approx - S).sum(axis=1), 90)),
+                'rows': int(len(rows)),
+            }
+
+        print(f"Built explanation templates for {len(cohorts)} cohorts "
+              f"({sum(c['rows'] for c in cohorts.values())} of {len(processed)} training rows)")
+        return cls(model_module.get_model_version(), feature_names,
+                   float(np.ravel(explainer.expected_value)[0]), cohorts)
+
+    def approximate(self, key: str, processed_row: np.ndarray,
+                    predicted_price: float) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Approximate contributions for one vehicle.
+
+        Args:
+            key: The vehicle's cohort key (see cohort_keys).
+            processed_row: Encoded feature values in ``feature_names`` order.
+            predicted_price: The model's prediction for the vehicle.
+
+        Returns:
+            Tuple[Optional[np.ndarray], float]: Contributions and the error
+            estimate in dollars; contributions are None when the approximation
+            should not be used (the error is inf for unknown cohorts and values
+            outside the cohort's training range).
+        """
+        cohort = self.cohorts.get(key)
+        if cohort is None:
+            return None, float('inf')
+        x = np.asarray(processed_row, dtype=np.float64)[self._adjusted]
+        if np.any(x < cohort['low']) or np.any(x > cohort['high']):
+            return None, float('inf')
+
+        contributions = cohort['template'].copy()
+        contributions[self._adjusted] = cohort['intercepts'] + cohort['slopes'] * x
+        gap = abs(predicted_price - self.expected_value - contributions.sum())
+        error = max(cohort['error'], gap)
+        if error > self.max_error * abs(predicted_price):
+            return None, error
+        return contributions, error
+
+    def save(self, path: str = COHORT_EXPLANATIONS_PATH) -> None:
+        """Write the cache next to the model artifacts."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump({
+            'format_version': COHORT_FORMAT_VERSION,
+            'model_version': self.model_version,
+            'feature_names': self.feature_names,
+            'expected_value': self.expected_value,
+            'cohorts': self.cohorts,
+        }, path)
+        print(f"Cohort explanation cache saved to {path}")
+
+    @classmethod
+    def load(cls, path: str = COHORT_EXPLANATIONS_PATH,
+             max_error: float = COHORT_EXPLAIN_MAX_ERROR) -> "CohortExplanationCache":
+        """Read a cache written by save."""
+        data = joblib.load(path)
+        if not isinstance(data, dict) or data.get('format_version') != COHORT_FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported cohort explanation cache format at {path}")
+        return cls(data['model_version'], data['feature_names'], data['expected_value'],
+                   data['cohorts'], max_error)
+
+
+# Cache loaded for the serving model: (model version, cache)
+_loaded: Tuple[Optional[str], Optional[CohortExplanationCache]] = (None, None)
+_load_lock = threading.Lock()
+
+
+def get_cohort_cache(path: Optional[str] = None) -> Optional[CohortExplanationCache]:
+    """
+    Cohort cache for the current model, loaded from disk on first use.
+
+    Returns None when no cache file exists or it was built for another model
+    version; approximate explanations then fall back to exact SHAP. The
+    outcome is remembered until the model version changes.
+    """
+    global _loaded
+
+    from .model import get_model_version
+
+    model_version = get_model_version()
+    if _loaded[0] == model_version and model_version is not None:
+        return _loaded[1]
+
+    with _load_lock:
+        path = path or COHORT_EXPLANATIONS_PATH
+        cache = None
+        if os.path.exists(path):
+            try:
+                cache = CohortExplanationCache.load(path)
+            except (OSError, RuntimeError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable cohort explanation cache {path}: {e}")
+            if cache is not None and cache.model_version != model_version:
+                logger.warning(f"Cohort explanation cache {path} was built for model {cache.model_version}, "
+                               f"not {model_version}; using exact SHAP")
+                cache = None
+        _loaded = (model_version, cache)
+        return cache
+
@@ -0,0 +1,108 @@
+"""
+Compiled tree-ensemble predictor for low-latency serving.
+
+sklearn's GradientBoostingRegressor.predict pays input validation, feature
+name checks and a per-estimator loop on every call, which dominates latency
+when scoring one vehicle at a time. This module flattens the fitted trees
+into contiguous NumPy arrays (feature, threshold, children, value) once and
+walks every tree for a row or a small batch in a handful of vectorized steps,
+one step per tree level.
+
+Predictions match sklearn within float tolerance: inputs are compared as
+float32 exactly like sklearn's tree code, only the summation order of the
+stage contributions differs.
+
+Example:
+    >>> from val_engine.compiled_model import CompiledTreeEnsemble
+    >>> compiled = CompiledTreeEnsemble.from_estimator(trained_gbr)
+    >>> compiled.predict([feature_vector])
+"""
+
+from typing import Any
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+
+class CompiledTreeEnsemble:
+    """
+    Flattened GradientBoostingRegressor with a vectorized ``predict``.
+
+    Leaves point to themselves with an infinite threshold, so every tree can
+    be advanced the same fixed number of levels without branching on leaves.
+
+    Attributes:
+        source_model: The fitted sklearn estimator the arrays were built from
+            (kept for SHAP explanations and persistence).
+    """
+
+    def __init__(self, source_model: GradientBoostingRegressor):
+        if not isinstance(source_model, GradientBoostingRegressor):
+            raise TypeError(f"Expected a fitted GradientBoostingRegressor, got {type(source_model)}")
+        if not hasattr(source_model, 'estimators_'):
+            raise AttributeError("Model must be fitted before compiling")
+
+        self.source_model = source_model
+        self.n_features_in_ = source_model.n_features_in_
+        if hasattr(source_model, 'feature_names_in_'):
+            self.feature_names_in_ = source_model.feature_names_in_
+
+        trees = [stage[0].tree_ for stage in source_model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees], dtype=np.intp)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+
+        feature = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)]).astype(np.intp)
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)]).astype(np.intp)
+        value = np.concatenate([tree.value[:, 0, 0] for tree in trees]).astype(np.float64)
+
+        is_leaf = np.concatenate([tree.children_left for tree in trees]) == -1
+        node_ids = np.arange(len(feature), dtype=np.intp)
+        feature[is_leaf] = 0
+        threshold[is_leaf] = np.inf
+        left[is_leaf] = node_ids[is_leaf]
+        right[is_leaf] = node_ids[is_leaf]
+
+        self.roots = offsets
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_value = value * source_model.learning_rate
+        self.depth = max(tree.max_depth for tree in trees)
+
+        if source_model.init_ == 'zero':
+            self.base_value = 0.0
+        else:
+            self.base_value = float(source_model.init_.predict(np.zeros((1, self.n_features_in_)))[0])
+
+    @classmethod
+    def from_estimator(cls, source_model: GradientBoostingRegressor) -> "CompiledTreeEnsemble":
+        """Compile a fitted GradientBoostingRegressor."""
+        return cls(source_model)
+
+    def predict(self, X: Any) -> np.ndarray:
+        """
+        Predict prices for a 2-D feature matrix (list of rows, ndarray or DataFrame).
+
+        Returns:
+            np.ndarray: One float64 prediction per row
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_rows, {self.n_features_in_}), got {X.shape}")
+
+        rows = np.arange(X.shape[0], dtype=np.intp)[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.base_value + self.leaf_value[nodes].sum(axis=1)
+
+
+def compile_model(model_instance: Any) -> Any:
+    """Return a CompiledTreeEnsemble for a GradientBoostingRegressor, or the model unchanged."""
+    if isinstance(model_instance, GradientBoostingRegressor):
+        return CompiledTreeEnsemble.from_estimator(model_instance)
+    return model_instance
@@ -0,0 +1,195 @@
+"""
+Content-addressed on-disk cache for engineered training features.
+
+Feature engineering and label encoding are deterministic functions of the
+input rows, the feature code and the chosen columns. This module hashes
+those inputs into a key and stores the resulting feature matrix (Parquet,
+or pickle when no Parquet engine is installed), auxiliary arrays such as
+encoder classes (NPZ) and optional fitted objects (joblib) under that key,
+so reruns over unchanged data skip straight to fitting.
+
+Entries live in one directory each and are evicted least recently used
+first once the cache exceeds its size budget, or once they have gone unused
+for longer than the maximum age.
+
+Example:
+    >>> cache = FeatureCache()
+    >>> key = cache.key(hash_frame(df), FEATURE_CODE_VERSION, feature_columns)
+    >>> entry = cache.load(key)
+    >>> if entry is None:
+    ...     cache.store(key, frame=features_df, arrays={'classes_make': classes})
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+FEATURE_CACHE_DIR = os.getenv(
+    'AIN_FEATURE_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'ain-valuation-engine', 'features'),
+)
+FEATURE_CACHE_MAX_BYTES = int(os.getenv('AIN_FEATURE_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+FEATURE_CACHE_MAX_AGE_SECONDS = float(os.getenv('AIN_FEATURE_CACHE_MAX_AGE_SECONDS', str(14 * 24 * 3600)))
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """
+    Stable content hash of a DataFrame (column names, dtypes, index and values).
+
+    Columns holding unhashable values (nested dicts/lists from the
+    comprehensive format) are hashed through their repr.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    for col in df.columns:
+        column = df[col]
+        digest.update(str(column.dtype).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(column, index=False).to_numpy().tobytes())
+        except TypeError:
+            digest.update(repr(column.tolist()).encode())
+    return digest.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Directory of cache entries keyed by content hash.
+
+    Each entry is a directory ``<cache_dir>/<key>/`` holding any of
+    ``frame.parquet`` (or ``frame.pkl``), ``arrays.npz`` and
+    ``objects.joblib``. Entries are written to a temporary directory and
+    renamed into place, so concurrent writers never expose partial entries.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_bytes: int = FEATURE_CACHE_MAX_BYTES,
+                 max_age_seconds: float = FEATURE_CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir or FEATURE_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Combine data hashes, code versions and column lists into one cache key."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for ``key`` or None on a miss (or an expired entry).
+
+        Returns:
+            Optional[Dict[str, Any]]: ``{'frame': DataFrame | None, 'arrays': dict, 'objects': Any}``
+        """
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+        if time.time() - os.path.getmtime(entry_dir) > self.max_age_seconds:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        try:
+            frame = None
+            if os.path.exists(os.path.join(entry_dir, 'frame.parquet')):
+                frame = pd.read_parquet(os.path.join(entry_dir, 'frame.parquet'))
+            elif os.path.exists(os.path.join(entry_dir, 'frame.pkl')):
+                frame = pd.read_pickle(os.path.join(entry_dir, 'frame.pkl'))
+            arrays = {}
+            if os.path.exists(os.path.join(entry_dir, 'arrays.npz')):
+                with np.load(os.path.join(entry_dir, 'arrays.npz'), allow_pickle=False) as npz:
+                    arrays = {name: npz[name] for name in npz.files}
+            objects = None
+            if os.path.exists(os.path.join(entry_dir, 'objects.joblib')):
+                objects = joblib.load(os.path.join(entry_dir, 'objects.joblib'))
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Discarding unreadable feature cache entry {key}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        os.utime(entry_dir)  # Mark as recently used for eviction
+        return {'frame': frame, 'arrays': arrays, 'objects': objects}
+
+    def store(self, key: str, frame: Optional[pd.DataFrame] = None,
+              arrays: Optional[Dict[str, np.ndarray]] = None, objects: Any = None) -> None:
+        """Write an entry for ``key`` (replacing any existing one) and evict to the size budget."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            if frame is not None:
+                if PARQUET_AVAILABLE:
+                    frame.to_parquet(os.path.join(tmp_dir, 'frame.parquet'))
+                else:
+                    frame.to_pickle(os.path.join(tmp_dir, 'frame.pkl'))
+            if arrays:
+                np.savez(os.path.join(tmp_dir, 'arrays.npz'), **arrays)
+            if objects is not None:
+                joblib.dump(objects, os.path.join(tmp_dir, 'objects.joblib'))
+
+            entry_dir = self._entry_dir(key)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until the cache fits ``max_bytes``.
+
+        Returns:
+            int: Number of entries removed
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.tmp-') or not os.path.isdir(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if now - mtime > self.max_age_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
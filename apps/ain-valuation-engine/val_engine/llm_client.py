@@ -0,0 +1,236 @@
+"""
+Async chat-completions client with a persistent prompt-hash response cache.
+
+Valuation summaries are generated from long prompts that are often identical
+to one sent minutes earlier (the same vehicle revalued, retried requests,
+batch reruns). ``PromptCache`` stores responses in SQLite keyed by a SHA-256
+of the model, messages and sampling parameters, with a TTL, so all workers on
+a host share them across restarts.
+
+``AsyncLLMClient`` talks to an OpenAI-compatible ``/chat/completions``
+endpoint over a pooled ``httpx.AsyncClient``:
+
+- at most ``max_connections`` pooled connections and ``max_concurrency``
+  requests in flight; further calls queue for a slot;
+- ``timeout`` bounds each HTTP call;
+- ``budget`` bounds the whole call including queueing, after which
+  ``LLMTimeoutError`` is raised so the caller can fall back.
+
+The client runs its own event loop on a daemon thread, so synchronous code
+(``complete``) and coroutines (``acomplete``) share one pool and one
+concurrency limit.
+
+Example:
+    >>> client = AsyncLLMClient(api_key=key, cache=PromptCache('/tmp/llm.sqlite3'))
+    >>> text = client.complete([{'role': 'user', 'content': prompt}], max_tokens=500)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+LLM_API_BASE = os.getenv("AIN_LLM_API_BASE", "https://api.openai.com/v1")
+LLM_API_KEY = os.getenv("AIN_LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
+LLM_MODEL = os.getenv("AIN_LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT_SECONDS = float(os.getenv("AIN_LLM_TIMEOUT", "15"))
+LLM_BUDGET_SECONDS = float(os.getenv("AIN_LLM_BUDGET", "20"))  # Per call, including time queued for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv("AIN_LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("AIN_LLM_MAX_CONNECTIONS", "16"))
+LLM_CACHE_PATH = os.getenv(
+    "AIN_LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser('~'), '.cache', 'ain-valuation-engine', 'llm_responses.sqlite3'),
+)  # Empty disables the cache
+LLM_CACHE_TTL_SECONDS = float(os.getenv("AIN_LLM_CACHE_TTL", str(24 * 3600)))
+
+
+class LLMTimeoutError(TimeoutError):
+    """The call did not complete within the client's time budget."""
+
+
+def prompt_cache_key(model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+    """SHA-256 of everything that determines a completion."""
+    payload = json.dumps([model, messages, max_tokens, temperature], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PromptCache:
+    """
+    SQLite-backed response cache shared by all processes using the same file.
+
+    Args:
+        path: Database file; created with its directory on first use.
+        ttl_seconds: Responses older than this are misses and are deleted on lookup.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS responses "
+                         "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``, or None when missing, expired or the database is unavailable."""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if time.time() - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                return row[0]
+        except sqlite3.Error:
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store ``response``; failures to write are ignored (the cache is best effort)."""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                             (key, response, time.time()))
+        except sqlite3.Error:
+            pass
+
+    def purge_expired(self) -> int:
+        """Delete expired responses and return how many were removed."""
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                (time.time() - self.ttl_seconds,)).rowcount
+
+
+class AsyncLLMClient:
+    """
+    Pooled, concurrency-limited chat-completions client.
+
+    Args:
+        api_key: Bearer token for the endpoint.
+        api_base: Base URL of an OpenAI-compatible API.
+        model: Model name sent with every request.
+        timeout: Seconds allowed for each HTTP call.
+        budget: Seconds allowed per call including time spent waiting for a slot.
+        max_concurrency: Requests in flight at once across all callers.
+        max_connections: Size of the HTTP connection pool.
+        cache: Response cache, or None to always call the endpoint.
+    """
+
+    def __init__(self, api_key: Optional[str] = LLM_API_KEY, api_base: str = LLM_API_BASE,
+                 model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT_SECONDS,
+                 budget: float = LLM_BUDGET_SECONDS, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_connections: int = LLM_MAX_CONNECTIONS, cache: Optional[PromptCache] = None):
+        self.api_key = api_key
+        self.api_base = api_base.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.budget = budget
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.cache = cache
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='llm-client', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _post(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.api_base,
+                headers={'Authorization': f'Bearer {self.api_key}'} if self.api_key else {},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        async with self._slots:
+            response = await self._http.post('/chat/completions', json={
+                'model': self.model,
+                'messages': messages,
+                'max_tokens': max_tokens,
+                'temperature': temperature,
+            })
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content'].strip()
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        key = prompt_cache_key(self.model, messages, max_tokens, temperature)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        try:
+            text = await asyncio.wait_for(self._post(messages, max_tokens, temperature), self.budget)
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            raise LLMTimeoutError(f"LLM call exceeded its {self.budget:.1f}s budget") from e
+        if self.cache is not None:
+            self.cache.put(key, text)
+        return text
+
+    async def acomplete(self, messages: List[Dict[str, str]], max_tokens: int = 500,
+                        temperature: float = 0.3) -> str:
+        """
+        Completion text for ``messages``, from the cache when possible.
+
+        Runs on the client's own loop so the pool and concurrency limit are
+        shared with synchronous callers.
+
+        Raises:
+            LLMTimeoutError: The call exceeded the timeout or budget.
+            httpx.HTTPError: The endpoint could not be reached or returned an error status.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._complete(messages, max_tokens, temperature),
+                                                  self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int = 500, temperature: float = 0.3) -> str:
+        """Blocking form of acomplete, safe to call from any thread."""
+        future = asyncio.run_coroutine_threadsafe(self._complete(messages, max_tokens, temperature),
+                                                  self._ensure_loop())
+        return future.result()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the client's event loop."""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result()
+            self._http = None
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_client: Optional[AsyncLLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> Optional[AsyncLLMClient]:
+    """Shared client configured from the AIN_LLM_* environment, or None without an API key."""
+    global _client
+    if _client is None and LLM_API_KEY:
+        with _client_lock:
+            if _client is None:
+                cache = PromptCache(LLM_CACHE_PATH) if LLM_CACHE_PATH else None
+                _client = AsyncLLMClient(cache=cache)
+    return _client
@@ -11,8 +11,14 @@ The goal is to provide clear, trust-building explanations that cover:
 - Important verified vehicle history and features.
 - Any relevant market context.
 
+Completions go through ``val_engine.llm_client``: an async, pooled and
+concurrency-limited client behind a persistent prompt-hash cache, so an
+identical prompt is answered from the cache instead of the API. When no API
+key is configured, or a call exceeds its timeout or budget or fails, the
+deterministic mock summary is returned instead.
+
 Dependencies:
-    - openai: For OpenAI API calls (fallback to mock if not available)
+    - httpx: For the pooled async LLM client (see val_engine.llm_client)
     - typing: For type hints
     - os: For environment variable access
 
@@ -41,19 +47,11 @@ Example:
 import os
 import json
 from typing import Dict, List, Optional, Any
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
 
-# Initialize OpenAI client if available
-client = None
-if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .llm_client import LLM_API_KEY, LLMTimeoutError, get_llm_client
 
 # Configuration
-USE_MOCK_LLM = os.environ.get('USE_MOCK_LLM', 'true').lower() == 'true' or client is None
+USE_MOCK_LLM = os.environ.get('USE_MOCK_LLM', 'true').lower() == 'true' or not LLM_API_KEY
 
 def _generate_mock_summary(estimated_price: float, vehicle_data: Dict[str, Any], mode: str = "sell") -> str:
     """
@@ -289,11 +287,13 @@ def generate_valuation_summary(
     if os.environ.get('DEBUG_LLM_PROMPT', 'false').lower() == 'true':
         print(f"\n--- LLM Prompt ---\n{llm_prompt}\n------------------")
 
-    # Call OpenAI API
+    # Call the LLM (identical prompts are served from the prompt cache)
+    client = get_llm_client()
+    if client is None:
+        return _generate_mock_summary(estimated_price, vehicle_data, mode)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Cost-effective model for summaries
-            messages=[
+        return client.complete(
+            [
                 {"role": "system", "content": "You are an expert automotive valuation analyst with extensive experience in market analysis and vehicle assessment."},
                 {"role": "user", "content": llm_prompt}
             ],
@@ -301,8 +301,9 @@ def generate_valuation_summary(
             temperature=0.3  # Lower temperature for more consistent, professional output
         )
 
-        return response.choices[0].message.content.strip()
-
+    except LLMTimeoutError as e:
+        print(f"LLM summary timed out, using fallback summary: {e}")
+        return _generate_mock_summary(estimated_price, vehicle_data, mode)
     except Exception as e:
-        print(f"Error calling OpenAI API: {e}")
+        print(f"Error calling LLM API: {e}")
         return _generate_mock_summary(estimated_price, vehicle_data, mode)
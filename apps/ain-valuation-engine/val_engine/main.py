@@ -207,7 +207,12 @@ import pandas as pd
 import json
 import os
 import uuid
+import time
+import atexit
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from typing import Dict, Any, Union, Tuple, List, Optional
 from pathlib import Path
@@ -228,16 +233,26 @@ except ImportError:
         pass
 
 # Import model persistence functions
-from val_engine.model import train_model, predict_price, load_model_artifacts, save_model_artifacts
+from val_engine.model import (train_model, predict_price, load_model_artifacts, save_model_artifacts, get_compiled_model,
+                              get_model_version)
 from sklearn.ensemble import GradientBoostingRegressor # For type hinting loaded model
 from sklearn.preprocessing import LabelEncoder # For type hinting loaded encoders
 
 # Import SHAP explainer functions
-from val_engine.shap_explainer import set_explainer, explain_prediction as get_shap_explanation
+from val_engine.shap_explainer import set_explainer, register_explainer, explain_prediction as get_shap_explanation
 
 # Import LLM summary function
 from val_engine.llm_summary import generate_valuation_summary
 
+# Background writer for audit records
+from val_engine.audit_logger import AuditLogWriter
+
+# Per-stage latency spans
+from val_engine.timing import StageTimer
+
+# Cache of complete valuation results keyed by canonical input hash
+from val_engine.result_cache import RESULT_CACHE_ENABLED, ValuationResultCache, valuation_cache_key
+
 # Load environment variables (optional)
 try:
     try:
@@ -259,8 +274,25 @@ logger = logging.getLogger(__name__)
 # Global variables to store the loaded model, encoders, SHAP explainer, and Supabase client
 _loaded_model: Union[GradientBoostingRegressor, None] = None
 _loaded_encoders: Dict[str, LabelEncoder] = {}
+_compiled_model: Optional[Any] = None # CompiledTreeEnsemble of _loaded_model for low-latency prediction
 _shap_explainer_instance: Optional[Any] = None # Use Any for shap.TreeExplainer to avoid circular import if needed
 _supabase_client: Optional[Client] = None
+_audit_writer: Optional[AuditLogWriter] = None
+
+# Deferred explanations: background workers and a bounded valuation_id -> Future store
+EXPLAIN_MODES = ('none', 'deferred', 'inline', 'approximate')
+EXPLANATION_WORKERS = int(os.getenv("AIN_EXPLANATION_WORKERS", "2"))
+MAX_DEFERRED_EXPLANATIONS = int(os.getenv("AIN_MAX_DEFERRED_EXPLANATIONS", "10000"))
+_explanation_executor: Optional[ThreadPoolExecutor] = None
+_deferred_explanations: "OrderedDict[str, Future]" = OrderedDict()
+_deferred_lock = threading.Lock()
+
+# Repeat requests (same canonical input, mode and model version) are served from here
+_result_cache: Optional[ValuationResultCache] = ValuationResultCache() if RESULT_CACHE_ENABLED else None
+
+# Serve predictions from the compiled tree ensemble unless a call says otherwise. Its arrays are
+# memory-mapped from the model bundle and shared between workers; the sklearn model is not
+USE_COMPILED_PREDICTOR = os.getenv("AIN_COMPILED_PREDICTOR", "true").lower() in ("1", "true", "yes")
 
 # --- Supabase Configuration ---
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -292,6 +324,44 @@ def initialize_supabase_client() -> None:
             logger.error(f"Failed to initialize Supabase client: {e}", exc_info=True)
             _supabase_client = None # Ensure client is None if initialization fails
 
+    if _supabase_client is not None:
+        start_audit_writer()
+
+def _insert_audit_rows(rows: List[Dict[str, Any]]) -> None:
+    """Bulk-insert audit rows into Supabase, raising on failure so the writer retries."""
+    response = _supabase_client.table(AUDIT_TABLE_NAME).insert(rows).execute()
+    error = getattr(response, "error", None)
+    if error:
+        raise RuntimeError(f"Supabase insert failed: {error}")
+
+def start_audit_writer(insert_batch: Optional[Any] = None, **writer_options: Any) -> AuditLogWriter:
+    """
+    Start the background audit writer (replacing any running one) and replay spilled records.
+
+    Args:
+        insert_batch: Callable receiving a list of audit rows. Defaults to a
+            bulk insert into the Supabase audit table; tests pass a local stand-in.
+        **writer_options: Passed to AuditLogWriter (batch_size, flush_interval, spill_path, ...).
+    """
+    global _audit_writer
+
+    if _audit_writer is not None:
+        _audit_writer.close()
+    _audit_writer = AuditLogWriter(insert_batch or _insert_audit_rows, **writer_options).start()
+    replayed = _audit_writer.replay_spill()
+    if replayed:
+        logger.info(f"Replaying {replayed} spilled valuation audit records.")
+    return _audit_writer
+
+def get_audit_log_metrics() -> Dict[str, int]:
+    """Queue depth and write/retry/spill counters of the audit writer (empty if not running)."""
+    return _audit_writer.metrics() if _audit_writer is not None else {}
+
+@atexit.register
+def _close_audit_writer() -> None:
+    if _audit_writer is not None:
+        _audit_writer.close()
+
 def initialize_valuation_engine() -> None:
     """
     Initializes the valuation engine by loading a pre-trained model and encoders.
@@ -299,7 +369,7 @@ def initialize_valuation_engine() -> None:
     This function should be called once when the application starts.
     It also initializes the SHAP explainer and Supabase client (if available).
     """
-    global _loaded_model, _loaded_encoders, _shap_explainer_instance
+    global _loaded_model, _loaded_encoders, _compiled_model, _shap_explainer_instance
 
     logger.info("Initializing valuation engine...")
     
@@ -321,21 +391,25 @@ def initialize_valuation_engine() -> None:
         logger.error(f"Error initializing valuation engine model: {e}", exc_info=True)
         raise # Re-raise to indicate a critical startup failure for the model
 
-    # 3. Initialize SHAP Explainer
+    # Compiled tree arrays come memory-mapped from the bundle so run_valuation can select them per call
+    _compiled_model = get_compiled_model()
+
+    # 3. Initialize SHAP Explainer (shap is imported and the explainer built on the first explanation)
     if _loaded_model:
-        set_explainer(_loaded_model)
+        register_explainer(_loaded_model)
         _shap_explainer_instance = True  # Mark as initialized
-        logger.info("SHAP explainer initialized.")
+        logger.info("SHAP explainer registered.")
     else:
         logger.error("Model not loaded, cannot initialize SHAP explainer.")
         raise RuntimeError("Model not loaded, cannot initialize SHAP explainer.")
 
 def _log_valuation_to_supabase(valuation_record: Dict[str, Any]) -> None:
     """
-    Logs a valuation record to the Supabase audit table.
-    This function is non-blocking and handles its own errors.
+    Queues a valuation record for the Supabase audit table.
+    This function is non-blocking and handles its own errors; the background
+    audit writer batches, retries and spills the rows.
     """
-    if _supabase_client is None:
+    if _audit_writer is None:
         logger.warning("Supabase client not initialized. Cannot log valuation audit.")
         return
 
@@ -360,20 +434,212 @@ def _log_valuation_to_supabase(valuation_record: Dict[str, Any]) -> None:
             "api_version": valuation_record.get("api_version")
         }
 
-        response = _supabase_client.table(AUDIT_TABLE_NAME).insert(log_data).execute()
-        
-        if response.data:
-            logger.info(f"Valuation {log_data['valuation_id']} logged to Supabase successfully.")
-        elif response.error:
-            logger.error(f"Failed to log valuation {log_data['valuation_id']} to Supabase: {response.error}", exc_info=True)
-        else:
-            logger.warning(f"Supabase insert for {log_data['valuation_id']} returned unexpected response: {response}")
+        if not _audit_writer.submit(log_data):
+            logger.warning(f"Audit queue full; valuation {log_data['valuation_id']} spilled to disk.")
 
     except Exception as e:
         logger.error(f"An unexpected error occurred during Supabase logging for valuation {valuation_record.get('valuation_id')}: {e}", exc_info=True)
 
 
-def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell') -> Dict[str, Any]:
+def _explain_valuation(input_dict: Dict[str, Any], input_df: pd.DataFrame, original_predicted_price: float,
+                       adjusted_price: float, mode: str, mode_adjustment_amount: float,
+                       timer: StageTimer, shap_explanation: Optional[Dict[str, Any]] = None,
+                       approximate: bool = False) -> Dict[str, Any]:
+    """
+    SHAP adjustments and LLM summary for one valuation (the slow part of run_valuation).
+
+    ``shap_explanation`` is a comprehensive SHAP explanation computed ahead of
+    time (see explain_valuations_batch); when given, the explainer is not called.
+    With ``approximate`` a comprehensive input is explained from its cohort
+    template when the error estimate allows (see explain_prediction_approximate).
+
+    Returns:
+        Dict[str, Any]: ``adjustments``, ``summary`` and ``explanation_status``
+        ('complete', or 'approximate' when a cohort template was used)
+    """
+    with timer.stage("explain"):
+        if _is_comprehensive_input(input_dict):
+            if shap_explanation is not None:
+                explanation = shap_explanation
+            elif approximate:
+                from val_engine.shap_explainer import explain_prediction_approximate
+                explanation = explain_prediction_approximate(input_dict, original_predicted_price)
+            else:
+                from val_engine.shap_explainer import explain_prediction_comprehensive
+                explanation = explain_prediction_comprehensive(input_dict)
+            shap_values = explanation.get('shap_values', [[]])
+            if hasattr(shap_values, 'tolist'):  # ndarray from the comprehensive explainer
+                shap_values = shap_values.tolist()
+            expected_value = explanation.get('expected_value', original_predicted_price)
+            feature_names = explanation.get('feature_names', [])
+            approximation = explanation.get('approximation')
+        else:
+            approximation = None
+            from val_engine.shap_explainer import explain_prediction_legacy
+            try:
+                import val_engine.shap_explainer as shap_module
+                shap_module._encoders = _loaded_encoders
+                shap_module._model = _loaded_model
+            
+                shap_result = explain_prediction_legacy(input_df)
+                if hasattr(shap_result, 'values'):
+                    shap_values = [shap_result.values] if shap_result.values.ndim == 1 else shap_result.values.tolist()
+                    expected_value = getattr(shap_result, 'base_values', original_predicted_price)
+                    feature_names = input_df.columns.tolist()
+                else:
+                    shap_values = [[]]
+                    expected_value = original_predicted_price
+                    feature_names = []
+            except Exception as e:
+                logger.warning(f"SHAP explanation failed: {e}. Using basic explanation.")
+                shap_values = [[]]
+                expected_value = original_predicted_price
+                feature_names = []
+    
+    # Fixed bug: don't call .tolist() on a list
+    adjustments_list = shap_values[0] if isinstance(shap_values, list) and shap_values else []
+    
+    if mode_adjustment_amount != 0.0:
+        adjustments_list.append(mode_adjustment_amount)
+        feature_names.append(f"valuation_mode_{mode}")
+
+    with timer.stage("summary"):
+        summary = generate_valuation_summary(
+            adjusted_price, 
+            input_dict,
+            [adjustments_list],
+            expected_value, 
+            feature_names,
+            mode=mode
+        )
+    
+    return {
+        "adjustments": {
+            "feature_contributions": adjustments_list,
+            "feature_names": feature_names,
+            "expected_base_value": float(expected_value),
+            **({"approximation": approximation} if approximation else {})
+        },
+        "summary": summary,
+        "explanation_status": "approximate" if approximation and approximation["method"] == "cohort" else "complete",
+    }
+
+def _run_deferred_explanation(valuation_result: Dict[str, Any], input_df: pd.DataFrame,
+                              cache_key: Optional[str] = None) -> Dict[str, Any]:
+    """Background job: compute the explanation for a deferred valuation, then log the full audit record."""
+    timer = StageTimer()
+    try:
+        explanation = _explain_valuation(
+            valuation_result["input_data"], input_df, valuation_result["original_predicted_value"],
+            valuation_result["estimated_value"], valuation_result["mode"],
+            valuation_result["mode_adjustment_amount"], timer
+        )
+    except Exception as e:
+        logger.error(f"Deferred explanation failed for valuation {valuation_result['valuation_id']}: {e}", exc_info=True)
+        explanation = {"adjustments": None, "summary": None, "explanation_status": "failed",
+                       "explanation_error": str(e)}
+    timer.observe(valuation_result["mode"])
+    if cache_key is not None and _result_cache is not None and explanation["explanation_status"] == "complete":
+        _result_cache.put(cache_key, _cacheable_result({**valuation_result, **explanation}))
+    if timer.enabled:
+        explanation["explanation_timings_ms"] = timer.breakdown_ms()
+    _log_valuation_to_supabase({**valuation_result, **explanation})
+    return explanation
+
+def _submit_deferred_explanation(valuation_result: Dict[str, Any], input_df: pd.DataFrame,
+                                 cache_key: Optional[str] = None) -> None:
+    global _explanation_executor
+
+    with _deferred_lock:
+        if _explanation_executor is None:
+            _explanation_executor = ThreadPoolExecutor(max_workers=EXPLANATION_WORKERS,
+                                                       thread_name_prefix="deferred-explanation")
+        future = _explanation_executor.submit(_run_deferred_explanation, dict(valuation_result), input_df, cache_key)
+        _remember_deferred_explanation(valuation_result["valuation_id"], future)
+
+def _register_cached_explanation(valuation_result: Dict[str, Any]) -> None:
+    """Make a cached result's explanation retrievable by get_deferred_explanation under its new ID."""
+    future: Future = Future()
+    future.set_result({field: valuation_result.get(field) for field in ("adjustments", "summary", "explanation_status")})
+    with _deferred_lock:
+        _remember_deferred_explanation(valuation_result["valuation_id"], future)
+
+def _remember_deferred_explanation(valuation_id: str, future: Future) -> None:
+    # Caller holds _deferred_lock
+    _deferred_explanations[valuation_id] = future
+    while len(_deferred_explanations) > MAX_DEFERRED_EXPLANATIONS:
+        _deferred_explanations.popitem(last=False)
+
+def get_deferred_explanation(valuation_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Explanation of a valuation run with ``explain='deferred'``.
+
+    Args:
+        valuation_id (str): ID returned by run_valuation.
+        timeout (Optional[float]): Seconds to wait for a pending explanation (None returns immediately).
+
+    Returns:
+        Optional[Dict[str, Any]]: ``explanation_status`` ('pending', 'complete' or 'failed')
+        plus ``adjustments`` and ``summary`` once complete; None for unknown IDs.
+    """
+    with _deferred_lock:
+        future = _deferred_explanations.get(valuation_id)
+    if future is None:
+        return None
+    if timeout is not None:
+        wait([future], timeout=timeout)
+    if not future.done():
+        return {"explanation_status": "pending"}
+    return future.result()
+
+def _is_comprehensive_input(input_dict: Dict[str, Any]) -> bool:
+    return any(isinstance(value, dict) and 'value' in value for value in input_dict.values())
+
+def explain_valuations_batch(input_dicts: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    SHAP explanations for a batch of valuation inputs with one explainer call.
+
+    Comprehensive-format inputs are explained together by
+    explain_predictions_comprehensive_batch; pass each result to run_valuation
+    as ``shap_explanation``. Legacy-format inputs get None and are explained
+    per valuation as before.
+
+    Args:
+        input_dicts (List[Dict[str, Any]]): Valuation inputs in request order.
+
+    Returns:
+        List[Optional[Dict[str, Any]]]: One explanation (or None) per input. If the
+        batch call fails every entry is None, so each valuation falls back to its
+        own explainer call.
+    """
+    explanations: List[Optional[Dict[str, Any]]] = [None] * len(input_dicts)
+    positions = [i for i, input_dict in enumerate(input_dicts) if _is_comprehensive_input(input_dict)]
+    if not positions:
+        return explanations
+
+    from val_engine.shap_explainer import explain_predictions_comprehensive_batch
+    try:
+        batch = explain_predictions_comprehensive_batch([input_dicts[i] for i in positions])
+    except Exception as e:
+        logger.warning(f"Batch SHAP explanation failed: {e}. Explaining valuations individually.")
+        return explanations
+    for position, explanation in zip(positions, batch):
+        explanations[position] = explanation
+    return explanations
+
+def _cacheable_result(valuation_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Valuation result without the per-request fields (ID, timestamp, timings)."""
+    return {k: v for k, v in valuation_result.items() if k not in ("valuation_id", "timestamp", "debug")}
+
+def get_result_cache_metrics() -> Dict[str, Any]:
+    """Hit/miss counts, hit ratio and latency by outcome of the valuation result cache (empty if disabled)."""
+    return _result_cache.metrics() if _result_cache is not None else {}
+
+def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell',
+                  compiled_predictor: Optional[bool] = None,
+                  explain: str = 'inline',
+                  valuation_id: Optional[str] = None,
+                  shap_explanation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Execute a complete vehicle valuation with price prediction and analysis.
     
@@ -387,12 +653,30 @@ def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell') -> Dict[str, A
                                       VehicleDataForValuation schema.
         mode (str): The valuation mode, either 'buy' (from buyer's perspective)
                     or 'sell' (from seller's perspective). Defaults to 'sell'.
+        compiled_predictor (Optional[bool]): Predict with the compiled tree ensemble
+                    instead of sklearn's predict. Defaults to AIN_COMPILED_PREDICTOR.
+        explain (str): 'inline' computes SHAP adjustments and the summary before
+                    returning; 'deferred' returns the price immediately and computes
+                    them in a background worker (see get_deferred_explanation);
+                    'none' skips them; 'approximate' is 'inline' with SHAP values taken
+                    from the cohort explanation cache where its error bound allows.
+                    Defaults to 'inline'.
+        valuation_id (Optional[str]): ID to assign to the valuation (generated if omitted).
+        shap_explanation (Optional[Dict[str, Any]]): Precomputed SHAP explanation for a
+                    comprehensive input, e.g. from explain_valuations_batch. Used by
+                    explain='inline' instead of calling the explainer again.
+    
+    Repeat requests with the same canonicalized input, mode and model version
+    are served from the result cache (AIN_RESULT_CACHE, AIN_RESULT_CACHE_TTL,
+    AIN_RESULT_CACHE_DIR for a tier shared across workers).
     
     Returns:
         Dict[str, Any]: Comprehensive valuation report containing:
             - estimated_value (float): Predicted vehicle price in USD (adjusted by mode)
             - adjustments (Dict[str, Any]): SHAP values and feature names
             - summary (str): Natural language explanation of the valuation
+              (adjustments and summary are None for explain='deferred'/'none')
+            - explanation_status (str): 'complete', 'approximate', 'pending' (deferred) or 'none'
             - confidence_score (float, optional): Market confidence score
             - original_predicted_value (float): The price before mode adjustment
             - mode_adjustment_amount (float): The amount adjusted due to buyer/seller mode
@@ -400,6 +684,9 @@ def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell') -> Dict[str, A
             - timestamp (str): ISO formatted timestamp of the valuation
             - api_version (str): Version of the API that processed the valuation
             - input_data (Dict[str, Any]): The original input data (for audit purposes)
+            - debug (Dict[str, Any]): Result cache outcome, per-stage timings in ms
+              (preprocess, predict, explain, summary, audit_log) and total_ms;
+              omitted when AIN_STAGE_TIMING=0
     
     Raises:
         ValueError: If required input fields are missing or invalid.
@@ -413,11 +700,48 @@ def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell') -> Dict[str, A
     
     if mode not in ['buy', 'sell']:
         raise ValueError("Invalid mode provided. Must be 'buy' or 'sell'.")
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"Invalid explain option provided. Must be one of {EXPLAIN_MODES}.")
+
+    timer = StageTimer()
+
+    # Serve repeat requests from the result cache (only complete explanations satisfy 'inline'/'deferred')
+    usable_statuses = {'none': None, 'approximate': ('complete', 'approximate')}.get(explain, ('complete',))
+    cache_key = None
+    if _result_cache is not None:
+        with timer.stage("cache"):
+            cache_key = valuation_cache_key(input_dict, mode, get_model_version() or "")
+            cached = _result_cache.get(cache_key)
+        if cached is not None and (usable_statuses is None or cached.get("explanation_status") in usable_statuses):
+            valuation_result = {
+                **cached,
+                "valuation_id": valuation_id or str(uuid.uuid4()),
+                "timestamp": datetime.now().isoformat(),
+                "input_data": input_dict,
+            }
+            if explain == 'deferred':
+                _register_cached_explanation(valuation_result)
+            with timer.stage("audit_log"):
+                _log_valuation_to_supabase(valuation_result)
+            _result_cache.record("hit", timer.total_seconds())
+            if timer.enabled:
+                timer.observe(mode)
+                valuation_result["debug"] = {
+                    "cache": "hit",
+                    "stage_timings_ms": timer.breakdown_ms(),
+                    "total_ms": round(timer.total_seconds() * 1000, 3),
+                }
+            return valuation_result
 
     # Preprocess input data (raw, single-row DataFrame)
-    input_df = preprocess_input(input_dict)
+    with timer.stage("preprocess"):
+        input_df = preprocess_input(input_dict)
     # PATCH: Pass raw input DataFrame to pipeline; do not align, reorder, or fill columns manually
-    original_predicted_price = predict_price(input_df, _loaded_model, _loaded_encoders)
+    if compiled_predictor is None:
+        compiled_predictor = USE_COMPILED_PREDICTOR
+    model_instance = _compiled_model if compiled_predictor and _compiled_model is not None else _loaded_model
+    with timer.stage("predict"):
+        original_predicted_price = predict_price(input_df, model_instance, _loaded_encoders)
     
     # Apply buyer/seller adjustment
     adjusted_price = float(original_predicted_price)
@@ -431,76 +755,50 @@ def run_valuation(input_dict: Dict[str, Any], mode: str = 'sell') -> Dict[str, A
         adjusted_price *= adjustment_factor
         mode_adjustment_amount = original_predicted_price * (adjustment_factor - 1)
 
-    is_comprehensive = any(isinstance(value, dict) and 'value' in value for value in input_dict.values())
-    
-    if is_comprehensive:
-        from val_engine.shap_explainer import explain_prediction_comprehensive
-        explanation = explain_prediction_comprehensive(input_dict)
-        shap_values = explanation.get('shap_values', [[]])
-        expected_value = explanation.get('expected_value', original_predicted_price)
-        feature_names = explanation.get('feature_names', [])
-    else:
-        from val_engine.shap_explainer import explain_prediction_legacy
-        try:
-            import val_engine.shap_explainer as shap_module
-            shap_module._encoders = _loaded_encoders
-            shap_module._model = _loaded_model
-            
-            shap_result = explain_prediction_legacy(input_df)
-            if hasattr(shap_result, 'values'):
-                shap_values = [shap_result.values] if shap_result.values.ndim == 1 else shap_result.values.tolist()
-                expected_value = getattr(shap_result, 'base_values', original_predicted_price)
-                feature_names = input_df.columns.tolist()
-            else:
-                shap_values = [[]]
-                expected_value = original_predicted_price
-                feature_names = []
-        except Exception as e:
-            logger.warning(f"SHAP explanation failed: {e}. Using basic explanation.")
-            shap_values = [[]]
-            expected_value = original_predicted_price
-            feature_names = []
-    
-    # Fixed bug: don't call .tolist() on a list
-    adjustments_list = shap_values[0] if isinstance(shap_values, list) and shap_values else []
-    
-    if mode_adjustment_amount != 0.0:
-        adjustments_list.append(mode_adjustment_amount)
-        feature_names.append(f"valuation_mode_{mode}")
-
     confidence_score = None
     market_confidence_info = input_dict.get('market_confidence_score')
     if market_confidence_info and market_confidence_info.get('verified', False):
         confidence_score = market_confidence_info.get('value')
 
-    summary = generate_valuation_summary(
-        adjusted_price, 
-        input_dict,
-        [adjustments_list],
-        expected_value, 
-        feature_names,
-        mode=mode
-    )
+    if explain in ('inline', 'approximate'):
+        explanation = _explain_valuation(input_dict, input_df, original_predicted_price, adjusted_price,
+                                         mode, mode_adjustment_amount, timer, shap_explanation,
+                                         approximate=explain == 'approximate')
+    else:
+        explanation = {"adjustments": None, "summary": None,
+                       "explanation_status": "pending" if explain == 'deferred' else "none"}
     
     valuation_result = {
         "estimated_value": adjusted_price,
         "original_predicted_value": float(original_predicted_price),
         "mode_adjustment_amount": mode_adjustment_amount,
         "mode": mode,
-        "adjustments": {
-            "feature_contributions": adjustments_list,
-            "feature_names": feature_names,
-            "expected_base_value": float(expected_value)
-        },
-        "summary": summary,
+        **explanation,
         "confidence_score": confidence_score,
-        "valuation_id": str(uuid.uuid4()),
+        "valuation_id": valuation_id or str(uuid.uuid4()),
         "timestamp": datetime.now().isoformat(),
         "api_version": "3.0",
         "input_data": input_dict
     }
 
-    _log_valuation_to_supabase(valuation_result)
+    if explain == 'deferred':
+        # The worker logs the audit record (and caches the result) once the explanation is attached
+        _submit_deferred_explanation(valuation_result, input_df, cache_key)
+    else:
+        with timer.stage("audit_log"):
+            _log_valuation_to_supabase(valuation_result)
+        if _result_cache is not None:
+            _result_cache.put(cache_key, _cacheable_result(valuation_result))
+
+    if _result_cache is not None:
+        _result_cache.record("miss", timer.total_seconds())
+    if timer.enabled:
+        timer.observe(mode)
+        valuation_result["debug"] = {
+            "cache": "miss" if _result_cache is not None else "disabled",
+            "stage_timings_ms": timer.breakdown_ms(),
+            "total_ms": round(timer.total_seconds() * 1000, 3),
+        }
     
     return valuation_result
 
@@ -520,7 +818,7 @@ if __name__ == "__main__":
     from val_engine.utils.feature_builder import build_inference_df
     from val_engine.utils.schema import VehicleDataForValuation
     from val_engine.model import load_model_artifacts, predict_price
-    from val_engine.market import load_comps_file, compute_market_anchor
+    from val_engine.market import open_comps, compute_market_anchor
     import json
     from datetime import datetime
 
@@ -539,7 +837,7 @@ if __name__ == "__main__":
     parser.add_argument("--warranty-powertrain-months", type=int, default=60)
     parser.add_argument("--warranty-basic-miles", type=int, default=36000)
     parser.add_argument("--warranty-powertrain-miles", type=int, default=60000)
-    parser.add_argument("--comps-file", type=str, default=None, help="Path to JSON file with market comps (optional)")
+    parser.add_argument("--comps-file", type=str, default=None, help="Path to a comp store directory or JSON file with market comps (optional)")
     parser.add_argument("--output", type=str, default=None, help="Output JSON file path (default: ${AIN_OUTDIR}/valuation_{VIN}.json)")
     args = parser.parse_args()
 
@@ -596,12 +894,14 @@ if __name__ == "__main__":
     market_anchor = None
     if comps_file:
         try:
-            comps = load_comps_file(comps_file)
+            comps = open_comps(comps_file)
             market_anchor = compute_market_anchor(
                 comps,
                 target_trim=vin_decoded.get('trim'),
                 target_year=vin_decoded.get('year'),
-                target_miles=args.mileage
+                target_miles=args.mileage,
+                make=vin_decoded.get('make'),
+                model=vin_decoded.get('model')
             )
         except Exception as e:
             print(f"WARNING: Failed to load or process comps file: {e}", file=sys.stderr)
@@ -1,17 +1,47 @@
 import json
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, Optional, Union
 import numpy as np
 
+from engine.listing_store import ListingStore
+
 def load_comps_file(path: str) -> Dict[str, Any]:
     with open(path, 'r') as f:
         return json.load(f)
 
-def compute_market_anchor(comps: Dict[str, Any], target_trim: Optional[str]=None, target_year: Optional[int]=None, target_miles: Optional[int]=None) -> Dict[str, Any]:
+def open_comps(path: str) -> Union[ListingStore, Dict[str, Any]]:
+    """A ListingStore for a store directory, else the merged JSON comps file."""
+    if os.path.isdir(path):
+        return ListingStore(path)
+    return load_comps_file(path)
+
+def _store_anchor(store: ListingStore, make: str, model: str, target_trim: Optional[str]) -> Dict[str, Any]:
+    # Same cohort rules as the JSON path, with the trim family pushed into the scan
+    filtered = store.scan(make, model, trim_family=target_trim) if target_trim else None
+    if filtered is None or filtered.num_rows < 3:
+        filtered = store.scan(make, model)
+    prices = filtered['price'].drop_null().to_numpy()
+    prices = prices[prices != 0]
+    if not len(prices):
+        return {'median_price': None, 'price_range': None, 'comps_used': 0, 'listings': []}
+    return {
+        'median_price': float(np.median(prices)),
+        'price_range': [float(np.percentile(prices, 10)), float(np.percentile(prices, 90))],
+        'comps_used': filtered.num_rows,
+        'listings': filtered.to_pylist()
+    }
+
+def compute_market_anchor(comps: Union[ListingStore, Dict[str, Any]], target_trim: Optional[str]=None, target_year: Optional[int]=None, target_miles: Optional[int]=None, make: Optional[str]=None, model: Optional[str]=None) -> Dict[str, Any]:
     """
-    Given a comps dict (from JSON), compute median price and range for matching comps.
+    Given a comps dict (from JSON) or a ListingStore, compute median price and range for matching comps.
+    A ListingStore is read for the make/model cohort only (make and model are required).
     Optionally normalize for trim/year/miles.
     Returns: dict with median_price, price_range, comps_used, listings
     """
+    if isinstance(comps, ListingStore):
+        if not make or not model:
+            raise ValueError("make and model are required to read a ListingStore")
+        return _store_anchor(comps, make, model, target_trim)
     listings = comps.get('listings', [])
     # Filter for same gen/trim family if possible
     filtered = []
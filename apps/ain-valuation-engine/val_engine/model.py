@@ -64,14 +64,29 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.preprocessing import LabelEncoder
+import copy
 import joblib
 import os
+import time
+import uuid
 from typing import Dict, Any, Tuple, Union, List, Optional
 
+from .compiled_model import CompiledTreeEnsemble, compile_model
+from .feature_cache import FeatureCache, hash_frame
+
 # Define file paths for model persistence
 MIN_TRAIN_ROWS = 1000
+# Incremental retraining: minimum new rows, stages added per run and held-out share of the slice
+MIN_INCREMENTAL_ROWS = 200
+INCREMENTAL_ESTIMATORS = 40
+INCREMENTAL_HOLDOUT_FRACTION = 0.2
 MODEL_PATH = os.getenv('AIN_TABULAR_MODEL_PATH', 'gradient_boosting_model.joblib')
 ENCODERS_PATH = os.getenv('AIN_ENCODERS_PATH', 'label_encoders.joblib')
+# Single-file bundle (model, compiled arrays, encoders, feature spec); preferred over the pair above
+BUNDLE_PATH = os.getenv('AIN_TABULAR_BUNDLE_PATH', 'tabular_model_bundle.joblib')
+BUNDLE_FORMAT_VERSION = 1
+# mmap_mode used to open the bundle; 'r' lets worker processes share the compiled tree arrays
+BUNDLE_MMAP_MODE = os.getenv('AIN_TABULAR_BUNDLE_MMAP', 'r') or None
 
 def get_scalar_value(value, default=None):
     """Helper function to extract scalar value from Series or return the value as-is."""
@@ -83,6 +98,36 @@ def get_scalar_value(value, default=None):
 # These will be populated upon training or loading
 _model: Union[GradientBoostingRegressor, None] = None
 _encoders: Dict[str, LabelEncoder] = {}
+_feature_spec: Dict[str, Any] = {}
+_compiled_model: Optional[CompiledTreeEnsemble] = None
+_load_stats: Dict[str, Any] = {}
+_model_version: Optional[str] = None
+
+# Feature layout of the enhanced model (categoricals are label-encoded first)
+CATEGORICAL_COLUMNS = [
+    'make', 'model', 'condition', 'trim_level', 'body_style',
+    'drive_type', 'fuel_type', 'transmission', 'title_type', 'market_saturation'
+]
+
+NUMERIC_COLUMNS = [
+    'year', 'mileage', 'zipcode', 'exterior_damage_count', 'interior_wear_count',
+    'mechanical_issues_count', 'accident_count', 'number_of_owners',
+    'listing_velocity_days', 'time_on_market', 'premium_features_count',
+    'epa_mpg_combined', 'factory_warranty_months', 'video_ai_condition_score',
+    'data_confidence_score', 'vehicle_age', 'age_mileage_ratio',
+    'composite_condition_score'
+]
+
+BOOLEAN_COLUMNS = [
+    'service_history_available', 'has_video_analysis', 'video_verified',
+    'certified_pre_owned', 'popular_color', 'is_electric'
+]
+
+FEATURE_COLUMNS = CATEGORICAL_COLUMNS + NUMERIC_COLUMNS + BOOLEAN_COLUMNS
+TARGET_COLUMN = "price"
+# Bump whenever feature engineering or encoding changes so cached features are not reused
+FEATURE_CODE_VERSION = "2"
+FEATURE_CACHE_ENABLED = os.getenv('AIN_FEATURE_CACHE', '1') != '0'
 
 def extract_value_from_field(field_data: Union[Dict[str, Any], Any]) -> Any:
     """
@@ -267,7 +312,220 @@ def engineer_comprehensive_features(vehicle_data: Dict[str, Any]) -> Dict[str, A
     features_df = pd.DataFrame([features])
     return features_df
 
-def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True) -> None:
+# Premium options counted into 'premium_features_count'
+PREMIUM_FEATURES = [
+    'sunroof_moonroof', 'navigation_system', 'heated_ventilated_seats',
+    'premium_audio_system', 'advanced_safety_systems', 'leather_seats'
+]
+
+def _column_or_default(df: pd.DataFrame, column: str, default: Any) -> pd.Series:
+    """Return ``df[column]`` or a column filled with ``default`` when it is absent."""
+    if column in df.columns:
+        return df[column]
+    if isinstance(default, (list, dict)):
+        return pd.Series([default] * len(df), index=df.index, dtype=object)
+    return pd.Series(default, index=df.index)
+
+def _extract_values(column: pd.Series) -> pd.Series:
+    """Column-wise ``extract_value_from_field``: unwrap ``{'value': ...}`` cells."""
+    if column.dtype != object:
+        return column
+    return pd.Series([extract_value_from_field(v) for v in column], index=column.index, dtype=object)
+
+def _truthy(column: pd.Series) -> pd.Series:
+    """Column-wise Python truthiness (NaN is truthy, None/0/''/[] are not)."""
+    if column.dtype == bool:
+        return column
+    if column.dtype == object:
+        return column.map(bool).astype(bool)
+    return column != 0
+
+def _list_length(column: pd.Series) -> pd.Series:
+    """Length of list cells, 0 for anything else."""
+    if column.dtype != object:
+        return pd.Series(0, index=column.index)
+    return column.map(lambda v: len(v) if isinstance(v, list) else 0).astype(np.int64)
+
+def _clean_feature_column(column: pd.Series) -> pd.Series:
+    """Column-wise version of the bool -> int / None -> 0 clean-up step."""
+    if column.dtype == bool:
+        return column.astype(np.int64)
+    if column.dtype != object:
+        return column
+    cleaned = column.map(lambda v: int(v) if isinstance(v, bool) else (0 if v is None else v))
+    return cleaned.infer_objects()
+
+def engineer_comprehensive_features_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized ``engineer_comprehensive_features`` over a whole DataFrame.
+
+    Every engineered column is built from whole input columns instead of one
+    row dict at a time, which keeps feature engineering well below model fit
+    time on large listing snapshots. Columns may hold simple values or
+    ``{'value', 'verified', 'source_origin'}`` dicts (mixed within a column is
+    fine). Values match stacking the per-row function's output row by row.
+
+    Args:
+        df: Raw vehicle data, one vehicle per row (comprehensive or simple format)
+
+    Returns:
+        DataFrame of engineered features with the same index as ``df``
+    """
+    features = {}
+
+    # 1. Extract Core Vehicle Identity
+    features['year'] = _extract_values(_column_or_default(df, 'year', 2020))
+    features['mileage'] = _extract_values(_column_or_default(df, 'mileage', 0))
+    features['make'] = _extract_values(_column_or_default(df, 'make', 'Unknown')).astype(str)
+    features['model'] = _extract_values(_column_or_default(df, 'model', 'Unknown')).astype(str)
+    features['zipcode'] = _extract_values(_column_or_default(df, 'zipcode', 0))
+
+    # Handle condition field (may be 'condition' or 'overall_condition_rating')
+    condition = _column_or_default(df, 'condition', 'Good')
+    if 'overall_condition_rating' in df.columns:
+        rating = df['overall_condition_rating']
+        condition = rating.astype(object).where(_truthy(rating), condition.astype(object))
+    features['condition'] = _extract_values(condition).astype(str)
+
+    # 2. Advanced Vehicle Attributes
+    features['trim_level'] = _extract_values(_column_or_default(df, 'trim_submodel', 'Standard')).astype(str)
+    features['body_style'] = _extract_values(_column_or_default(df, 'body_style', 'Sedan')).astype(str)
+    features['drive_type'] = _extract_values(_column_or_default(df, 'drive_type', 'FWD')).astype(str)
+    features['fuel_type'] = _extract_values(_column_or_default(df, 'fuel_type', 'Gasoline')).astype(str)
+    features['transmission'] = _extract_values(_column_or_default(df, 'transmission', 'Automatic')).astype(str)
+
+    # 3. Condition and Damage Assessment
+    features['exterior_damage_count'] = _list_length(_extract_values(_column_or_default(df, 'exterior_damage', [])))
+    features['interior_wear_count'] = _list_length(_extract_values(_column_or_default(df, 'interior_wear', [])))
+    features['mechanical_issues_count'] = _list_length(_extract_values(_column_or_default(df, 'mechanical_issues', [])))
+
+    # 4. Vehicle History Factors
+    features['accident_count'] = _list_length(_extract_values(_column_or_default(df, 'accident_history', [])))
+    features['title_type'] = _extract_values(_column_or_default(df, 'title_type', 'Clean')).astype(str)
+    features['number_of_owners'] = _extract_values(_column_or_default(df, 'number_of_owners', 1))
+    features['service_history_available'] = _extract_values(_column_or_default(df, 'service_history_available', False))
+
+    # 5. Market Context
+    features['market_saturation'] = _extract_values(_column_or_default(df, 'market_saturation_level', 'Medium')).astype(str)
+    features['listing_velocity_days'] = _extract_values(_column_or_default(df, 'listing_velocity_days', 30))
+    features['time_on_market'] = _extract_values(_column_or_default(df, 'time_on_market_days', 0))
+
+    # 6. Features and Options Score
+    features_options = _extract_values(_column_or_default(df, 'features_options', {}))
+    if features_options.dtype == object:
+        features['premium_features_count'] = features_options.map(
+            lambda opts: sum(1 for feat in PREMIUM_FEATURES if opts.get(feat, False))
+            if isinstance(opts, dict) else 0
+        ).astype(np.int64)
+    else:
+        features['premium_features_count'] = pd.Series(0, index=df.index)
+
+    # 7. Economic Factors
+    features['epa_mpg_combined'] = _extract_values(_column_or_default(df, 'epa_mpg_combined', 25))
+    features['factory_warranty_months'] = _extract_values(_column_or_default(df, 'factory_warranty_remaining_months', 0))
+    features['certified_pre_owned'] = _extract_values(_column_or_default(df, 'certified_pre_owned', False))
+
+    # 8. Video Analysis Integration (non-dict cells such as NaN count as "no video")
+    video = _column_or_default(df, 'valuation_video', {})
+    has_video = video.map(lambda v: isinstance(v, dict) and bool(v)).astype(bool)
+    features['video_ai_condition_score'] = video.map(
+        lambda v: v.get('ai_condition_score', 75) if isinstance(v, dict) and v else 75
+    ).infer_objects()
+    features['has_video_analysis'] = has_video
+    features['video_verified'] = video.map(
+        lambda v: v.get('verified', False) if isinstance(v, dict) and v else False
+    ).infer_objects()
+
+    # 9. Verification Confidence Scoring
+    key_fields = ['year', 'mileage', 'make', 'model', 'overall_condition_rating', 'zipcode']
+    confidence_total = pd.Series(0.0, index=df.index)
+    confidence_count = pd.Series(0, index=df.index)
+
+    for field in key_fields:
+        alternate = field.replace('overall_condition_rating', 'condition')
+        field_data = df[field] if field in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+        if alternate != field and alternate in df.columns:
+            field_data = field_data.astype(object).where(_truthy(field_data), df[alternate].astype(object))
+        present = _truthy(field_data)
+        if field_data.dtype == object:
+            confidence = field_data.map(get_verification_confidence).astype(float)
+        else:
+            confidence = pd.Series(0.60, index=df.index)
+        confidence_total = confidence_total + confidence.where(present, 0.0)
+        confidence_count = confidence_count + present.astype(np.int64)
+
+    features['data_confidence_score'] = (confidence_total / confidence_count.where(confidence_count > 0, 1)).where(
+        confidence_count > 0, 0.60
+    )
+
+    # 10. Age and Depreciation Factors
+    current_year = 2025  # Update as needed
+    vehicle_age = current_year - features['year']
+    features['vehicle_age'] = vehicle_age
+    features['age_mileage_ratio'] = features['mileage'] / np.maximum(vehicle_age, 1)  # Miles per year
+
+    # 11. Condition Score Integration (combine traditional + AI)
+    condition_mapping = {'Excellent': 95, 'Good': 80, 'Fair': 65, 'Poor': 40}
+    traditional_condition_score = features['condition'].map(condition_mapping).fillna(75).astype(np.int64)
+    video_weighted = has_video & _truthy(features['video_verified'])
+
+    if video_weighted.any():
+        # Weighted average favoring video analysis when available and verified
+        blended = traditional_condition_score * 0.3 + features['video_ai_condition_score'] * 0.7
+        features['composite_condition_score'] = traditional_condition_score.astype(float).where(~video_weighted, blended)
+    else:
+        features['composite_condition_score'] = traditional_condition_score
+
+    # 12. Market Premium/Discount Factors
+    exterior_color = _extract_values(_column_or_default(df, 'exterior_color', 'White')).astype(str)
+    features['popular_color'] = exterior_color.isin(['White', 'Black', 'Gray', 'Silver'])
+    features['is_electric'] = features['fuel_type'] == 'Electric'
+
+    # Clean up and ensure numeric types
+    return pd.DataFrame({key: _clean_feature_column(value) for key, value in features.items()}, index=df.index)
+
+def _feature_columns(use_enhanced_features: bool) -> Tuple[List[str], List[str]]:
+    """Categorical and model feature columns for the enhanced or legacy feature set."""
+    if use_enhanced_features:
+        return CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+    categorical_columns = ["make", "model", "condition"]
+    return categorical_columns, ["year", "mileage"] + categorical_columns + ["zipcode"]
+
+def _training_features(df: pd.DataFrame, use_enhanced_features: bool) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    """
+    Engineer the training feature frame and pick the categorical and model feature columns.
+
+    Returns:
+        Tuple[pd.DataFrame, List[str], List[str]]: Unencoded features (missing
+        columns filled with defaults), categorical columns and feature columns.
+
+    Raises:
+        KeyError: If the target column is missing.
+    """
+    categorical_columns, feature_columns = _feature_columns(use_enhanced_features)
+    if use_enhanced_features:
+        # Use comprehensive feature engineering (columnar, one pass over the frame)
+        features_df = engineer_comprehensive_features_frame(df).reset_index(drop=True)
+    else:
+        # Legacy simple feature set
+        features_df = df.copy()
+    
+    # Validate target column
+    if TARGET_COLUMN not in df.columns:
+        raise KeyError(f"Required target column '{TARGET_COLUMN}' not found in training dataframe.")
+    
+    # Ensure all feature columns exist, fill missing with defaults
+    for col in feature_columns:
+        if col not in features_df.columns:
+            if col in categorical_columns:
+                features_df[col] = 'Unknown'
+            else:
+                features_df[col] = 0
+
+    return features_df, categorical_columns, feature_columns
+
+def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True,
+                use_feature_cache: bool = FEATURE_CACHE_ENABLED) -> None:
     """
     Train the enhanced vehicle valuation model on the provided dataset.
     
@@ -281,6 +539,9 @@ def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True) ->
             and comprehensive format with nested verification data.
         use_enhanced_features (bool): Whether to use advanced feature engineering.
             If False, falls back to legacy simple feature set.
+        use_feature_cache (bool): Load the encoded feature matrix and encoders
+            from the content-addressed feature cache when this exact data was
+            engineered before, and store them otherwise.
     
     Returns:
         None: Function populates global `_model` and `_encoders` variables.
@@ -289,7 +550,7 @@ def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True) ->
         KeyError: If required columns are missing from the dataframe.
         ValueError: If the dataframe is empty or contains invalid data types.
     """
-    global _model, _encoders
+    global _model, _encoders, _feature_spec, _model_version
 
     if dataframe.empty or len(dataframe) < MIN_TRAIN_ROWS:
         raise ValueError(f"Training data must have at least {MIN_TRAIN_ROWS} rows. Refusing to train on toy data.")
@@ -308,87 +569,66 @@ def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True) ->
         validation_fraction=0.1, # Use for early stopping
         n_iter_no_change=20     # Early stopping patience
     )
-    _encoders = {}  # Reset encoders for fresh training
+    # Fresh encoders, published only once complete (readers on other threads must never see a partial dict)
+    encoders: Dict[str, LabelEncoder] = {}
+    categorical_columns, feature_columns = _feature_columns(use_enhanced_features)
 
-    if use_enhanced_features:
-        # Use comprehensive feature engineering
-        enhanced_features_list = []
-        
-        for idx, row in df.iterrows():
-            vehicle_dict = row.to_dict()
-            enhanced_features_df = engineer_comprehensive_features(vehicle_dict)
-            enhanced_features_list.append(enhanced_features_df.iloc[0].to_dict())
-        
-        # Convert to DataFrame
-        features_df = pd.DataFrame(enhanced_features_list)
-        
-        # Define feature columns for enhanced model
-        categorical_columns = [
-            'make', 'model', 'condition', 'trim_level', 'body_style', 
-            'drive_type', 'fuel_type', 'transmission', 'title_type', 'market_saturation'
-        ]
-        
-        numeric_columns = [
-            'year', 'mileage', 'zipcode', 'exterior_damage_count', 'interior_wear_count',
-            'mechanical_issues_count', 'accident_count', 'number_of_owners', 
-            'listing_velocity_days', 'time_on_market', 'premium_features_count',
-            'epa_mpg_combined', 'factory_warranty_months', 'video_ai_condition_score',
-            'data_confidence_score', 'vehicle_age', 'age_mileage_ratio',
-            'composite_condition_score'
-        ]
-        
-        boolean_columns = [
-            'service_history_available', 'has_video_analysis', 'video_verified',
-            'certified_pre_owned', 'popular_color', 'is_electric'
-        ]
-        
-        feature_columns = categorical_columns + numeric_columns + boolean_columns
-        
+    # Reuse engineered, encoded features from an earlier run over identical data
+    cache = FeatureCache() if use_feature_cache else None
+    cache_key = None
+    cached = None
+    if cache is not None:
+        cache_key = cache.key(hash_frame(df), FEATURE_CODE_VERSION, use_enhanced_features,
+                              categorical_columns, feature_columns)
+        cached = cache.load(cache_key)
+
+    if cached is not None:
+        print(f"Loaded engineered features from cache ({cache_key[:12]})")
+        X = cached['frame']
+        for col in categorical_columns:
+            le = LabelEncoder()
+            le.classes_ = cached['arrays'][f'classes_{col}'].astype(object)
+            encoders[col] = le
     else:
-        # Legacy simple feature set
-        features_df = df.copy()
-        categorical_columns = ["make", "model", "condition"]
-        feature_columns = ["year", "mileage"] + categorical_columns + ["zipcode"]
-    
-    # Validate target column
-    target_column = "price"
-    if target_column not in df.columns:
-        raise KeyError(f"Required target column '{target_column}' not found in training dataframe.")
-    
-    # Ensure all feature columns exist, fill missing with defaults
-    for col in feature_columns:
-        if col not in features_df.columns:
-            if col in categorical_columns:
-                features_df[col] = 'Unknown'
-            else:
-                features_df[col] = 0
-    
-    # Encode categorical features using LabelEncoder with unknown handling
-    for col in categorical_columns:
-        le = LabelEncoder()
-        
-        # Add 'Unknown' category to handle unseen values during prediction
-        unique_values = features_df[col].astype(str).unique().tolist()
-        if 'Unknown' not in unique_values:
-            unique_values.append('Unknown')
-        
-        # Fit encoder on all possible values including 'Unknown'
-        le.fit(unique_values)
-        
-        # Transform the actual data
-        features_df[col] = le.transform(features_df[col].astype(str))
-        _encoders[col] = le  # Save encoder for use in prediction
+        features_df, _, _ = _training_features(df, use_enhanced_features)
+
+        # Encode categorical features using LabelEncoder with unknown handling
+        for col in categorical_columns:
+            le = LabelEncoder()
+            
+            # Add 'Unknown' category to handle unseen values during prediction
+            unique_values = features_df[col].astype(str).unique().tolist()
+            if 'Unknown' not in unique_values:
+                unique_values.append('Unknown')
+            
+            # Fit encoder on all possible values including 'Unknown'
+            le.fit(unique_values)
+            
+            # Transform the actual data
+            features_df[col] = le.transform(features_df[col].astype(str))
+            encoders[col] = le  # Save encoder for use in prediction
+
+        # Prepare feature matrix, handling any remaining NaN values
+        X = features_df[feature_columns].fillna(0)
 
-    # Prepare feature matrix and target vector
-    X = features_df[feature_columns]
-    y = df[target_column]
+        if cache is not None:
+            cache.store(cache_key, frame=X,
+                        arrays={f'classes_{col}': le.classes_.astype(str) for col, le in encoders.items()})
+
+    _encoders = encoders
+    _feature_spec = {
+        'enhanced_features': use_enhanced_features,
+        'categorical_columns': list(categorical_columns),
+        'feature_columns': list(feature_columns),
+    }
+
+    y = df[TARGET_COLUMN]
     
-    # Handle any remaining NaN values
-    X = X.fillna(0)
     
     # Train the model
     print(f"Training model with {len(feature_columns)} features on {len(X)} samples...")
     _model.fit(X, y)
+    _model_version = uuid.uuid4().hex
     
     # Calculate and display training metrics
     train_score = _model.score(X, y)
@@ -409,196 +649,237 @@ def train_model(dataframe: pd.DataFrame, use_enhanced_features: bool = True) ->
     print(f"Categorical features: {len(categorical_columns)}")
     print(f"Total features: {len(feature_columns)}")
 
-def predict_price_comprehensive(vehicle_data: Dict[str, Any], 
-                               model_instance: GradientBoostingRegressor = None, 
-                               encoders_instance: Dict[str, LabelEncoder] = None) -> Dict[str, Any]:
+def _vocabulary_changes(features_df: pd.DataFrame, encoders_instance: Dict[str, LabelEncoder],
+                        categorical_columns: List[str]) -> Dict[str, List[str]]:
+    """Categorical values in ``features_df`` that the fitted encoders have never seen, per column."""
+    changes = {}
+    for col in categorical_columns:
+        le = encoders_instance.get(col)
+        values = pd.unique(features_df[col].astype(str))
+        unseen = sorted(set(values) - set(le.classes_)) if le is not None else sorted(values)
+        if unseen:
+            changes[col] = unseen
+    return changes
+
+def train_model_incremental(new_data: pd.DataFrame,
+                            full_data: Optional[pd.DataFrame] = None,
+                            n_new_estimators: int = INCREMENTAL_ESTIMATORS,
+                            holdout_fraction: float = INCREMENTAL_HOLDOUT_FRACTION,
+                            mae_tolerance: float = 0.0) -> Dict[str, Any]:
     """
-    Predict vehicle price using comprehensive vehicle data format.
-    
-    This function accepts the full VehicleDataForValuation interface and returns
-    a detailed prediction with confidence metrics and feature contributions.
-    
+    Extend the previous model with new boosting stages fitted on a slice of new listings.
+
+    The previous artifact (the global model, or the saved bundle if none is
+    loaded) is copied and grown with ``warm_start`` by ``n_new_estimators``
+    stages fitted on ``new_data`` minus a held-out share. The extended model
+    replaces the global one only if its MAE on the held-out rows is no worse
+    than the previous model's (within ``mae_tolerance``, a relative margin);
+    otherwise the previous model is kept. An accepted model (incremental or
+    full) gets a fresh compiled predictor and is saved to BUNDLE_PATH, so
+    workers that reload the bundle serve it.
+
+    Boosting on top of frozen encoders cannot learn new categories, so when
+    the slice contains makes, models, etc. the encoders have never seen, or the
+    previous model used the legacy feature set, this falls back to a full
+    ``train_model(full_data)``.
+
     Args:
-        vehicle_data (Dict[str, Any]): Comprehensive vehicle data dictionary
-        model_instance: Optional pre-loaded model (uses global if None)
-        encoders_instance: Optional pre-loaded encoders (uses global if None)
-    
+        new_data (pd.DataFrame): Newly arrived listings, same format as for train_model.
+        full_data (Optional[pd.DataFrame]): Complete training set used for the
+            full-retrain fallback.
+        n_new_estimators (int): Boosting stages to add.
+        holdout_fraction (float): Share of ``new_data`` held out for the MAE gate.
+        mae_tolerance (float): Allowed relative MAE increase (0.01 accepts up to 1% worse).
+
     Returns:
-        Dict containing:
-            - predicted_price: Main price prediction
-            - confidence_score: Prediction confidence (0-1)
-            - data_quality_score: Input data quality assessment
-            - key_factors: Main factors influencing the prediction
-            - feature_values: Processed feature values used
+        Dict[str, Any]: Report with ``mode`` ('incremental', 'rejected' or
+        'full'), ``reason``, ``previous_mae``, ``candidate_mae`` and
+        ``n_estimators`` of the model now in use.
+
+    Raises:
+        ValueError: If ``new_data`` is too small, or a full retrain is needed
+            and ``full_data`` was not given.
     """
-    # Use global model/encoders if not provided
-    if model_instance is None:
-        model_instance = _model
-    if encoders_instance is None:
-        encoders_instance = _encoders
-        
-    if model_instance is None or not encoders_instance:
-        raise RuntimeError("Model not trained. Call train_model() first or load model artifacts.")
-    
-    # Engineer comprehensive features
-    features = engineer_comprehensive_features(vehicle_data)
-    
-    # Get model's expected feature columns
-    # Reconstruct from training (this should match training feature set)
-    categorical_columns = [
-        'make', 'model', 'condition', 'trim_level', 'body_style', 
-        'drive_type', 'fuel_type', 'transmission', 'title_type', 'market_saturation'
-    ]
-    
-    numeric_columns = [
-        'year', 'mileage', 'zipcode', 'exterior_damage_count', 'interior_wear_count',
-        'mechanical_issues_count', 'accident_count', 'number_of_owners', 
-        'listing_velocity_days', 'time_on_market', 'premium_features_count',
-        'epa_mpg_combined', 'factory_warranty_months', 'video_ai_condition_score',
-        'data_confidence_score', 'vehicle_age', 'age_mileage_ratio',
-        'composite_condition_score'
-    ]
-    
-    boolean_columns = [
-        'service_history_available', 'has_video_analysis', 'video_verified',
-        'certified_pre_owned', 'popular_color', 'is_electric'
-    ]
-    
-    feature_columns = categorical_columns + numeric_columns + boolean_columns
-    
-    # Prepare feature vector
-    feature_vector = []
-    processed_features = {}
-    
-    # Process categorical features
+    global _model, _model_version, _compiled_model
+
+    if _model is None or not _encoders:
+        load_model_artifacts()
+
+    def full_retrain(reason: str) -> Dict[str, Any]:
+        if full_data is None:
+            raise ValueError(f"Full retrain required ({reason}) but no full_data was provided.")
+        print(f"Incremental retrain not possible: {reason}. Running full retrain...")
+        train_model(full_data, use_enhanced_features=True)
+        save_model_artifacts()
+        return {'mode': 'full', 'reason': reason, 'previous_mae': None, 'candidate_mae': None,
+                'n_estimators': _model.estimators_.shape[0]}
+
+    if not _feature_spec.get('enhanced_features', True):
+        return full_retrain("previous model uses the legacy feature set")
+    if len(new_data) < MIN_INCREMENTAL_ROWS:
+        raise ValueError(f"Incremental data must have at least {MIN_INCREMENTAL_ROWS} rows.")
+
+    features_df, categorical_columns, feature_columns = _training_features(new_data.copy(), True)
+    changes = _vocabulary_changes(features_df, _encoders, categorical_columns)
+    if changes:
+        return full_retrain(f"categorical vocabulary changed in {', '.join(sorted(changes))}")
+
+    tables = get_encoding_tables(_encoders)
     for col in categorical_columns:
-        value = str(features.get(col, 'Unknown'))
-        le = encoders_instance.get(col)
-        
-        if le is not None:
-            if value in le.classes_:
-                encoded_value = le.transform([value])[0]
-            else:
-                # Use 'Unknown' encoding if available, otherwise use 0
-                if 'Unknown' in le.classes_:
-                    encoded_value = le.transform(['Unknown'])[0]
-                else:
-                    encoded_value = 0
-            feature_vector.append(encoded_value)
-            processed_features[col] = {'original': value, 'encoded': encoded_value}
-        else:
-            feature_vector.append(0)
-            processed_features[col] = {'original': value, 'encoded': 0}
-    
-    # Process numeric and boolean features
-    for col in numeric_columns + boolean_columns:
-        value = features.get(col, 0)
-        feature_vector.append(float(value))
-        processed_features[col] = value
-    
-    # Make prediction
-    predicted_price = float(model_instance.predict([feature_vector])[0])
-    
+        features_df[col] = tables[col].encode_column(features_df[col].astype(str).to_numpy())
+    X = features_df[feature_columns].fillna(0)
+    y = new_data[TARGET_COLUMN].reset_index(drop=True)
+
+    rng = np.random.default_rng(42)
+    is_holdout = rng.random(len(X)) < holdout_fraction
+    X_fit, y_fit = X[~is_holdout], y[~is_holdout]
+    X_holdout, y_holdout = X[is_holdout], y[is_holdout]
+
+    candidate = copy.deepcopy(_model)
+    candidate.set_params(warm_start=True,
+                         n_estimators=candidate.estimators_.shape[0] + n_new_estimators)
+    print(f"Extending model from {candidate.estimators_.shape[0]} to {candidate.n_estimators} "
+          f"estimators on {len(X_fit)} new samples...")
+    candidate.fit(X_fit, y_fit)
+    candidate.set_params(warm_start=False)
+
+    previous_mae = float(np.mean(np.abs(_model.predict(X_holdout) - y_holdout)))
+    candidate_mae = float(np.mean(np.abs(candidate.predict(X_holdout) - y_holdout)))
+    print(f"Held-out MAE: previous {previous_mae:,.2f}, candidate {candidate_mae:,.2f}")
+
+    if candidate_mae > previous_mae * (1 + mae_tolerance):
+        return {'mode': 'rejected', 'reason': 'held-out MAE regressed', 'previous_mae': previous_mae,
+                'candidate_mae': candidate_mae, 'n_estimators': _model.estimators_.shape[0]}
+
+    _model = candidate
+    _model_version = uuid.uuid4().hex
+    _compiled_model = compile_model(candidate)
+    save_model_artifacts()
+    return {'mode': 'incremental', 'reason': None, 'previous_mae': previous_mae,
+            'candidate_mae': candidate_mae, 'n_estimators': candidate.estimators_.shape[0]}
+
+class CategoryTable:
+    """
+    Plain-dict label lookup compiled from a fitted LabelEncoder.
+
+    ``encode`` gives the same code as ``le.transform([value])[0]`` for known
+    values. Unseen values map to ``unknown_code`` (the 'Unknown' class when the
+    encoder has one, else 0) unless the caller passes its own ``default``.
+    """
+
+    __slots__ = ('codes', 'unknown_code')
+
+    def __init__(self, classes: Any):
+        self.codes: Dict[str, int] = {str(label): code for code, label in enumerate(classes)}
+        self.unknown_code: int = self.codes.get('Unknown', 0)
+
+    def encode(self, value: str, default: Optional[int] = None) -> int:
+        """Encode one value."""
+        return self.codes.get(value, self.unknown_code if default is None else default)
+
+    def encode_column(self, values: Any, default: Optional[int] = None) -> np.ndarray:
+        """Encode a whole column; only distinct values go through the dict."""
+        inverse, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        fallback = self.unknown_code if default is None else default
+        lookup = np.fromiter((self.codes.get(u, fallback) for u in uniques), dtype=np.int64, count=len(uniques))
+        return lookup[inverse]
+
+# Tables for the last encoders dict seen by get_encoding_tables: (encoders, tables)
+_encoding_tables_cache: Tuple[Optional[Dict[str, LabelEncoder]], Dict[str, CategoryTable]] = (None, {})
+
+def build_encoding_tables(encoders_instance: Dict[str, LabelEncoder]) -> Dict[str, CategoryTable]:
+    """Compile a CategoryTable for every fitted encoder."""
+    return {col: CategoryTable(le.classes_) for col, le in encoders_instance.items() if le is not None}
+
+def get_encoding_tables(encoders_instance: Dict[str, LabelEncoder]) -> Dict[str, CategoryTable]:
+    """
+    Return (cached) encoding tables for an encoders dict.
+
+    Tables are rebuilt only when a different encoders dict is passed in, so a
+    serving process compiles them once per loaded artifact.
+    """
+    global _encoding_tables_cache
+
+    cached_encoders, tables = _encoding_tables_cache
+    if cached_encoders is not encoders_instance:
+        tables = build_encoding_tables(encoders_instance)
+        _encoding_tables_cache = (encoders_instance, tables)
+    return tables
+
+def _encode_category_column(values: np.ndarray, table: Optional[CategoryTable]) -> np.ndarray:
+    """Encode a column of string values, 0 when the column has no encoder."""
+    if table is None:
+        return np.zeros(len(values), dtype=np.int64)
+    return table.encode_column(values)
+
+def _prediction_result(features: Dict[str, Any], predicted_price: float,
+                       encoded: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Build the predict_price_comprehensive result for one vehicle.
+
+    Args:
+        features: Engineered feature values for the vehicle (scalars)
+        predicted_price: Model output for the vehicle
+        encoded: Label-encoded value for each categorical column
+
+    Returns:
+        Prediction result dictionary (see predict_price_comprehensive)
+    """
+    processed_features = {}
+    for col in CATEGORICAL_COLUMNS:
+        processed_features[col] = {'original': str(features.get(col, 'Unknown')), 'encoded': encoded[col]}
+    for col in NUMERIC_COLUMNS + BOOLEAN_COLUMNS:
+        processed_features[col] = features.get(col, 0)
+
     # Calculate confidence score based on data quality and model certainty
-    data_confidence_val = features.get('data_confidence_score', 0.6)
-    if hasattr(data_confidence_val, 'iloc'):
-        data_confidence = float(data_confidence_val.iloc[0])
-    else:
-        data_confidence = float(data_confidence_val)
-    
+    data_confidence = float(features.get('data_confidence_score', 0.6))
+
     # Video analysis boosts confidence if available and verified
     video_confidence_boost = 0.0
-    has_video = features.get('has_video_analysis', False)
-    video_verified = features.get('video_verified', False)
-    
-    # Handle Series/scalar values
-    if hasattr(has_video, 'iloc'):
-        has_video = bool(has_video.iloc[0])
-    if hasattr(video_verified, 'iloc'):
-        video_verified = bool(video_verified.iloc[0])
-    
-    if has_video and video_verified:
-        video_score_val = features.get('video_ai_condition_score', 75)
-        if hasattr(video_score_val, 'iloc'):
-            video_score = float(video_score_val.iloc[0])
-        else:
-            video_score = float(video_score_val)
+    has_video = bool(features.get('has_video_analysis', False))
+    if has_video and features.get('video_verified', False):
+        video_score = float(features.get('video_ai_condition_score', 75))
         video_confidence_boost = 0.1 * (video_score / 100)  # Up to 10% boost
-    
+
     confidence_score = min(0.95, data_confidence + video_confidence_boost)
-    
+
     # Identify key factors affecting price
     key_factors = []
-    
+
     # High value factors
-    composite_condition_val = features.get('composite_condition_score', 75)
-    if hasattr(composite_condition_val, 'iloc'):
-        composite_condition = float(composite_condition_val.iloc[0])
-    else:
-        composite_condition = float(composite_condition_val)
-        
-    if composite_condition > 90:
-        has_video_check = features.get('has_video_analysis', False)
-        if hasattr(has_video_check, 'iloc'):
-            has_video_check = bool(has_video_check.iloc[0])
-        key_factors.append("Excellent condition (AI verified)" if has_video_check else "Excellent condition")
-    
-    vehicle_age_val = features.get('vehicle_age', 5)
-    if hasattr(vehicle_age_val, 'iloc'):
-        vehicle_age = float(vehicle_age_val.iloc[0])
-    else:
-        vehicle_age = float(vehicle_age_val)
-    if vehicle_age < 3:
+    if float(features.get('composite_condition_score', 75)) > 90:
+        key_factors.append("Excellent condition (AI verified)" if has_video else "Excellent condition")
+    if float(features.get('vehicle_age', 5)) < 3:
         key_factors.append("Low vehicle age")
-        
-    age_mileage_ratio_val = features.get('age_mileage_ratio', 12000)
-    if hasattr(age_mileage_ratio_val, 'iloc'):
-        age_mileage_ratio = float(age_mileage_ratio_val.iloc[0])
-    else:
-        age_mileage_ratio = float(age_mileage_ratio_val)
-    if age_mileage_ratio < 8000:
+    if float(features.get('age_mileage_ratio', 12000)) < 8000:
         key_factors.append("Low mileage for age")
-    
-    premium_features_val = features.get('premium_features_count', 0)
-    if hasattr(premium_features_val, 'iloc'):
-        premium_features_count = float(premium_features_val.iloc[0])
-    else:
-        premium_features_count = float(premium_features_val)
-    if premium_features_count > 3:
+    if float(features.get('premium_features_count', 0)) > 3:
         key_factors.append("Multiple premium features")
-    
-    is_electric_val = features.get('is_electric', False)
-    if hasattr(is_electric_val, 'iloc'):
-        is_electric = bool(is_electric_val.iloc[0])
-    else:
-        is_electric = bool(is_electric_val)
-    if is_electric:
+    if features.get('is_electric', False):
         key_factors.append("Electric vehicle premium")
-    
+
     # Negative factors
-    accident_count = get_scalar_value(features.get('accident_count', 0), 0)
+    accident_count = features.get('accident_count', 0)
     if accident_count > 0:
         key_factors.append(f"Accident history ({accident_count} incidents)")
-    
-    mechanical_issues_count = get_scalar_value(features.get('mechanical_issues_count', 0), 0)
+
+    mechanical_issues_count = features.get('mechanical_issues_count', 0)
     if mechanical_issues_count > 0:
         key_factors.append(f"Mechanical issues ({mechanical_issues_count} reported)")
-    
-    title_type = get_scalar_value(features.get('title_type', 'Clean'), 'Clean')
+
+    title_type = features.get('title_type', 'Clean')
     if title_type != 'Clean':
         key_factors.append(f"Title issue: {title_type}")
-    
+
     # Data quality assessment
     data_quality_factors = []
     if data_confidence > 0.85:
         data_quality_factors.append("High data verification")
-    has_video_analysis = get_scalar_value(features.get('has_video_analysis', False), False)
-    if has_video_analysis:
+    if has_video:
         data_quality_factors.append("AI video analysis available")
-    service_history_available = get_scalar_value(features.get('service_history_available', False), False)
-    if service_history_available:
+    if features.get('service_history_available', False):
         data_quality_factors.append("Service history documented")
-    
+
     return {
         'predicted_price': predicted_price,
         'confidence_score': confidence_score,
@@ -610,6 +891,134 @@ def predict_price_comprehensive(vehicle_data: Dict[str, Any],
         'composite_condition_score': features.get('composite_condition_score', 75)
     }
 
+def predict_price_comprehensive(vehicle_data: Dict[str, Any], 
+                               model_instance: GradientBoostingRegressor = None, 
+                               encoders_instance: Dict[str, LabelEncoder] = None) -> Dict[str, Any]:
+    """
+    Predict vehicle price using comprehensive vehicle data format.
+    
+    This function accepts the full VehicleDataForValuation interface and returns
+    a detailed prediction with confidence metrics and feature contributions.
+    For many vehicles at once use predict_price_comprehensive_batch.
+    
+    Args:
+        vehicle_data (Dict[str, Any]): Comprehensive vehicle data dictionary
+        model_instance: Optional pre-loaded model (uses global if None)
+        encoders_instance: Optional pre-loaded encoders (uses global if None)
+    
+    Returns:
+        Dict containing:
+            - predicted_price: Main price prediction
+            - confidence_score: Prediction confidence (0-1)
+            - data_quality_score: Input data quality assessment
+            - key_factors: Main factors influencing the prediction
+            - feature_values: Processed feature values used
+    """
+    # Use global model/encoders if not provided
+    if model_instance is None:
+        model_instance = _model
+    if encoders_instance is None:
+        encoders_instance = _encoders
+        
+    if model_instance is None or not encoders_instance:
+        raise RuntimeError("Model not trained. Call train_model() first or load model artifacts.")
+    
+    # Engineer comprehensive features (single-row frame -> plain scalars)
+    features = engineer_comprehensive_features(vehicle_data).iloc[0].to_dict()
+    
+    # Prepare feature vector: encoded categoricals, then numeric and boolean features
+    tables = get_encoding_tables(encoders_instance)
+    encoded = {
+        col: tables[col].encode(str(features.get(col, 'Unknown'))) if col in tables else 0
+        for col in CATEGORICAL_COLUMNS
+    }
+    feature_vector = [encoded[col] for col in CATEGORICAL_COLUMNS]
+    feature_vector += [float(features.get(col, 0)) for col in NUMERIC_COLUMNS + BOOLEAN_COLUMNS]
+    
+    # Make prediction
+    predicted_price = float(model_instance.predict([feature_vector])[0])
+    
+    return _prediction_result(features, predicted_price, encoded)
+
+def _engineer_records(vehicles: List[Dict[str, Any]]) -> List[pd.DataFrame]:
+    """
+    Engineer features for a list of vehicle dicts, one frame per key layout.
+
+    Vehicles are grouped by the set of fields they provide so that a missing
+    field picks up the same default as the per-vehicle path instead of NaN.
+    Cells are kept as Python objects (no None -> NaN coercion). Each frame is
+    indexed by the vehicles' positions in ``vehicles``.
+    """
+    groups: Dict[frozenset, List[int]] = {}
+    for position, vehicle in enumerate(vehicles):
+        groups.setdefault(frozenset(vehicle), []).append(position)
+
+    frames = []
+    for keys, positions in groups.items():
+        raw = pd.DataFrame(
+            {key: pd.Series([vehicles[p][key] for p in positions], index=positions, dtype=object) for key in keys},
+            index=positions
+        )
+        frames.append(engineer_comprehensive_features_frame(raw))
+    return frames
+
+def predict_price_comprehensive_batch(vehicles: List[Dict[str, Any]],
+                                      model_instance: GradientBoostingRegressor = None,
+                                      encoders_instance: Dict[str, LabelEncoder] = None) -> List[Dict[str, Any]]:
+    """
+    Predict prices for many vehicles with a single model call.
+
+    Features are engineered column-wise, categoricals are encoded per column
+    and the whole feature matrix goes through one ``predict`` call. Each result
+    has the same fields and values as predict_price_comprehensive for that
+    vehicle.
+
+    Args:
+        vehicles (List[Dict[str, Any]]): Vehicle data dictionaries (comprehensive or simple format)
+        model_instance: Optional pre-loaded model (uses global if None)
+        encoders_instance: Optional pre-loaded encoders (uses global if None)
+
+    Returns:
+        List of prediction result dicts, in the same order as ``vehicles``
+    """
+    if model_instance is None:
+        model_instance = _model
+    if encoders_instance is None:
+        encoders_instance = _encoders
+
+    if model_instance is None or not encoders_instance:
+        raise RuntimeError("Model not trained. Call train_model() first or load model artifacts.")
+
+    if not vehicles:
+        return []
+
+    tables = get_encoding_tables(encoders_instance)
+    positions = []
+    feature_rows = []
+    encoded_rows = []
+    matrices = []
+    for features_df in _engineer_records(vehicles):
+        encoded_columns = {
+            col: _encode_category_column(features_df[col].to_numpy(), tables.get(col))
+            for col in CATEGORICAL_COLUMNS
+        }
+        numeric = features_df[NUMERIC_COLUMNS + BOOLEAN_COLUMNS].to_numpy(dtype=np.float64)
+        matrices.append(np.column_stack([encoded_columns[col] for col in CATEGORICAL_COLUMNS] + [numeric]))
+
+        positions.extend(features_df.index)
+        feature_rows.extend(features_df.to_dict('records'))
+        encoded_rows.extend(
+            dict(zip(CATEGORICAL_COLUMNS, codes))
+            for codes in zip(*(encoded_columns[col].tolist() for col in CATEGORICAL_COLUMNS))
+        )
+
+    predictions = model_instance.predict(np.vstack(matrices))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(vehicles)
+    for position, features, encoded, predicted_price in zip(positions, feature_rows, encoded_rows, predictions.tolist()):
+        results[position] = _prediction_result(features, predicted_price, encoded)
+    return results
+
 def predict_price(input_df: pd.DataFrame, model_instance: GradientBoostingRegressor, encoders_instance: Dict[str, LabelEncoder]) -> float:
     """
     Legacy predict function for backward compatibility.
@@ -619,7 +1028,7 @@ def predict_price(input_df: pd.DataFrame, model_instance: GradientBoostingRegres
     
     Args:
         input_df (pd.DataFrame): Single-row DataFrame containing vehicle features
-        model_instance (GradientBoostingRegressor): The pre-trained model
+        model_instance (GradientBoostingRegressor): The pre-trained model (or its CompiledTreeEnsemble)
         encoders_instance (Dict[str, LabelEncoder]): Dictionary of fitted encoders
     
     Returns:
@@ -630,7 +1039,7 @@ def predict_price(input_df: pd.DataFrame, model_instance: GradientBoostingRegres
     if len(input_df) > 1:
         print("Warning: predict_price expects a single-row DataFrame. Only the first row will be processed.")
 
-    if not isinstance(model_instance, GradientBoostingRegressor) or not isinstance(encoders_instance, dict) or not encoders_instance:
+    if not isinstance(model_instance, (GradientBoostingRegressor, CompiledTreeEnsemble)) or not isinstance(encoders_instance, dict) or not encoders_instance:
         raise RuntimeError("Invalid model or encoders provided. Ensure model is trained/loaded.")
     
     # Convert DataFrame row to dictionary and use comprehensive prediction
@@ -639,132 +1048,152 @@ def predict_price(input_df: pd.DataFrame, model_instance: GradientBoostingRegres
     # Use comprehensive prediction but return only the price for compatibility
     result = predict_price_comprehensive(vehicle_dict, model_instance, encoders_instance)
     return result['predicted_price']
-    """
-    Predict vehicle price for a single vehicle using a trained model and encoders.
-    
-    This function takes a DataFrame with vehicle characteristics and returns
-    a predicted price. The input must contain the same features used during training,
-    and categorical variables are encoded using the provided label encoders.
-    
-    Args:
-        input_df (pd.DataFrame): Single-row DataFrame containing vehicle features:
-            - year (int): Vehicle model year
-            - mileage (int/float): Vehicle mileage in miles 
-            - make (str): Vehicle manufacturer
-            - model (str): Vehicle model name
-            - condition (str): Vehicle condition
-            - zipcode (int): Location zipcode
-        model_instance (GradientBoostingRegressor): The pre-trained GradientBoostingRegressor model.
-        encoders_instance (Dict[str, LabelEncoder]): Dictionary of fitted LabelEncoders.
-    
-    Returns:
-        float: Predicted vehicle price in USD.
-    
-    Raises:
-        ValueError: If input_df is empty or has more than one row.
-        KeyError: If required columns are missing from the input_df.
-        RuntimeError: If the provided model_instance or encoders_instance are invalid.
-    """
-    if len(input_df) == 0:
-        raise ValueError("Input DataFrame cannot be empty.")
-    if len(input_df) > 1:
-        print("Warning: predict_price expects a single-row DataFrame. Only the first row will be processed.")
-
-    if not isinstance(model_instance, GradientBoostingRegressor) or not isinstance(encoders_instance, dict) or not encoders_instance:
-        raise RuntimeError("Invalid model or encoders provided. Ensure model is trained/loaded.")
-    
-    # Get the first row as a Series
-    row = input_df.iloc[0]
-    encoded_input = []
-
-    # Define features for consistent processing
-    numerical_features = ["year", "mileage"]
-    categorical_features = ["make", "model", "condition"]
-    all_features = numerical_features + categorical_features + ["zipcode"]
-
-    # Validate all required features are in the input row
-    for feature in all_features:
-        if feature not in row:
-            raise KeyError(f"Required feature '{feature}' not found in input data for prediction.")
-
-    # Add numerical features directly
-    for key in numerical_features:
-        encoded_input.append(float(row[key]))
-
-    # Encode categorical features using stored encoders
-    for col in categorical_features:
-        label = str(row[col])  # Convert to string for consistency
-        le = encoders_instance.get(col)
-        
-        if le is not None:
-            # Handle unseen categories by transforming to a default value (e.g., 0)
-            # or by using a mapping to an 'unknown' category if pre-defined during training.
-            # For LabelEncoder, if a label is not in classes_, transform will raise ValueError.
-            # A robust way is to check if label is in le.classes_
-            if label in le.classes_:
-                encoded_input.append(le.transform([label])[0])
-            else:
-                # Fallback for unseen label during prediction
-                # This assumes '0' is a safe default or was handled during training.
-                # For production, consider adding an 'unknown' category during training.
-                encoded_input.append(0) 
-        else:
-            # This case should ideally not happen if encoders_instance is complete
-            # for all categorical features used during training.
-            print(f"Warning: No LabelEncoder found for column '{col}'. Defaulting to 0.")
-            encoded_input.append(0)
 
-    # Add zipcode as integer
-    encoded_input.append(int(row["zipcode"]))
-    
-    # Make prediction and return as float
-    prediction = model_instance.predict([encoded_input])[0]
-    return float(prediction)
+def _memory_usage_mb() -> Dict[str, Optional[float]]:
+    """Current process RSS and PSS in MB (PSS splits shared pages across processes; Linux only)."""
+    usage: Dict[str, Optional[float]] = {'rss_mb': None, 'pss_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    usage[f"{key.lower()}_mb"] = int(rest.split()[0]) / 1024
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            usage['rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except (ImportError, OSError):
+            pass
+    return usage
 
 def save_model_artifacts() -> None:
     """
-    Saves the trained model and label encoders to disk using joblib.
+    Saves the trained model, its compiled tree arrays, label encoders and
+    feature spec to a single uncompressed joblib bundle at BUNDLE_PATH.
+
+    Uncompressed NumPy arrays can be memory-mapped on load, so worker
+    processes opening the same bundle share the physical pages of the
+    compiled tree arrays. The sklearn model's trees are rebuilt in private
+    memory by unpickling, so only the compiled predictor is shared.
     """
     if _model is None or not _encoders:
         raise RuntimeError("No model or encoders to save. Train the model first.")
     
-    os.makedirs(os.path.dirname(MODEL_PATH) or '.', exist_ok=True) # Ensure directory exists
-    os.makedirs(os.path.dirname(ENCODERS_PATH) or '.', exist_ok=True)
+    os.makedirs(os.path.dirname(BUNDLE_PATH) or '.', exist_ok=True) # Ensure directory exists
+
+    bundle = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model': _model,
+        'compiled_model': get_compiled_model(),
+        'encoders': _encoders,
+        'feature_spec': _feature_spec,
+        'model_version': _model_version,
+    }
+    joblib.dump(bundle, BUNDLE_PATH)
+    print(f"Model bundle saved to {BUNDLE_PATH}")
+
+def _load_bundle(mmap_mode: Optional[str]) -> Dict[str, Any]:
+    """Load the bundle, or assemble one from the legacy model/encoders files."""
+    if os.path.exists(BUNDLE_PATH):
+        bundle = joblib.load(BUNDLE_PATH, mmap_mode=mmap_mode)
+        if not isinstance(bundle, dict) or bundle.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported model bundle format at {BUNDLE_PATH}")
+        bundle['path'] = BUNDLE_PATH
+        return bundle
+
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model file not found at {MODEL_PATH}. Please train the model first.")
+    if not os.path.exists(ENCODERS_PATH):
+        raise FileNotFoundError(f"Encoders file not found at {ENCODERS_PATH}. Please train the model first.")
 
-    joblib.dump(_model, MODEL_PATH)
-    joblib.dump(_encoders, ENCODERS_PATH)
-    print(f"Model saved to {MODEL_PATH}")
-    print(f"Encoders saved to {ENCODERS_PATH}")
+    encoders = joblib.load(ENCODERS_PATH)
+    return {
+        'model': joblib.load(MODEL_PATH),
+        'encoders': encoders,
+        'feature_spec': {
+            'enhanced_features': True,
+            'categorical_columns': [col for col in CATEGORICAL_COLUMNS if col in encoders],
+            'feature_columns': FEATURE_COLUMNS,
+        },
+        'path': MODEL_PATH,
+        'model_version': f"legacy-{os.path.getmtime(MODEL_PATH):.0f}-{os.path.getsize(MODEL_PATH)}",
+    }
 
-def load_model_artifacts() -> Tuple[GradientBoostingRegressor, Dict[str, LabelEncoder]]:
+def load_model_artifacts(compiled: bool = False,
+                         mmap_mode: Optional[str] = BUNDLE_MMAP_MODE) -> Tuple[GradientBoostingRegressor, Dict[str, LabelEncoder]]:
     """
-    Loads the trained model and label encoders from disk using joblib.
+    Loads the trained model, label encoders and feature spec from disk using joblib.
+    
+    The bundle at BUNDLE_PATH is preferred and opened with ``mmap_mode`` so
+    the compiled tree arrays are shared between worker processes (serve with
+    ``compiled=True`` or get_compiled_model(); the sklearn model is always
+    unpickled into private memory). The legacy
+    MODEL_PATH/ENCODERS_PATH pair is still accepted. Load time and process
+    memory are reported and kept in get_load_stats().
+    
+    Args:
+        compiled (bool): Return the model as a CompiledTreeEnsemble for
+            low-latency single-row prediction (the fitted sklearn model stays
+            available as ``source_model``).
+        mmap_mode (Optional[str]): joblib mmap_mode for the bundle (None loads into private memory).
     
     Returns:
         Tuple[GradientBoostingRegressor, Dict[str, LabelEncoder]]: A tuple containing
         the loaded model and the dictionary of label encoders.
     
     Raises:
-        FileNotFoundError: If model or encoders files are not found.
+        FileNotFoundError: If neither a bundle nor the model and encoders files are found.
         RuntimeError: If loaded artifacts are not of the expected type.
     """
-    global _model, _encoders
+    global _model, _encoders, _feature_spec, _compiled_model, _load_stats, _model_version
 
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model file not found at {MODEL_PATH}. Please train the model first.")
-    if not os.path.exists(ENCODERS_PATH):
-        raise FileNotFoundError(f"Encoders file not found at {ENCODERS_PATH}. Please train the model first.")
+    start = time.perf_counter()
+    bundle = _load_bundle(mmap_mode)
+    model, encoders = bundle['model'], bundle['encoders']
 
-    model = joblib.load(MODEL_PATH)
-    return model, None
-    if not isinstance(_model, GradientBoostingRegressor):
-        raise RuntimeError(f"Loaded model is not of expected type GradientBoostingRegressor: {type(_model)}")
-    if not isinstance(_encoders, dict):
-        raise RuntimeError(f"Loaded encoders is not of expected type dict: {type(_encoders)}")
-    
-    print(f"Model loaded from {MODEL_PATH}")
-    print(f"Encoders loaded from {ENCODERS_PATH}")
-    return _model, _encoders
+    if not isinstance(model, GradientBoostingRegressor):
+        raise RuntimeError(f"Loaded model is not of expected type GradientBoostingRegressor: {type(model)}")
+    if not isinstance(encoders, dict):
+        raise RuntimeError(f"Loaded encoders is not of expected type dict: {type(encoders)}")
+
+    _model, _encoders, _feature_spec = model, encoders, bundle['feature_spec']
+    _model_version = bundle.get('model_version') or uuid.uuid4().hex
+    _compiled_model = bundle.get('compiled_model') or compile_model(model)
+    get_encoding_tables(_encoders)
+
+    _load_stats = {
+        'path': bundle['path'],
+        'mmap_mode': mmap_mode if 'format_version' in bundle else None,
+        'load_seconds': time.perf_counter() - start,
+        **_memory_usage_mb(),
+    }
+    rss = _load_stats['rss_mb']
+    print(f"Model artifacts loaded from {_load_stats['path']} in {_load_stats['load_seconds'] * 1000:.1f} ms"
+          + (f" (worker RSS {rss:.1f} MB)" if rss is not None else ""))
+
+    return (_compiled_model if compiled else _model), _encoders
+
+def get_compiled_model() -> Optional[CompiledTreeEnsemble]:
+    """Compiled predictor for the current global model (the bundle's memory-mapped copy when loaded)."""
+    global _compiled_model
+
+    if _model is None:
+        return None
+    if _compiled_model is None or _compiled_model.source_model is not _model:
+        _compiled_model = compile_model(_model)
+    return _compiled_model
+
+def get_model_version() -> Optional[str]:
+    """Identifier of the current model, new for every training run and persisted in the bundle."""
+    return _model_version
+
+def get_feature_spec() -> Dict[str, Any]:
+    """Feature spec (categorical and ordered feature columns) of the current model."""
+    return _feature_spec
+
+def get_load_stats() -> Dict[str, Any]:
+    """Path, mmap mode, load time and process memory recorded by the last load_model_artifacts call."""
+    return _load_stats
 
 # This block demonstrates both legacy and comprehensive model capabilities
 if __name__ == "__main__":
@@ -883,6 +1312,8 @@ if __name__ == "__main__":
             os.remove(MODEL_PATH)
         if os.path.exists(ENCODERS_PATH):
             os.remove(ENCODERS_PATH)
+        if os.path.exists(BUNDLE_PATH):
+            os.remove(BUNDLE_PATH)
         print(f"\n🧹 Cleaned up model artifacts")
     except Exception as e:
         print(f"⚠️ Cleanup warning: {e}")
@@ -0,0 +1,184 @@
+"""
+Valuation result cache keyed by a canonical hash of the request.
+
+Identical valuation requests (same VIN, mileage, zip, mode, ...) arriving
+within minutes of each other are common. ``valuation_cache_key`` reduces an
+``input_dict`` to a canonical form (sorted keys, integral floats as ints)
+and hashes it together with the model version and mode, so requests that
+differ only in key order or ``40000`` vs ``40000.0`` share a key and a
+retrained model never serves stale results. Everything else is hashed
+verbatim: the engine prices ``" Ford "`` and ``"Ford"`` differently, so
+the cache must not fold them together.
+
+``ValuationResultCache`` keeps a bounded in-process LRU with a TTL and an
+optional on-disk tier (one JSON file per key in a shared directory) that
+lets all workers on a host reuse each other's results. Hit/miss counts and
+latency by outcome are available from ``metrics()`` and, when
+prometheus_client is installed, as Prometheus metrics.
+
+Example:
+    >>> cache = ValuationResultCache(max_entries=10000, ttl_seconds=900, disk_dir='/tmp/valuations')
+    >>> key = valuation_cache_key(input_dict, 'sell', model_version)
+    >>> cache.get(key) or cache.put(key, run_uncached(input_dict))
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+RESULT_CACHE_ENABLED = os.getenv("AIN_RESULT_CACHE", "1") != "0"
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("AIN_RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("AIN_RESULT_CACHE_TTL", "900"))
+RESULT_CACHE_DIR = os.getenv("AIN_RESULT_CACHE_DIR")  # Shared on-disk tier; unset keeps the cache in-process
+
+# Prometheus metrics (optional)
+try:
+    from prometheus_client import Counter, Histogram
+    RESULT_CACHE_REQUESTS = Counter('valuation_result_cache_requests_total', 'Valuation cache lookups', ['outcome'])
+    RESULT_CACHE_LATENCY = Histogram('valuation_result_cache_request_seconds',
+                                     'Valuation latency by cache outcome', ['outcome'])
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+def _canonicalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _canonicalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool) or value is None:
+        return value
+    if hasattr(value, 'item'):  # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def valuation_cache_key(input_dict: Dict[str, Any], mode: str, model_version: str) -> str:
+    """SHA-256 of the canonicalized input, the valuation mode and the model version."""
+    payload = json.dumps([_canonicalize(input_dict), mode, model_version],
+                         sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class ValuationResultCache:
+    """
+    Thread-safe TTL/LRU cache of valuation results with an optional shared disk tier.
+
+    Args:
+        max_entries: In-process capacity; least recently used entries are evicted beyond it.
+        ttl_seconds: Entries older than this are treated as misses (both tiers).
+        disk_dir: Directory for the shared tier, or None to keep results in-process only.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+                 disk_dir: Optional[str] = RESULT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._latency = {'hit': [0, 0.0], 'miss': [0, 0.0]}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for ``key``, or None (a miss is not counted here)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return copy.deepcopy(result)
+                del self._entries[key]
+
+        stored = self._read_disk(key, now)
+        if stored is None:
+            return None
+        stored_at, result = stored
+        with self._lock:
+            self._stats['disk_hits'] += 1
+        self._remember(key, copy.deepcopy(result), stored_at)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Store ``result`` in both tiers and return it."""
+        now = time.time()
+        self._remember(key, copy.deepcopy(result), now)
+        if self.disk_dir:
+            path = os.path.join(self.disk_dir, f"{key}.json")
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(result, f, default=_json_default)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return result
+
+    def record(self, outcome: str, seconds: float) -> None:
+        """Count a lookup outcome ('hit' or 'miss') and the request latency it led to."""
+        with self._lock:
+            self._stats['hits' if outcome == 'hit' else 'misses'] += 1
+            self._latency[outcome][0] += 1
+            self._latency[outcome][1] += seconds
+        if PROMETHEUS_AVAILABLE:
+            RESULT_CACHE_REQUESTS.labels(outcome=outcome).inc()
+            RESULT_CACHE_LATENCY.labels(outcome=outcome).observe(seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counts, hit ratio, mean latency per outcome and in-process size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_ratio': self._stats['hits'] / lookups if lookups else 0.0,
+                'mean_latency_ms': {outcome: (total / count * 1000 if count else None)
+                                    for outcome, (count, total) in self._latency.items()},
+                'size': len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """Drop all in-process entries (the disk tier is left to expire)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, result: Dict[str, Any], stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        path = os.path.join(self.disk_dir, f"{key}.json")
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                return stored_at, json.load(f)
+        except (OSError, ValueError):
+            return None
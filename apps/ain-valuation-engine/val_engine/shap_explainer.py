@@ -42,14 +42,21 @@ Example:
     >>> print("Feature contributions with confidence:", explanation)
 """
 
-import shap
+import threading
+
 import pandas as pd
 import numpy as np
 from typing import Optional, Any, Dict, Union, List, Tuple
-from .model import _encoders, _model, extract_value_from_field, engineer_comprehensive_features
+from . import model as model_module
+from .model import (_encoders, _model, extract_value_from_field, engineer_comprehensive_features,
+                    get_encoding_tables, _engineer_records, FEATURE_COLUMNS)
+
+# Global SHAP explainer instance (a shap.TreeExplainer; shap is imported when one is built)
+explainer: Optional[Any] = None
 
-# Global SHAP explainer instance
-explainer: Optional[shap.TreeExplainer] = None
+# Model registered for lazy explainer construction (see register_explainer)
+_pending_explainer: Optional[Any] = None
+_explainer_lock = threading.Lock()
 
 def set_explainer(trained_model: Any) -> None:
     """
@@ -84,15 +91,43 @@ def set_explainer(trained_model: Any) -> None:
         - TreeExplainer is optimized for tree-based models
         - The explainer will be used for all subsequent explanation requests
     """
-    global explainer
+    global explainer, _pending_explainer
+    
+    # A CompiledTreeEnsemble is explained through the sklearn model it was built from
+    trained_model = getattr(trained_model, 'source_model', trained_model)
     
     if not hasattr(trained_model, 'predict'):
         raise AttributeError("Model must be fitted before setting explainer")
     
+    import shap
+    
     try:
         explainer = shap.TreeExplainer(trained_model)
     except Exception as e:
         raise ValueError(f"Failed to create TreeExplainer: {e}")
+    _pending_explainer = None
+
+def register_explainer(trained_model: Any) -> None:
+    """
+    Register a model for lazy explainer construction.
+    
+    Nothing is built and shap is not imported until the first explanation,
+    which keeps both off the worker startup path. Explanation functions call
+    get_explainer, which runs set_explainer(trained_model) once.
+    """
+    global explainer, _pending_explainer
+    
+    with _explainer_lock:
+        explainer = None
+        _pending_explainer = trained_model
+
+def get_explainer() -> Optional[Any]:
+    """Current TreeExplainer, built from the registered model on first use (None if nothing is set)."""
+    if explainer is None and _pending_explainer is not None:
+        with _explainer_lock:
+            if explainer is None and _pending_explainer is not None:
+                set_explainer(_pending_explainer)
+    return explainer
 
 def encode_input(input_df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -133,20 +168,16 @@ def encode_input(input_df: pd.DataFrame) -> pd.DataFrame:
     
     df = input_df.copy()
     categorical_columns = ["make", "model", "condition"]
+    tables = get_encoding_tables(_encoders)
     
     for col in categorical_columns:
         if col not in df.columns:
             raise KeyError(f"Required column '{col}' not found in input DataFrame")
         
-        le = _encoders.get(col)
-        if le is not None:
-            # Get the value as string for consistency
-            value = str(df[col].iloc[0])
-            if value in le.classes_:
-                df[col] = le.transform([value])
-            else:
-                # Unknown category - use fallback
-                df[col] = 0
+        table = tables.get(col)
+        if table is not None:
+            # Encode the whole column as strings; unknown categories use fallback 0
+            df[col] = table.encode_column(df[col].astype(str).to_numpy(), default=0)
         else:
             # No encoder available - use fallback
             df[col] = 0
@@ -195,83 +226,188 @@ def explain_prediction_comprehensive(vehicle_data: Dict) -> Dict[str, Any]:
         >>> for feature, contribution in zip(explanation['feature_names'], explanation['shap_values'][0]):
         ...     print(f"{feature}: ${contribution:+.2f}")
     """
-    if explainer is None:
+    if get_explainer() is None:
         raise RuntimeError("SHAP explainer not initialized. Call set_explainer(model) after training.")
     
-    if not isinstance(vehicle_data, dict):
-        raise ValueError("vehicle_data must be a dictionary")
-    
-    # Validate required fields
-    required_fields = ['vin', 'make', 'model', 'year', 'overall_condition_rating', 'zipcode']
-    missing_fields = [field for field in required_fields if field not in vehicle_data]
-    if missing_fields:
-        raise KeyError(f"Missing required fields: {missing_fields}")
+    _validate_comprehensive_vehicle(vehicle_data)
     
     try:
         # Engineer comprehensive features using the same logic as the model
         features_df = engineer_comprehensive_features(vehicle_data)
         
-        # Apply the same categorical encoding as used in training
-        categorical_columns = [
-            'make', 'model', 'condition', 'trim_level', 'body_style', 
-            'drive_type', 'fuel_type', 'transmission', 'title_type', 'market_saturation'
-        ]
-        
-        # Encode categorical features using the same encoders from training
-        processed_features = features_df.copy()
-        for col in categorical_columns:
-            if col in processed_features.columns and col in _encoders:
-                encoder = _encoders[col]
-                try:
-                    # Convert to string and encode
-                    value = str(processed_features[col].iloc[0])
-                    if value in encoder.classes_:
-                        processed_features[col] = encoder.transform([value])[0]
-                    else:
-                        # Unknown category - encode as 'Unknown' if available, else use 0
-                        if 'Unknown' in encoder.classes_:
-                            processed_features[col] = encoder.transform(['Unknown'])[0]
-                        else:
-                            processed_features[col] = 0
-                except (ValueError, AttributeError) as e:
-                    # Fallback to 0 for encoding issues
-                    processed_features[col] = 0
-            elif col in processed_features.columns:
-                # No encoder available, set to 0
-                processed_features[col] = 0
+        # Apply the same categorical encoding and column order as used in training
+        processed_features = _encode_comprehensive_features(features_df)
         
         # Generate SHAP values for processed features
         shap_values = explainer.shap_values(processed_features)
         
-        # Calculate verification confidence score
-        verification_confidence = calculate_verification_confidence(vehicle_data)
+        return _comprehensive_explanation(vehicle_data, processed_features.columns.tolist(), shap_values[0])
+        
+    except Exception as e:
+        raise ValueError(f"Failed to generate comprehensive SHAP explanation: {e}")
+
+def explain_predictions_comprehensive_batch(vehicles: List[Dict]) -> List[Dict[str, Any]]:
+    """
+    Generate SHAP explanations for many comprehensive-format vehicles at once.
+    
+    All vehicles are engineered and encoded into one feature matrix and
+    explained with a single ``shap_values`` call, instead of paying the
+    TreeExplainer call overhead per vehicle.
+    
+    Args:
+        vehicles (List[Dict]): Comprehensive vehicle data dicts (same format and
+            required fields as explain_prediction_comprehensive)
+    
+    Returns:
+        List[Dict[str, Any]]: One explanation per vehicle, in input order, each
+        shaped exactly like explain_prediction_comprehensive's result (its
+        ``shap_values`` holds that vehicle's single row)
+    
+    Raises:
+        RuntimeError: If the SHAP explainer hasn't been initialized
+        ValueError: If a vehicle is invalid or explanation fails
+        KeyError: If a vehicle is missing required fields
+    """
+    if get_explainer() is None:
+        raise RuntimeError("SHAP explainer not initialized. Call set_explainer(model) after training.")
+    if not vehicles:
+        return []
+    for vehicle_data in vehicles:
+        _validate_comprehensive_vehicle(vehicle_data)
+    
+    try:
+        features_df = pd.concat(_engineer_records(vehicles)).sort_index()
+        processed_features = _encode_comprehensive_features(features_df)
+        shap_values = explainer.shap_values(processed_features)
         
-        # Calculate data quality impact on prediction confidence
-        data_quality_impact = calculate_data_quality_impact(vehicle_data, shap_values[0])
+        feature_names = processed_features.columns.tolist()
+        return [
+            _comprehensive_explanation(vehicle_data, feature_names, shap_values[i])
+            for i, vehicle_data in enumerate(vehicles)
+        ]
         
-        # Generate feature explanations
-        feature_explanations = generate_feature_explanations(
-            processed_features.columns.tolist(), 
-            shap_values[0],
-            vehicle_data
-        )
+    except Exception as e:
+        raise ValueError(f"Failed to generate comprehensive SHAP explanation: {e}")
+
+def explain_prediction_approximate(vehicle_data: Dict, predicted_price: float,
+                                   cohort_cache: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Approximate SHAP explanation from the vehicle's cohort template, or exact SHAP as a fallback.
+    
+    Contributions come from the cohort explanation cache built offline for the
+    current model (see cohort_explanations), with only the mileage and
+    condition terms computed for this vehicle. When the vehicle's cohort is not
+    cached, its values fall outside the cohort's training range or the error
+    estimate exceeds the configured bound, exact SHAP is used instead.
+    
+    Args:
+        vehicle_data (Dict): Comprehensive vehicle data (same format as explain_prediction_comprehensive)
+        predicted_price (float): The model's prediction for the vehicle
+        cohort_cache: CohortExplanationCache to use (defaults to get_cohort_cache())
+    
+    Returns:
+        Dict[str, Any]: explain_prediction_comprehensive's fields plus ``approximation``:
+        ``method`` ('cohort' or 'exact'), ``cohort`` and ``error_estimate`` in dollars
+    """
+    from .cohort_explanations import cohort_keys, get_cohort_cache
+    
+    _validate_comprehensive_vehicle(vehicle_data)
+    if cohort_cache is None:
+        cohort_cache = get_cohort_cache()
+    
+    try:
+        features_df = engineer_comprehensive_features(vehicle_data)
+        processed_features = _encode_comprehensive_features(features_df)
+        key = cohort_keys(features_df).iloc[0]
         
-        # Calculate prediction confidence based on data verification
-        prediction_confidence = calculate_prediction_confidence(verification_confidence, data_quality_impact)
+        contributions, error = None, float('inf')
+        if cohort_cache is not None and cohort_cache.feature_names == processed_features.columns.tolist():
+            contributions, error = cohort_cache.approximate(key, processed_features.to_numpy()[0], predicted_price)
         
-        return {
-            'shap_values': shap_values,
-            'feature_names': processed_features.columns.tolist(),
-            'verification_confidence': verification_confidence,
-            'data_quality_impact': data_quality_impact,
-            'feature_explanations': feature_explanations,
-            'prediction_confidence': prediction_confidence,
-            'base_value': explainer.expected_value,
-            'prediction_value': float(shap_values[0].sum() + explainer.expected_value)
-        }
+        if contributions is not None:
+            explanation = _comprehensive_explanation(vehicle_data, cohort_cache.feature_names, contributions,
+                                                     np.array([cohort_cache.expected_value]))
+            method = 'cohort'
+        else:
+            if get_explainer() is None:
+                raise RuntimeError("SHAP explainer not initialized. Call set_explainer(model) after training.")
+            shap_values = explainer.shap_values(processed_features)
+            explanation = _comprehensive_explanation(vehicle_data, processed_features.columns.tolist(), shap_values[0])
+            method, error = 'exact', 0.0
         
+    except RuntimeError:
+        raise
     except Exception as e:
-        raise ValueError(f"Failed to generate comprehensive SHAP explanation: {e}")
+        raise ValueError(f"Failed to generate approximate SHAP explanation: {e}")
+    
+    explanation['approximation'] = {'method': method, 'cohort': key, 'error_estimate': float(error)}
+    return explanation
+
+def _validate_comprehensive_vehicle(vehicle_data: Dict) -> None:
+    if not isinstance(vehicle_data, dict):
+        raise ValueError("vehicle_data must be a dictionary")
+    
+    # Validate required fields
+    required_fields = ['vin', 'make', 'model', 'year', 'overall_condition_rating', 'zipcode']
+    missing_fields = [field for field in required_fields if field not in vehicle_data]
+    if missing_fields:
+        raise KeyError(f"Missing required fields: {missing_fields}")
+
+def _encode_comprehensive_features(features_df: pd.DataFrame) -> pd.DataFrame:
+    """Encode categorical columns with the training encoders and put columns in the model's order."""
+    # The module-level _encoders is only a snapshot; fall back to the model module's current encoders
+    encoders = _encoders if _encoders else model_module._encoders
+    tables = get_encoding_tables(encoders)
+    
+    categorical_columns = [
+        'make', 'model', 'condition', 'trim_level', 'body_style', 
+        'drive_type', 'fuel_type', 'transmission', 'title_type', 'market_saturation'
+    ]
+    
+    # Encode categorical features using the same encoders from training
+    # (unknown categories map to 'Unknown' if available, else 0)
+    processed_features = features_df.copy()
+    for col in categorical_columns:
+        if col in processed_features.columns and col in tables:
+            processed_features[col] = tables[col].encode_column(processed_features[col].astype(str).to_numpy())
+        elif col in processed_features.columns:
+            # No encoder available, set to 0
+            processed_features[col] = 0
+    
+    # Columns must be in the order the model was trained on, or contributions are attributed to the wrong features
+    feature_order = model_module.get_feature_spec().get('feature_columns') or FEATURE_COLUMNS
+    if set(feature_order) == set(processed_features.columns):
+        processed_features = processed_features[feature_order]
+    return processed_features
+
+def _comprehensive_explanation(vehicle_data: Dict, feature_names: List[str], row_shap_values: np.ndarray,
+                               expected_value: Any = None) -> Dict[str, Any]:
+    """Assemble the explain_prediction_comprehensive result for one vehicle's SHAP row."""
+    if expected_value is None:
+        expected_value = explainer.expected_value
+    
+    # Calculate verification confidence score
+    verification_confidence = calculate_verification_confidence(vehicle_data)
+    
+    # Calculate data quality impact on prediction confidence
+    data_quality_impact = calculate_data_quality_impact(vehicle_data, row_shap_values)
+    
+    # Generate feature explanations
+    feature_explanations = generate_feature_explanations(feature_names, row_shap_values, vehicle_data)
+    
+    # Calculate prediction confidence based on data verification
+    prediction_confidence = calculate_prediction_confidence(verification_confidence, data_quality_impact)
+    
+    return {
+        'shap_values': row_shap_values[np.newaxis, :],
+        'feature_names': list(feature_names),
+        'verification_confidence': verification_confidence,
+        'data_quality_impact': data_quality_impact,
+        'feature_explanations': feature_explanations,
+        'prediction_confidence': prediction_confidence,
+        'base_value': expected_value,
+        'prediction_value': float(row_shap_values.sum() + np.ravel(expected_value)[0])
+    }
 
 def calculate_verification_confidence(vehicle_data: Dict) -> float:
     """
@@ -451,7 +587,7 @@ def explain_prediction_legacy(input_df: pd.DataFrame) -> Any:
         >>> contributions = explain_prediction_legacy(vehicle)
         >>> print("Legacy format contributions:", contributions)
     """
-    if explainer is None:
+    if get_explainer() is None:
         raise RuntimeError("SHAP explainer not initialized. Call set_explainer(model) after training.")
     
     if len(input_df) == 0:
@@ -0,0 +1,103 @@
+"""
+Per-stage latency spans for the valuation request path.
+
+``StageTimer`` records wall-clock time per named stage with one
+``perf_counter`` pair per span. The breakdown is returned in the valuation
+result's ``debug`` field, rendered as a ``Server-Timing`` header by the API
+layer and, when prometheus_client is installed, observed into the
+``valuation_stage_seconds`` histogram labelled by stage and mode.
+
+Set ``AIN_STAGE_TIMING=0`` to disable recording.
+
+Example:
+    >>> timer = StageTimer()
+    >>> with timer.stage('predict'):
+    ...     price = predict_price(input_df, model, encoders)
+    >>> timer.observe(mode='sell')
+    >>> server_timing_header(timer.breakdown_ms())
+    'predict;dur=0.412'
+"""
+
+import os
+import time
+from typing import Dict
+
+STAGE_TIMING_ENABLED = os.getenv("AIN_STAGE_TIMING", "1") != "0"
+
+# Prometheus metrics (optional)
+try:
+    from prometheus_client import Histogram
+    VALUATION_STAGE_SECONDS = Histogram(
+        'valuation_stage_seconds', 'Valuation latency by stage', ['stage', 'mode'],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class _Span:
+    """Context manager adding its elapsed time to one stage of a StageTimer."""
+
+    __slots__ = ('_spans', '_name', '_start')
+
+    def __init__(self, spans: Dict[str, float], name: str):
+        self._spans = spans
+        self._name = name
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._spans[self._name] = self._spans.get(self._name, 0.0) + time.perf_counter() - self._start
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class StageTimer:
+    """
+    Ordered stage -> seconds spans for one request.
+
+    Args:
+        enabled: When False every span is a no-op and the breakdown is empty.
+    """
+
+    def __init__(self, enabled: bool = STAGE_TIMING_ENABLED):
+        self.enabled = enabled
+        self.spans: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def stage(self, name: str):
+        """Context manager timing ``name`` (repeated stages accumulate)."""
+        return _Span(self.spans, name) if self.enabled else _NULL_SPAN
+
+    def total_seconds(self) -> float:
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self._start
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, in recording order."""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.spans.items()}
+
+    def observe(self, mode: str) -> None:
+        """Feed the recorded spans into the Prometheus stage histogram."""
+        if self.enabled and PROMETHEUS_AVAILABLE:
+            for name, seconds in self.spans.items():
+                VALUATION_STAGE_SECONDS.labels(stage=name, mode=mode).observe(seconds)
+
+
+def server_timing_header(breakdown_ms: Dict[str, float]) -> str:
+    """Render a stage -> milliseconds breakdown as a ``Server-Timing`` header value."""
+    return ", ".join(f"{name};dur={duration_ms:.3f}" for name, duration_ms in breakdown_ms.items())
@@ -0,0 +1,40 @@
+"""Synthetic listing rows mixing simple and comprehensive field formats, for tests and benchmarks."""
+import random
+
+import pandas as pd
+
+MAKES = ['Toyota', 'Honda', 'Ford', 'Tesla', 'Chevrolet']
+SOURCES = ['VIN_Decode', 'AI_Analysis', 'User_Input', 'Odometer', 'Estimated']
+
+
+def _wrap(rng, value):
+    """Randomly wrap a value in the comprehensive {'value', 'verified', 'source_origin'} format."""
+    if rng.random() < 0.5:
+        return {'value': value, 'verified': rng.random() < 0.7, 'source_origin': rng.choice(SOURCES)}
+    return value
+
+
+def random_vehicle_frame(n, seed=7):
+    """Deterministic DataFrame of ``n`` listings with a 'price' target column."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        rows.append({
+            'year': _wrap(rng, rng.randint(2005, 2024)),
+            'mileage': _wrap(rng, rng.randint(0, 200000)),
+            'make': _wrap(rng, rng.choice(MAKES)),
+            'model': _wrap(rng, rng.choice(['Camry', 'Civic', 'F-150', 'Model 3'])),
+            'overall_condition_rating': rng.choice([None, '', _wrap(rng, rng.choice(['Excellent', 'Good', 'Fair', 'Poor']))]),
+            'condition': rng.choice(['Excellent', 'Good', 'Fair']),
+            'zipcode': _wrap(rng, rng.choice([0, 90210, 10001])),
+            'fuel_type': _wrap(rng, rng.choice(['Gasoline', 'Electric', 'Hybrid'])),
+            'exterior_damage': _wrap(rng, ['scratch'] * rng.randint(0, 3)),
+            'accident_history': rng.choice([[], ['minor'], None]),
+            'number_of_owners': _wrap(rng, rng.choice([1, 2, None])),
+            'service_history_available': _wrap(rng, rng.random() < 0.5),
+            'features_options': _wrap(rng, {'sunroof_moonroof': rng.random() < 0.5, 'leather_seats': True}),
+            'valuation_video': rng.choice([None, {}, {'ai_condition_score': rng.randint(40, 99), 'verified': rng.random() < 0.5}]),
+            'exterior_color': _wrap(rng, rng.choice(['White', 'Red', 'Black'])),
+            'price': rng.randint(5000, 60000),
+        })
+    return pd.DataFrame(rows)